@@ -0,0 +1,379 @@
+"""Pre-generated, funded test accounts for load generation and fixtures.
+
+Accounts live in one binary file: a 16-byte header, then one fixed 65-byte
+record per account (32-byte ed25519 seed, 32-byte public key, 1 flag
+byte). 10k accounts take 650 KB, and flags are updated in place.
+
+Keypairs are generated in parallel across processes. ``fund`` pays and
+opts accounts in through atomic groups against a local node (payment plus
+app opt-in per account, 8 accounts per 16-transaction group) with a window
+of groups in flight. Progress is recorded in the flags, so an interrupted
+run resumes where it stopped.
+
+Leases are exclusive ``fcntl`` locks on an account's flag byte. Any number
+of benchmark workers or test processes can lease from the same file
+without handing out an account twice, and a crashed worker's leases are
+released by the kernel. fcntl locks belong to the process and are dropped
+when *any* descriptor for the file is closed, so a process should keep a
+single ``AccountPool`` per file open while it holds leases.
+
+The file holds private keys in the clear: use it for localnet/testnet only.
+
+Usage (from the backend directory)::
+
+    python -m app.algorand.account_pool generate --count 10000
+    python -m app.algorand.account_pool fund --funder-mnemonic "..." --app-id 1234
+    python -m app.algorand.account_pool status
+"""
+
+import argparse
+import base64
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+import fcntl
+import hashlib
+import os
+import random
+import struct
+import sys
+import tempfile
+import threading
+from typing import Any, Dict, Iterable, List, Optional
+
+from algosdk import mnemonic, transaction
+from nacl.signing import SigningKey
+
+from ..config import settings
+
+
+MAGIC = b"HCAP"
+VERSION = 1
+HEADER = struct.Struct(">4sHHI4x")  # magic, version, record size, count
+SEED_BYTES = 32
+RECORD_BYTES = 65
+FLAG_OFFSET = 64
+
+FUNDED = 0x01
+OPTED_IN = 0x02
+
+
+def encode_address(public_key: bytes) -> str:
+    """algosdk.encoding.encode_address, with hashlib's SHA-512/256 (several times faster)"""
+    checksum = hashlib.new("sha512_256", public_key).digest()[-4:]
+    return base64.b32encode(public_key + checksum).decode().rstrip("=")
+
+
+class AccountPoolExhausted(Exception):
+    """Raised when fewer accounts than requested are free to lease"""
+
+
+@dataclass
+class PoolAccount:
+    index: int
+    address: str
+    private_key: str  # algosdk format: base64(seed + public key)
+    flags: int
+
+    @property
+    def funded(self) -> bool:
+        return bool(self.flags & FUNDED)
+
+    @property
+    def opted_in(self) -> bool:
+        return bool(self.flags & OPTED_IN)
+
+
+def generate_records(count: int) -> bytes:
+    """`count` fresh account records (runs inside pool workers)"""
+    records = bytearray()
+    for _ in range(count):
+        seed = os.urandom(SEED_BYTES)
+        records += seed + SigningKey(seed).verify_key.encode() + b"\0"
+    return bytes(records)
+
+
+def generate(path: str, count: int, workers: int = 0) -> int:
+    """Append `count` new accounts to the pool file at `path` (created if missing).
+
+    Closes its own descriptor, so do not call it from a process holding leases.
+    """
+    workers = workers or os.cpu_count() or 1
+    chunk = max(1, -(-count // (workers * 4)))
+    sizes = [min(chunk, count - start) for start in range(0, count, chunk)]
+    if workers > 1 and len(sizes) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            parts = list(executor.map(generate_records, sizes))
+    else:
+        parts = [generate_records(size) for size in sizes]
+
+    fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+    try:
+        # Serialize appends from concurrent generators on the header
+        fcntl.lockf(fd, fcntl.LOCK_EX, HEADER.size, 0)
+        header = os.pread(fd, HEADER.size, 0)
+        existing = _parse_header(header, path) if header else 0
+        offset = HEADER.size + existing * RECORD_BYTES
+        for part in parts:
+            os.pwrite(fd, part, offset)
+            offset += len(part)
+        total = existing + count
+        os.pwrite(fd, HEADER.pack(MAGIC, VERSION, RECORD_BYTES, total), 0)
+        os.fsync(fd)
+        return total
+    finally:
+        os.close(fd)
+
+
+def _parse_header(header: bytes, path: str) -> int:
+    magic, version, record_bytes, count = HEADER.unpack(header)
+    if magic != MAGIC or version != VERSION or record_bytes != RECORD_BYTES:
+        raise ValueError(f"{path} is not an account pool file")
+    return count
+
+
+class Lease:
+    """Accounts held exclusively until released (also a context manager)"""
+
+    def __init__(self, pool: "AccountPool", accounts: List[PoolAccount]):
+        self.pool = pool
+        self.accounts = accounts
+
+    def __enter__(self) -> List[PoolAccount]:
+        return self.accounts
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.release()
+
+    def release(self) -> None:
+        self.pool.release(self.accounts)
+        self.accounts = []
+
+
+class AccountPool:
+    def __init__(self, path: str):
+        self.path = path
+        self._fd = os.open(path, os.O_RDWR)
+        header = os.pread(self._fd, HEADER.size, 0)
+        self._count = _parse_header(header, path)
+        self._records = bytearray(os.pread(self._fd, self._count * RECORD_BYTES, HEADER.size))
+        self._leased: set = set()
+        self._lock = threading.Lock()
+        # Start scanning somewhere different in every process to avoid contending on the same prefix
+        self._cursor = random.randrange(self._count) if self._count else 0
+
+    def __len__(self) -> int:
+        return self._count
+
+    def close(self) -> None:
+        os.close(self._fd)
+
+    def _offset(self, index: int) -> int:
+        return HEADER.size + index * RECORD_BYTES
+
+    def account(self, index: int) -> PoolAccount:
+        start = index * RECORD_BYTES
+        record = self._records[start:start + RECORD_BYTES]
+        return PoolAccount(
+            index=index,
+            address=encode_address(bytes(record[SEED_BYTES:FLAG_OFFSET])),
+            private_key=base64.b64encode(bytes(record[:FLAG_OFFSET])).decode(),
+            flags=record[FLAG_OFFSET],
+        )
+
+    def flags(self, index: int) -> int:
+        return self._records[index * RECORD_BYTES + FLAG_OFFSET]
+
+    def set_flags(self, indices: Iterable[int], flags: int) -> None:
+        """OR `flags` into each account's flag byte, in memory and on disk"""
+        for index in indices:
+            position = index * RECORD_BYTES + FLAG_OFFSET
+            self._records[position] |= flags
+            os.pwrite(self._fd, bytes([self._records[position]]), HEADER.size + position)
+
+    def refresh_flags(self) -> None:
+        """Re-read flags written by other processes"""
+        self._records = bytearray(os.pread(self._fd, self._count * RECORD_BYTES, HEADER.size))
+
+    def pending(self, flags: int) -> List[int]:
+        """Indices of accounts missing any of `flags`"""
+        records = self._records
+        return [
+            i for i in range(self._count)
+            if records[i * RECORD_BYTES + FLAG_OFFSET] & flags != flags
+        ]
+
+    def _lock_run(self, start: int, n: int, require: int) -> bool:
+        """Lease accounts start..start+n-1 with a single range lock, if all are free"""
+        if start + n > self._count:
+            return False
+        for index in range(start, start + n):
+            if index in self._leased or self.flags(index) & require != require:
+                return False
+        try:
+            fcntl.lockf(
+                self._fd, fcntl.LOCK_EX | fcntl.LOCK_NB,
+                (n - 1) * RECORD_BYTES + 1, self._offset(start) + FLAG_OFFSET,
+            )
+        except OSError:
+            return False
+        self._leased.update(range(start, start + n))
+        return True
+
+    def lease(self, n: int, require: int = 0) -> Lease:
+        """Lock `n` free accounts that have all of `require` set"""
+        taken: List[int] = []
+        with self._lock:
+            # Fast path: the next n accounts are free, one syscall for the lot
+            start = self._cursor
+            if n and self._lock_run(start, n, require):
+                self._cursor = (start + n) % self._count
+                return Lease(self, [self.account(index) for index in range(start, start + n)])
+            for step in range(self._count):
+                if len(taken) == n:
+                    break
+                index = (self._cursor + step) % self._count
+                if index in self._leased or self.flags(index) & require != require:
+                    continue
+                try:
+                    fcntl.lockf(self._fd, fcntl.LOCK_EX | fcntl.LOCK_NB, 1, self._offset(index) + FLAG_OFFSET)
+                except OSError:
+                    continue  # leased by another process
+                self._leased.add(index)
+                taken.append(index)
+            self._cursor = (taken[-1] + 1) % self._count if taken else self._cursor
+        if len(taken) < n:
+            self.release(taken)
+            raise AccountPoolExhausted(f"Only {len(taken)} of {n} accounts are free")
+        return Lease(self, [self.account(index) for index in taken])
+
+    def release(self, accounts: Iterable[Any]) -> None:
+        with self._lock:
+            for account in accounts:
+                index = account.index if isinstance(account, PoolAccount) else account
+                # Flag byte plus the bytes up to the next one: a run lease also
+                # locked those, and only flag bytes decide who holds an account
+                fcntl.lockf(self._fd, fcntl.LOCK_UN, RECORD_BYTES, self._offset(index) + FLAG_OFFSET)
+                self._leased.discard(index)
+
+    def status(self) -> Dict[str, int]:
+        records = self._records
+        flags = [records[i * RECORD_BYTES + FLAG_OFFSET] for i in range(self._count)]
+        return {
+            "accounts": self._count,
+            "funded": sum(1 for f in flags if f & FUNDED),
+            "opted_in": sum(1 for f in flags if f & OPTED_IN),
+            "leased_here": len(self._leased),
+            "file_bytes": HEADER.size + self._count * RECORD_BYTES,
+        }
+
+
+def fund(
+    pool: AccountPool,
+    algod_client,
+    funder_private_key: str,
+    amount: int,
+    app_id: int = 0,
+    window: int = 32,
+) -> Dict[str, int]:
+    """Fund (and opt into `app_id`) every account not yet done, in atomic groups.
+
+    Each group holds up to 16 transactions: a payment per account, followed
+    by that account's opt-in when `app_id` is set. Up to `window` groups are
+    in flight; the oldest is awaited before another is sent.
+    """
+    funder = encode_address(base64.b64decode(funder_private_key)[SEED_BYTES:])
+    wanted = FUNDED | (OPTED_IN if app_id else 0)
+    per_group = 8 if app_id else 16
+    todo = pool.pending(wanted)
+    stats = {"accounts": 0, "groups": 0, "failed_groups": 0}
+    in_flight: List[tuple] = []
+
+    def settle(txid: str, indices: List[int]) -> None:
+        try:
+            transaction.wait_for_confirmation(algod_client, txid, 10)
+        except Exception:
+            stats["failed_groups"] += 1
+            return
+        pool.set_flags(indices, wanted)
+        stats["accounts"] += len(indices)
+
+    def flat_fee_params() -> transaction.SuggestedParams:
+        # A flat minimum fee skips the SDK's per-transaction size estimate (a trial signature)
+        params = algod_client.suggested_params()
+        params.fee = params.min_fee
+        params.flat_fee = True
+        return params
+
+    params = flat_fee_params()
+    for group_number, start in enumerate(range(0, len(todo), per_group)):
+        if group_number % window == 0 and group_number:
+            params = flat_fee_params()
+        indices = todo[start:start + per_group]
+        txns, signers = [], []
+        for index in indices:
+            account = pool.account(index)
+            if not account.funded:
+                txns.append(transaction.PaymentTxn(funder, params, account.address, amount))
+                signers.append(funder_private_key)
+            if app_id and not account.opted_in:
+                txns.append(transaction.ApplicationOptInTxn(account.address, params, app_id))
+                signers.append(account.private_key)
+        transaction.assign_group_id(txns)
+        signed = [txn.sign(key) for txn, key in zip(txns, signers)]
+        try:
+            algod_client.send_transactions(signed)
+        except Exception:
+            stats["failed_groups"] += 1
+            continue
+        stats["groups"] += 1
+        in_flight.append((signed[0].get_txid(), indices))
+        if len(in_flight) >= window:
+            settle(*in_flight.pop(0))
+    for txid, indices in in_flight:
+        settle(txid, indices)
+    return stats
+
+
+def default_path() -> str:
+    return settings.account_pool_path or os.path.join(tempfile.gettempdir(), "hosconnect-accounts.bin")
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(prog="python -m app.algorand.account_pool", description=__doc__.split("\n")[0])
+    parser.add_argument("--path", default=default_path(), help="Pool file")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    gen = sub.add_parser("generate", help="Append new keypairs to the pool")
+    gen.add_argument("--count", type=int, required=True)
+    gen.add_argument("--workers", type=int, default=0)
+
+    fund_cmd = sub.add_parser("fund", help="Fund and opt in every pending account")
+    fund_cmd.add_argument("--algod-url", default="http://localhost:4001")
+    fund_cmd.add_argument("--algod-token", default="a" * 64)
+    fund_cmd.add_argument("--funder-mnemonic", default=os.environ.get("FUNDER_MNEMONIC"))
+    fund_cmd.add_argument("--amount", type=int, default=1_000_000, help="microAlgos per account")
+    fund_cmd.add_argument("--app-id", type=int, default=settings.medical_app_id)
+    fund_cmd.add_argument("--window", type=int, default=32, help="Groups in flight")
+
+    sub.add_parser("status", help="Show pool size and funding progress")
+
+    args = parser.parse_args(argv)
+    if args.command == "generate":
+        total = generate(args.path, args.count, args.workers)
+        print(f"{args.path}: {total} accounts")
+        return
+
+    pool = AccountPool(args.path)
+    if args.command == "fund":
+        from algosdk.v2client.algod import AlgodClient
+
+        if not args.funder_mnemonic:
+            parser.error("--funder-mnemonic (or FUNDER_MNEMONIC) is required")
+        funder_key = mnemonic.to_private_key(args.funder_mnemonic)
+        print(fund(pool, AlgodClient(args.algod_token, args.algod_url), funder_key,
+                   args.amount, app_id=args.app_id, window=args.window))
+    print(pool.status())
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -7,29 +7,41 @@ from typing import Dict, Any, Optional, List
 import json
 import time
 
+from .packed_state import decode_user_info
+from ..location import rank_by_distance
+
 
 class MedicalConnectClient:
-    """Client for interacting with the Medical Connect smart contract"""
+    """Client for interacting with the Medical Connect smart contract
+
+    With ``packed_state=True`` the client talks to ``MedicalConnectPackedContract``:
+    address arguments are sent as raw public keys and local state is decoded
+    from the single packed profile slot.
+    """
     
-    def __init__(self, algod_client, app_client: ApplicationClient):
+    def __init__(self, algod_client, app_client: ApplicationClient, packed_state: bool = False):
         self.algod_client = algod_client
         self.app_client = app_client
+        self.packed_state = packed_state
         
     @classmethod
-    def deploy_contract(cls, algod_client, creator_account) -> 'MedicalConnectClient':
+    def deploy_contract(cls, algod_client, creator_account, packed_state: bool = False) -> 'MedicalConnectClient':
         """Deploy the Medical Connect contract"""
-        from .medical_connect import MedicalConnectContract
+        if packed_state:
+            from .contracts.medical_connect_packed import MedicalConnectPackedContract as contract_cls
+        else:
+            from .contracts.medical_connect import MedicalConnectContract as contract_cls
         
-        contract = MedicalConnectContract()
+        contract = contract_cls()
         approval_teal, clear_teal = contract.compile_contracts()
         
         # Create app spec
         app_spec = ApplicationSpecification(
-            name="MedicalConnectContract",
+            name=contract_cls.__name__,
             approval_program=approval_teal,
             clear_state_program=clear_teal,
-            global_schema=None,
-            local_schema=None,
+            global_schema=contract.global_schema,
+            local_schema=contract.local_schema,
             foreign_apps=[],
             foreign_assets=[],
             boxes=[],
@@ -40,7 +52,11 @@ class MedicalConnectClient:
         app_client = ApplicationClient(algod_client, app_spec, creator=creator_account)
         app_client.create()
         
-        return cls(algod_client, app_client)
+        return cls(algod_client, app_client, packed_state=packed_state)
+    
+    def _address_arg(self, address: str):
+        """Address argument in the form the deployed layout expects"""
+        return decode_address(address) if self.packed_state else address
     
     def register_doctor(self, doctor_account, name: str, specialization: str) -> str:
         """Register a new doctor"""
@@ -74,7 +90,7 @@ class MedicalConnectClient:
             result = self.app_client.call(
                 doctor_account,
                 "submit_pow",
-                patient_addr=patient_address,
+                patient_addr=self._address_arg(patient_address),
                 treatment_desc=treatment_desc,
                 timestamp=timestamp
             )
@@ -91,7 +107,7 @@ class MedicalConnectClient:
             result = self.app_client.call(
                 patient_account,
                 "rate_doctor",
-                doctor_addr=doctor_address,
+                doctor_addr=self._address_arg(doctor_address),
                 rating=rating
             )
             return result.txid
@@ -114,6 +130,9 @@ class MedicalConnectClient:
     def get_user_info(self, account_address: str) -> Dict[str, Any]:
         """Get user information from local state"""
         try:
+            if self.packed_state:
+                return decode_user_info(self.app_client.get_local_state(account_address, raw=True))
+            
             local_state = self.app_client.get_local_state(account_address)
             if not local_state:
                 return {"user_type": 0, "registered": False}
@@ -164,10 +183,9 @@ class MedicalConnectClient:
         ]
     
     def get_nearby_doctors(self, patient_location: str) -> List[Dict[str, Any]]:
-        """Get list of nearby doctors"""
-        # This would require location-based filtering
-        # For demo purposes, we'll return a mock list
-        return [
+        """Get list of nearby doctors, nearest first"""
+        # For demo purposes, we'll rank a mock list
+        return rank_by_distance([
             {
                 "address": "DEMO_DOCTOR_1",
                 "name": "Dr. Alice Johnson",
@@ -184,7 +202,7 @@ class MedicalConnectClient:
                 "location": "New York, NY",
                 "consultations_count": 200
             }
-        ]
+        ], patient_location)
 
 
 # Utility functions for account management
@@ -1,7 +1,7 @@
 from pyteal import *
 from algokit_utils import ApplicationClient
 from algosdk.atomic_transaction_composer import TransactionWithSigner
-from algosdk.transaction import ApplicationCallTxn
+from algosdk.transaction import ApplicationCallTxn, StateSchema
 from algosdk.abi import Method, ABIType, Returns
 from typing import Dict, Any, Optional
 import json
@@ -13,26 +13,22 @@ class MedicalConnectContract:
     def __init__(self):
         self.app_id = Int(0)  # Will be set during deployment
         
-    def approval_program(self) -> Expr:
-        """Main approval program for the smart contract"""
-        
-        # Global state keys
-        owner_key = Bytes("owner")
-        total_doctors_key = Bytes("total_doctors")
-        total_patients_key = Bytes("total_patients")
-        total_consultations_key = Bytes("total_consultations")
-        
-        # Application arguments
-        action = Txn.application_args[0]
-        
-        # On creation
-        on_create = Seq([
-            App.globalPut(owner_key, Txn.sender()),
-            App.globalPut(total_doctors_key, Int(0)),
-            App.globalPut(total_patients_key, Int(0)),
-            App.globalPut(total_consultations_key, Int(0)),
-            Approve()
-        ])
+    # Global state: owner + three counters
+    global_schema = StateSchema(num_uints=3, num_byte_slices=1)
+    # Local state: one key per field (doctor, patient and PoW fields share the schema)
+    local_schema = StateSchema(num_uints=8, num_byte_slices=6)
+    
+    # Global state keys
+    owner_key = Bytes("owner")
+    total_doctors_key = Bytes("total_doctors")
+    total_patients_key = Bytes("total_patients")
+    total_consultations_key = Bytes("total_consultations")
+    
+    def action_handlers(self) -> Dict[str, Expr]:
+        """NoOp handlers keyed by the action name in application_args[0]"""
+        total_doctors_key = self.total_doctors_key
+        total_patients_key = self.total_patients_key
+        total_consultations_key = self.total_consultations_key
         
         # Register doctor
         register_doctor = Seq([
@@ -64,13 +60,14 @@ class MedicalConnectContract:
         ])
         
         # Submit Proof of Work (PoW)
+        pow_id = ScratchVar(TealType.uint64)
         submit_pow = Seq([
             Assert(Txn.application_args.length() == Int(4)),  # action, patient_addr, treatment_desc, timestamp
             Assert(App.localGet(Int(0), Bytes("user_type")) == Int(1)),  # Must be doctor
             
             # Create PoW record
-            pow_id = App.globalGet(total_consultations_key) + Int(1),
-            App.localPut(Int(0), Bytes("pow_id"), pow_id),
+            pow_id.store(App.globalGet(total_consultations_key) + Int(1)),
+            App.localPut(Int(0), Bytes("pow_id"), pow_id.load()),
             App.localPut(Int(0), Bytes("patient_addr"), Txn.application_args[1]),
             App.localPut(Int(0), Bytes("treatment_desc"), Txn.application_args[2]),
             App.localPut(Int(0), Bytes("timestamp"), Txn.application_args[3]),
@@ -81,46 +78,67 @@ class MedicalConnectContract:
                         App.localGet(Int(0), Bytes("consultations_count")) + Int(1)),
             
             # Update global consultation count
-            App.globalPut(total_consultations_key, pow_id),
+            App.globalPut(total_consultations_key, pow_id.load()),
             Approve()
         ])
         
         # Rate doctor
+        rating = ScratchVar(TealType.uint64)
         rate_doctor = Seq([
             Assert(Txn.application_args.length() == Int(3)),  # action, doctor_addr, rating
             Assert(App.localGet(Int(0), Bytes("user_type")) == Int(2)),  # Must be patient
             
             # Get rating value (1-5)
-            rating = Btoi(Txn.application_args[2]),
-            Assert(And(rating >= Int(1), rating <= Int(5))),
+            rating.store(Btoi(Txn.application_args[2])),
+            Assert(And(rating.load() >= Int(1), rating.load() <= Int(5))),
             
             # Update doctor's rating (simplified - in real implementation, you'd need to store per-doctor ratings)
             # For now, we'll store the rating in the patient's local state
-            App.localPut(Int(0), Bytes("last_rating"), rating),
+            App.localPut(Int(0), Bytes("last_rating"), rating.load()),
             App.localPut(Int(0), Bytes("rated_doctor"), Txn.application_args[1]),
             
             Approve()
         ])
         
         # Set emergency status
+        emergency_status = ScratchVar(TealType.uint64)
         set_emergency = Seq([
             Assert(Txn.application_args.length() == Int(2)),  # action, emergency_status
             Assert(App.localGet(Int(0), Bytes("user_type")) == Int(2)),  # Must be patient
             
-            emergency_status = Btoi(Txn.application_args[1]),
-            Assert(Or(emergency_status == Int(0), emergency_status == Int(1))),  # 0 or 1
+            emergency_status.store(Btoi(Txn.application_args[1])),
+            Assert(Or(emergency_status.load() == Int(0), emergency_status.load() == Int(1))),  # 0 or 1
             
-            App.localPut(Int(0), Bytes("emergency_status"), emergency_status),
+            App.localPut(Int(0), Bytes("emergency_status"), emergency_status.load()),
+            Approve()
+        ])
+        
+        return {
+            "register_doctor": register_doctor,
+            "register_patient": register_patient,
+            "submit_pow": submit_pow,
+            "rate_doctor": rate_doctor,
+            "set_emergency": set_emergency,
+        }
+    
+    def approval_program(self) -> Expr:
+        """Main approval program for the smart contract"""
+        
+        # Application arguments
+        action = Txn.application_args[0]
+        
+        # On creation
+        on_create = Seq([
+            App.globalPut(self.owner_key, Txn.sender()),
+            App.globalPut(self.total_doctors_key, Int(0)),
+            App.globalPut(self.total_patients_key, Int(0)),
+            App.globalPut(self.total_consultations_key, Int(0)),
             Approve()
         ])
         
         # Handle different actions
         handle_action = Cond(
-            [action == Bytes("register_doctor"), register_doctor],
-            [action == Bytes("register_patient"), register_patient],
-            [action == Bytes("submit_pow"), submit_pow],
-            [action == Bytes("rate_doctor"), rate_doctor],
-            [action == Bytes("set_emergency"), set_emergency],
+            *[[action == Bytes(name), handler] for name, handler in self.action_handlers().items()]
         )
         
         # Main program logic
@@ -0,0 +1,171 @@
+from pyteal import *
+from algosdk.transaction import StateSchema
+from typing import Dict
+import json
+
+from .medical_connect import MedicalConnectContract, ContractMethods
+from ..packed_state import (
+    PROFILE_KEY,
+    PROFILE_SIZE,
+    USER_TYPE_OFFSET,
+    EMERGENCY_STATUS_OFFSET,
+    POW_STATUS_OFFSET,
+    LAST_RATING_OFFSET,
+    CONSULTATIONS_COUNT_OFFSET,
+    POW_ID_OFFSET,
+    TIMESTAMP_OFFSET,
+    PATIENT_ADDR_OFFSET,
+    RATED_DOCTOR_OFFSET,
+)
+
+
+class MedicalConnectPackedContract(MedicalConnectContract):
+    """Medical Connect contract with fixed-width local fields packed into one slot.
+
+    Same actions and global state as ``MedicalConnectContract``. Per-account
+    integers and addresses live at fixed offsets inside ``PROFILE_KEY`` (see
+    ``app.algorand.packed_state``) and are updated in place with
+    ``replace``/``extract``. Address arguments are raw 32-byte public keys.
+    """
+
+    # Local state: packed profile + name, specialization, treatment_desc
+    local_schema = StateSchema(num_uints=0, num_byte_slices=4)
+
+    def action_handlers(self) -> Dict[str, Expr]:
+        """NoOp handlers keyed by the action name in application_args[0]"""
+        total_doctors_key = self.total_doctors_key
+        total_patients_key = self.total_patients_key
+        total_consultations_key = self.total_consultations_key
+
+        profile_key = Bytes(PROFILE_KEY)
+        profile = ScratchVar(TealType.bytes)
+        existing = App.localGetEx(Int(0), Global.current_application_id(), profile_key)
+
+        def user_type() -> Expr:
+            return GetByte(App.localGet(Int(0), profile_key), Int(USER_TYPE_OFFSET))
+
+        def new_profile(kind: int) -> Expr:
+            return SetByte(BytesZero(Int(PROFILE_SIZE)), Int(USER_TYPE_OFFSET), Int(kind))
+
+        # Register doctor
+        register_doctor = Seq([
+            Assert(Txn.application_args.length() == Int(3)),  # action, name, specialization
+            existing,
+            Assert(Not(existing.hasValue())),  # Not registered yet
+
+            App.localPut(Int(0), profile_key, new_profile(1)),  # 1 = doctor
+            App.localPut(Int(0), Bytes("name"), Txn.application_args[1]),
+            App.localPut(Int(0), Bytes("specialization"), Txn.application_args[2]),
+
+            App.globalPut(total_doctors_key, App.globalGet(total_doctors_key) + Int(1)),
+            Approve()
+        ])
+
+        # Register patient
+        register_patient = Seq([
+            Assert(Txn.application_args.length() == Int(2)),  # action, name
+            existing,
+            Assert(Not(existing.hasValue())),  # Not registered yet
+
+            App.localPut(Int(0), profile_key, new_profile(2)),  # 2 = patient
+            App.localPut(Int(0), Bytes("name"), Txn.application_args[1]),
+
+            App.globalPut(total_patients_key, App.globalGet(total_patients_key) + Int(1)),
+            Approve()
+        ])
+
+        # Submit Proof of Work (PoW)
+        pow_id = ScratchVar(TealType.uint64)
+        submit_pow = Seq([
+            Assert(Txn.application_args.length() == Int(4)),  # action, patient_addr, treatment_desc, timestamp
+            Assert(Len(Txn.application_args[1]) == Int(32)),
+            Assert(Len(Txn.application_args[3]) == Int(8)),
+            profile.store(App.localGet(Int(0), profile_key)),
+            Assert(GetByte(profile.load(), Int(USER_TYPE_OFFSET)) == Int(1)),  # Must be doctor
+
+            # Create PoW record
+            pow_id.store(App.globalGet(total_consultations_key) + Int(1)),
+            profile.store(Replace(profile.load(), Int(POW_ID_OFFSET), Itob(pow_id.load()))),
+            profile.store(Replace(profile.load(), Int(PATIENT_ADDR_OFFSET), Txn.application_args[1])),
+            profile.store(Replace(profile.load(), Int(TIMESTAMP_OFFSET), Txn.application_args[3])),
+            profile.store(SetByte(profile.load(), Int(POW_STATUS_OFFSET), Int(1))),  # 1 = completed
+
+            # Update doctor's consultation count
+            profile.store(Replace(
+                profile.load(),
+                Int(CONSULTATIONS_COUNT_OFFSET),
+                Itob(ExtractUint64(profile.load(), Int(CONSULTATIONS_COUNT_OFFSET)) + Int(1)),
+            )),
+            App.localPut(Int(0), profile_key, profile.load()),
+            App.localPut(Int(0), Bytes("treatment_desc"), Txn.application_args[2]),
+
+            # Update global consultation count
+            App.globalPut(total_consultations_key, pow_id.load()),
+            Approve()
+        ])
+
+        # Rate doctor
+        rating = ScratchVar(TealType.uint64)
+        rate_doctor = Seq([
+            Assert(Txn.application_args.length() == Int(3)),  # action, doctor_addr, rating
+            Assert(Len(Txn.application_args[1]) == Int(32)),
+            profile.store(App.localGet(Int(0), profile_key)),
+            Assert(GetByte(profile.load(), Int(USER_TYPE_OFFSET)) == Int(2)),  # Must be patient
+
+            # Get rating value (1-5)
+            rating.store(Btoi(Txn.application_args[2])),
+            Assert(And(rating.load() >= Int(1), rating.load() <= Int(5))),
+
+            profile.store(SetByte(profile.load(), Int(LAST_RATING_OFFSET), rating.load())),
+            profile.store(Replace(profile.load(), Int(RATED_DOCTOR_OFFSET), Txn.application_args[1])),
+            App.localPut(Int(0), profile_key, profile.load()),
+
+            Approve()
+        ])
+
+        # Set emergency status
+        emergency_status = ScratchVar(TealType.uint64)
+        set_emergency = Seq([
+            Assert(Txn.application_args.length() == Int(2)),  # action, emergency_status
+            Assert(user_type() == Int(2)),  # Must be patient
+
+            emergency_status.store(Btoi(Txn.application_args[1])),
+            Assert(Or(emergency_status.load() == Int(0), emergency_status.load() == Int(1))),  # 0 or 1
+
+            App.localPut(
+                Int(0),
+                profile_key,
+                SetByte(App.localGet(Int(0), profile_key), Int(EMERGENCY_STATUS_OFFSET), emergency_status.load()),
+            ),
+            Approve()
+        ])
+
+        return {
+            "register_doctor": register_doctor,
+            "register_patient": register_patient,
+            "submit_pow": submit_pow,
+            "rate_doctor": rate_doctor,
+            "set_emergency": set_emergency,
+        }
+
+
+if __name__ == "__main__":
+    contract = MedicalConnectPackedContract()
+    approval_teal, clear_teal = contract.compile_contracts()
+
+    print("=== APPROVAL PROGRAM ===")
+    print(approval_teal)
+    print("\n=== CLEAR STATE PROGRAM ===")
+    print(clear_teal)
+
+    # Same ABI as the unpacked layout
+    methods = ContractMethods.get_methods()
+    abi = {
+        "name": "MedicalConnectPackedContract",
+        "methods": [method.dict() for method in methods],
+        "networks": {},
+        "events": []
+    }
+
+    print("\n=== ABI ===")
+    print(json.dumps(abi, indent=2))
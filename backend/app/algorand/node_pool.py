@@ -0,0 +1,405 @@
+"""Health-scored pools of algod/indexer endpoints.
+
+Every request is timed and recorded against the endpoint that served it.
+Endpoints are ranked by median latency over a sliding window, inflated by
+their recent error rate. An endpoint left idle for ``probe_after`` seconds
+is probed in the background (``/health``) and the probe's answer replaces
+its stale window, so user requests are never spent on rediscovering a
+degraded node.
+
+Reads are hedged. The request goes to the best endpoint first. If that
+endpoint has not answered within its own p95 latency (clamped to
+``[hedge_min_delay, hedge_max_delay]``), the same request also goes to the
+runner-up. The first answer wins.
+
+Writes go to the best endpoint and fail over down the ranking on transport
+errors. Submitting the same signed transaction twice is harmless.
+
+After ``eject_after`` consecutive node failures an endpoint is ejected for
+``eject_seconds``. Then it is re-admitted on probation: one more failure
+ejects it again.
+
+Only transport errors and 5xx responses count as node failures. A 4xx is a
+real answer, e.g. a rejected transaction or an unknown account.
+
+``PooledAlgodClient`` and ``PooledIndexerClient`` are drop-in replacements
+for the SDK clients, so ``MedicalConnectClient`` and algokit use them
+unchanged.
+"""
+
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+import socket
+import threading
+import time
+from typing import Any, Callable, Deque, Dict, List, Optional
+import urllib.error
+
+from algosdk.error import AlgodHTTPError, IndexerHTTPError
+from algosdk.v2client.algod import AlgodClient
+from algosdk.v2client.indexer import IndexerClient
+
+from ..config import settings
+
+
+# Pending-pool lookups only make sense on the node that accepted the transaction,
+# and long polls are slow by design; neither is hedged
+STICKY_PREFIXES = ("/transactions/pending",)
+UNHEDGED_PREFIXES = ("/status/wait-for-block-after",)
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def _hedge_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=32, thread_name_prefix="node-pool")
+        return _executor
+
+
+def _indexer_status(exc: IndexerHTTPError) -> Optional[int]:
+    """HTTP status behind an IndexerHTTPError.
+
+    The SDK raises it while handling the original urllib HTTPError (directly,
+    or via a JSONDecodeError when the error body is not JSON), so the status
+    is found on the exception context chain.
+    """
+    context = exc.__context__
+    while context is not None:
+        if isinstance(context, urllib.error.HTTPError):
+            return context.code
+        context = context.__context__
+    return None
+
+
+def is_node_failure(exc: BaseException) -> bool:
+    """True if `exc` says the node is unhealthy rather than answering"""
+    if isinstance(exc, AlgodHTTPError):
+        return exc.code is None or exc.code >= 500
+    if isinstance(exc, IndexerHTTPError):
+        status = _indexer_status(exc)
+        return status is None or status >= 500
+    return isinstance(exc, (urllib.error.URLError, socket.timeout, TimeoutError, ConnectionError))
+
+
+class Endpoint:
+    """One node and its recent health"""
+
+    def __init__(self, url: str, client: Any, window: int = 200):
+        self.url = url
+        self.client = client
+        self.latencies: Deque[float] = deque(maxlen=window)
+        self.outcomes: Deque[bool] = deque(maxlen=window)
+        self.last_used = 0.0
+        self.probing = False
+        self.consecutive_failures = 0
+        self.ejected_until = 0.0
+        self.ejections = 0
+
+    def ejected(self, now: float) -> bool:
+        return now < self.ejected_until
+
+    def error_rate(self) -> float:
+        if not self.outcomes:
+            return 0.0
+        return self.outcomes.count(False) / len(self.outcomes)
+
+    def quantile(self, q: float, min_samples: int = 5) -> Optional[float]:
+        if len(self.latencies) < min_samples:
+            return None
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * q))]
+
+    def idle(self, now: float, probe_after: float) -> bool:
+        return not self.outcomes or now - self.last_used > probe_after
+
+    def score(self) -> float:
+        """Typical latency in seconds, inflated by the error rate (lower is better)
+
+        Untried endpoints score infinity until their first probe answers.
+        """
+        median = self.quantile(0.5, min_samples=1)
+        if median is None:
+            return float("inf")
+        return median * (1.0 + 10.0 * self.error_rate())
+
+    def as_dict(self, now: float) -> Dict[str, Any]:
+        p50, p95 = self.quantile(0.5, min_samples=1), self.quantile(0.95)
+        return {
+            "url": self.url,
+            "ejected": self.ejected(now),
+            "p50_ms": round(p50 * 1000, 1) if p50 is not None else None,
+            "p95_ms": round(p95 * 1000, 1) if p95 is not None else None,
+            "error_rate": round(self.error_rate(), 3),
+            "ejections": self.ejections,
+        }
+
+
+class NodePool:
+    def __init__(
+        self,
+        endpoints: List[Endpoint],
+        hedge_quantile: float = 0.95,
+        hedge_min_delay: float = 0.02,
+        hedge_max_delay: float = 2.0,
+        eject_after: int = 3,
+        eject_seconds: float = 30.0,
+        probe_after: float = 10.0,
+        probe: Callable[[Any], Any] = lambda client: client.health(),
+    ):
+        if not endpoints:
+            raise ValueError("A node pool needs at least one endpoint")
+        self.endpoints = endpoints
+        self.hedge_quantile = hedge_quantile
+        self.hedge_min_delay = hedge_min_delay
+        self.hedge_max_delay = hedge_max_delay
+        self.eject_after = eject_after
+        self.eject_seconds = eject_seconds
+        self.probe_after = probe_after
+        self.probe = probe
+        self.hedges = 0
+        self.hedge_wins = 0
+        self._sticky: Optional[Endpoint] = None
+        self._lock = threading.Lock()
+
+    def ranked(self) -> List[Endpoint]:
+        """Admitted endpoints, best first; if all are ejected, the one due back soonest"""
+        now = time.monotonic()
+        with self._lock:
+            stale = [
+                e for e in self.endpoints
+                if not e.probing and not e.ejected(now) and e.idle(now, self.probe_after)
+            ]
+            for endpoint in stale:
+                endpoint.probing = True
+                endpoint.last_used = now
+            admitted = [e for e in self.endpoints if not e.ejected(now)]
+            if not admitted:
+                ranked = [min(self.endpoints, key=lambda e: e.ejected_until)]
+            else:
+                # Stable sort: untried endpoints keep their configured order
+                ranked = sorted(admitted, key=lambda e: e.score())
+        for endpoint in stale:
+            _hedge_executor().submit(self._probe, endpoint, now)
+        return ranked
+
+    def _probe(self, endpoint: Endpoint, dispatched: float) -> None:
+        """Refresh an idle endpoint's numbers with a health check"""
+        start = time.perf_counter()
+        try:
+            self.probe(endpoint.client)
+            ok = True
+        except Exception as e:
+            ok = not is_node_failure(e)
+        elapsed = time.perf_counter() - start
+        with self._lock:
+            # The window predates the idle spell, so the probe's answer replaces
+            # it, unless user requests have refreshed it in the meantime
+            if endpoint.last_used == dispatched:
+                endpoint.latencies.clear()
+                endpoint.outcomes.clear()
+            endpoint.probing = False
+        self.record(endpoint, elapsed, ok)
+
+    def record(self, endpoint: Endpoint, elapsed: float, ok: bool) -> None:
+        with self._lock:
+            endpoint.outcomes.append(ok)
+            endpoint.last_used = time.monotonic()
+            if ok:
+                endpoint.latencies.append(elapsed)
+                endpoint.consecutive_failures = 0
+                return
+            endpoint.consecutive_failures += 1
+            # Re-admitted endpoints stay at the threshold, so one more failure ejects them
+            if endpoint.consecutive_failures >= self.eject_after:
+                endpoint.consecutive_failures = self.eject_after - 1
+                endpoint.ejected_until = time.monotonic() + self.eject_seconds
+                endpoint.ejections += 1
+
+    def hedge_delay(self, endpoint: Endpoint) -> float:
+        with self._lock:
+            delay = endpoint.quantile(self.hedge_quantile)
+        if delay is None:
+            return self.hedge_max_delay
+        return min(self.hedge_max_delay, max(self.hedge_min_delay, delay))
+
+    def _timed(self, endpoint: Endpoint, call: Callable[[Any], Any]) -> Any:
+        with self._lock:
+            # In flight counts as used, so no probe is scheduled behind this call
+            endpoint.last_used = time.monotonic()
+        start = time.perf_counter()
+        try:
+            result = call(endpoint.client)
+        except Exception as e:
+            # Answers such as 404s are still healthy responses
+            failed = is_node_failure(e)
+            self.record(endpoint, time.perf_counter() - start, not failed)
+            raise
+        self.record(endpoint, time.perf_counter() - start, True)
+        return result
+
+    def call_on(self, endpoint: Endpoint, call: Callable[[Any], Any]) -> Any:
+        return self._timed(endpoint, call)
+
+    def read(self, call: Callable[[Any], Any]) -> Any:
+        """Run `call(client)` on the best endpoint, hedging to the runner-up"""
+        ranked = self.ranked()
+        if len(ranked) == 1:
+            return self._timed(ranked[0], call)
+
+        executor = _hedge_executor()
+        primary, secondary = ranked[0], ranked[1]
+        first = executor.submit(self._timed, primary, call)
+        done, _ = wait([first], timeout=self.hedge_delay(primary))
+        error: Optional[BaseException] = None
+        if done:
+            error = first.exception()
+            if error is None or not is_node_failure(error):
+                return first.result()
+
+        # Primary is slow (or already failed): race the runner-up against it
+        self.hedges += 1
+        pending = set() if done else {first}
+        second = executor.submit(self._timed, secondary, call)
+        pending.add(second)
+        while pending:
+            finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in finished:
+                exc = future.exception()
+                if exc is None or not is_node_failure(exc):
+                    if future is second:
+                        self.hedge_wins += 1
+                    return future.result()
+                error = exc
+        raise error
+
+    def write(self, call: Callable[[Any], Any]) -> Any:
+        """Run `call(client)` on the best endpoint, failing over on node failures"""
+        error: Optional[BaseException] = None
+        for endpoint in self.ranked():
+            try:
+                result = self._timed(endpoint, call)
+            except Exception as e:
+                if not is_node_failure(e):
+                    raise
+                error = e
+                continue
+            self._sticky = endpoint
+            return result
+        raise error
+
+    def sticky(self, call: Callable[[Any], Any]) -> Any:
+        """Run `call(client)` on the endpoint that took the last write"""
+        endpoint = self._sticky
+        if endpoint is None or endpoint.ejected(time.monotonic()):
+            return self.read(call)
+        return self._timed(endpoint, call)
+
+    def health(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        with self._lock:
+            return {
+                "endpoints": [e.as_dict(now) for e in self.endpoints],
+                "hedges": self.hedges,
+                "hedge_wins": self.hedge_wins,
+            }
+
+
+class PooledAlgodClient(AlgodClient):
+    """AlgodClient whose requests are spread over a NodePool"""
+
+    def __init__(self, pool: NodePool):
+        primary = pool.endpoints[0].client
+        super().__init__(primary.algod_token, primary.algod_address, primary.headers)
+        self.pool = pool
+
+    def algod_request(self, method, requrl, params=None, data=None, headers=None,
+                      response_format="json", timeout=30):
+        def call(client: AlgodClient) -> Any:
+            return AlgodClient.algod_request(
+                client, method, requrl, params, data, headers, response_format, timeout
+            )
+
+        if method != "GET":
+            return self.pool.write(call)
+        if requrl.startswith(STICKY_PREFIXES):
+            return self.pool.sticky(call)
+        if requrl.startswith(UNHEDGED_PREFIXES):
+            return self.pool.call_on(self.pool.ranked()[0], call)
+        return self.pool.read(call)
+
+
+class PooledIndexerClient(IndexerClient):
+    """IndexerClient whose (read-only) requests are hedged over a NodePool"""
+
+    def __init__(self, pool: NodePool):
+        primary = pool.endpoints[0].client
+        super().__init__(primary.indexer_token, primary.indexer_address, primary.headers)
+        self.pool = pool
+
+    def indexer_request(self, method, requrl, params=None, data=None, headers=None, timeout=30):
+        def call(client: IndexerClient) -> Any:
+            return IndexerClient.indexer_request(client, method, requrl, params, data, headers, timeout)
+
+        return self.pool.read(call)
+
+
+def parse_urls(urls: str, fallback: str) -> List[str]:
+    found = [url.strip().rstrip("/") for url in urls.split(",") if url.strip()]
+    return found or [fallback]
+
+
+def create_pool(urls: List[str], client_factory: Callable[[str], Any]) -> NodePool:
+    return NodePool(
+        [Endpoint(url, client_factory(url)) for url in urls],
+        hedge_quantile=settings.node_hedge_quantile,
+        hedge_min_delay=settings.node_hedge_min_delay_ms / 1000,
+        hedge_max_delay=settings.node_hedge_max_delay_ms / 1000,
+        eject_after=settings.node_eject_after_failures,
+        eject_seconds=settings.node_eject_seconds,
+        probe_after=settings.node_probe_seconds,
+    )
+
+
+_algod_pool: Optional[NodePool] = None
+_indexer_pool: Optional[NodePool] = None
+
+
+def algod_pool() -> NodePool:
+    global _algod_pool
+    if _algod_pool is None:
+        _algod_pool = create_pool(
+            parse_urls(settings.algod_urls, settings.algod_url),
+            lambda url: AlgodClient(settings.algod_token, url),
+        )
+    return _algod_pool
+
+
+def indexer_pool() -> NodePool:
+    global _indexer_pool
+    if _indexer_pool is None:
+        _indexer_pool = create_pool(
+            parse_urls(settings.indexer_urls, settings.indexer_url),
+            lambda url: IndexerClient(settings.algod_token, url),
+        )
+    return _indexer_pool
+
+
+def create_algod_client() -> PooledAlgodClient:
+    """Algod client over ALGOD_URLS (or ALGOD_URL)"""
+    return PooledAlgodClient(algod_pool())
+
+
+def create_indexer_client() -> PooledIndexerClient:
+    """Indexer client over INDEXER_URLS (or INDEXER_URL)"""
+    return PooledIndexerClient(indexer_pool())
+
+
+def shutdown_executor() -> None:
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False, cancel_futures=True)
+            _executor = None
@@ -0,0 +1,171 @@
+"""Packed local-state layout shared by the packed contract and the Python client.
+
+All fixed-width per-account fields live in a single byte-string under
+``PROFILE_KEY``. Integers are big-endian so the contract can read and write
+them with ``extract_uint64``/``itob`` + ``replace``. Variable-length text
+(``name``, ``specialization``, ``treatment_desc``) stays in its own key.
+"""
+
+import struct
+from typing import Any, Dict, Mapping, Optional, Union
+
+from algosdk.encoding import encode_address
+
+
+PROFILE_KEY = b"p"
+
+# Byte offsets inside the profile slot
+USER_TYPE_OFFSET = 0
+EMERGENCY_STATUS_OFFSET = 1
+POW_STATUS_OFFSET = 2
+LAST_RATING_OFFSET = 3
+RATING_SUM_OFFSET = 4
+RATING_COUNT_OFFSET = 12
+CONSULTATIONS_COUNT_OFFSET = 20
+POW_ID_OFFSET = 28
+TIMESTAMP_OFFSET = 36
+PATIENT_ADDR_OFFSET = 44
+RATED_DOCTOR_OFFSET = 76
+PROFILE_SIZE = 108
+
+PROFILE_STRUCT = struct.Struct(">BBBBQQQQQ32s32s")
+assert PROFILE_STRUCT.size == PROFILE_SIZE
+
+_U8 = struct.Struct(">B")
+_U64 = struct.Struct(">Q")
+_ZERO_ADDRESS = bytes(32)
+
+# Text keys kept outside the packed slot
+TEXT_KEYS = (b"name", b"specialization", b"treatment_desc")
+
+
+class ProfileView:
+    """Read-only, zero-copy view over a packed profile slot.
+
+    Fields are unpacked on access straight from the underlying buffer, so
+    reading one counter does not decode (or copy) the rest of the slot.
+    """
+
+    __slots__ = ("_buf",)
+
+    def __init__(self, data: Union[bytes, bytearray, memoryview]):
+        buf = data if isinstance(data, memoryview) else memoryview(data)
+        if buf.nbytes != PROFILE_SIZE:
+            raise ValueError(f"Packed profile must be {PROFILE_SIZE} bytes, got {buf.nbytes}")
+        self._buf = buf
+
+    def _u8(self, offset: int) -> int:
+        return _U8.unpack_from(self._buf, offset)[0]
+
+    def _u64(self, offset: int) -> int:
+        return _U64.unpack_from(self._buf, offset)[0]
+
+    def _address(self, offset: int) -> str:
+        raw = self._buf[offset:offset + 32]
+        if raw == _ZERO_ADDRESS:
+            return ""
+        return encode_address(raw.tobytes())
+
+    @property
+    def user_type(self) -> int:
+        return self._u8(USER_TYPE_OFFSET)
+
+    @property
+    def emergency_status(self) -> int:
+        return self._u8(EMERGENCY_STATUS_OFFSET)
+
+    @property
+    def pow_status(self) -> int:
+        return self._u8(POW_STATUS_OFFSET)
+
+    @property
+    def last_rating(self) -> int:
+        return self._u8(LAST_RATING_OFFSET)
+
+    @property
+    def rating_sum(self) -> int:
+        return self._u64(RATING_SUM_OFFSET)
+
+    @property
+    def rating_count(self) -> int:
+        return self._u64(RATING_COUNT_OFFSET)
+
+    @property
+    def consultations_count(self) -> int:
+        return self._u64(CONSULTATIONS_COUNT_OFFSET)
+
+    @property
+    def pow_id(self) -> int:
+        return self._u64(POW_ID_OFFSET)
+
+    @property
+    def timestamp(self) -> int:
+        return self._u64(TIMESTAMP_OFFSET)
+
+    @property
+    def patient_addr(self) -> str:
+        return self._address(PATIENT_ADDR_OFFSET)
+
+    @property
+    def rated_doctor(self) -> str:
+        return self._address(RATED_DOCTOR_OFFSET)
+
+
+def encode_profile(
+    user_type: int = 0,
+    emergency_status: int = 0,
+    pow_status: int = 0,
+    last_rating: int = 0,
+    rating_sum: int = 0,
+    rating_count: int = 0,
+    consultations_count: int = 0,
+    pow_id: int = 0,
+    timestamp: int = 0,
+    patient_addr: bytes = _ZERO_ADDRESS,
+    rated_doctor: bytes = _ZERO_ADDRESS,
+) -> bytes:
+    """Build a packed profile slot (addresses as raw 32-byte public keys)"""
+    return PROFILE_STRUCT.pack(
+        user_type,
+        emergency_status,
+        pow_status,
+        last_rating,
+        rating_sum,
+        rating_count,
+        consultations_count,
+        pow_id,
+        timestamp,
+        patient_addr,
+        rated_doctor,
+    )
+
+
+def _text(value: Optional[Union[bytes, str]]) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, bytes):
+        return value.decode("utf-8", errors="replace")
+    return value
+
+
+def decode_user_info(local_state: Mapping[bytes, Union[bytes, int]]) -> Dict[str, Any]:
+    """Decode raw local state (``get_local_state(raw=True)``) into user info.
+
+    Returns the same shape as ``MedicalConnectClient.get_user_info`` for the
+    unpacked layout.
+    """
+    packed = local_state.get(PROFILE_KEY) if local_state else None
+    if not isinstance(packed, (bytes, bytearray, memoryview)):
+        return {"user_type": 0, "registered": False}
+
+    profile = ProfileView(packed)
+    return {
+        "user_type": profile.user_type,
+        "name": _text(local_state.get(b"name")),
+        "specialization": _text(local_state.get(b"specialization")),
+        "rating_sum": profile.rating_sum,
+        "rating_count": profile.rating_count,
+        "consultations_count": profile.consultations_count,
+        "emergency_status": profile.emergency_status,
+        "registered": True
+    }
@@ -0,0 +1,297 @@
+"""Columnar export of consultation, rating and emergency events.
+
+Application calls to the Medical Connect app are read from the indexer,
+decoded into one flat event schema and written as Parquet, partitioned by
+UTC day (``day=YYYY-MM-DD/``). Exports are incremental: the last exported
+round is kept in ``_export_state.json`` next to the data, and each run only
+asks the indexer for newer rounds.
+
+Usage (from the backend directory)::
+
+    python -m app.analytics export --out exports/events --app-id 123
+    python -m app.analytics report --out exports/events consultations --since 2026-10-01
+
+Requires ``pyarrow``.
+"""
+
+import argparse
+import base64
+from datetime import date
+import json
+import os
+import sys
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+
+from algosdk.encoding import encode_address
+
+from .config import settings
+
+
+EVENT_SCHEMA = pa.schema([
+    ("round", pa.int64()),
+    ("time", pa.timestamp("s", tz="UTC")),
+    ("txid", pa.string()),
+    ("kind", pa.dictionary(pa.int8(), pa.string())),  # pow | rating | emergency
+    ("actor", pa.string()),         # doctor (pow), patient (rating, emergency)
+    ("counterparty", pa.string()),  # patient (pow), doctor (rating), "" (emergency)
+    ("value", pa.int64()),          # treatment timestamp (pow), 1-5 (rating), 0/1 (emergency)
+    ("day", pa.date32()),
+])
+
+ACTIONS = {
+    b"submit_pow": "pow",
+    b"rate_doctor": "rating",
+    b"set_emergency": "emergency",
+}
+
+STATE_FILE = "_export_state.json"
+PARTITIONING = ds.partitioning(pa.schema([("day", pa.date32())]), flavor="hive")
+
+
+def _address_arg(raw: bytes) -> str:
+    # Packed layout sends raw public keys, the per-key layout address strings
+    if len(raw) == 32:
+        return encode_address(raw)
+    return raw.decode("utf-8", errors="replace")
+
+
+def decode_event(txn: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Flatten one indexer application-call transaction, or None if irrelevant"""
+    call = txn.get("application-transaction") or {}
+    args = [base64.b64decode(arg) for arg in call.get("application-args", [])]
+    if not args or args[0] not in ACTIONS:
+        return None
+    kind = ACTIONS[args[0]]
+    try:
+        if kind == "pow":
+            counterparty, value = _address_arg(args[1]), int.from_bytes(args[3], "big")
+        elif kind == "rating":
+            counterparty, value = _address_arg(args[1]), int.from_bytes(args[2], "big")
+        else:
+            counterparty, value = "", int.from_bytes(args[1], "big")
+    except IndexError:
+        return None
+    return {
+        "round": txn["confirmed-round"],
+        "time": txn["round-time"],
+        "txid": txn["id"],
+        "kind": kind,
+        "actor": txn["sender"],
+        "counterparty": counterparty,
+        "value": value,
+    }
+
+
+def iter_app_transactions(indexer_client, app_id: int, min_round: int, page_size: int = 1000) -> Iterator[Dict[str, Any]]:
+    """Page through all application calls to `app_id` from `min_round` on"""
+    next_page = None
+    while True:
+        page = indexer_client.search_transactions(
+            application_id=app_id,
+            txn_type="appl",
+            min_round=min_round,
+            limit=page_size,
+            next_page=next_page,
+        )
+        transactions = page.get("transactions", [])
+        yield from transactions
+        next_page = page.get("next-token")
+        if not next_page or not transactions:
+            return
+
+
+def iter_event_batches(transactions: Iterable[Dict[str, Any]], batch_size: int = 65_536) -> Iterator[pa.RecordBatch]:
+    """Decode transactions into column buffers and emit fixed-size record batches"""
+    columns: Dict[str, List[Any]] = {name: [] for name in EVENT_SCHEMA.names if name != "day"}
+
+    def flush() -> pa.RecordBatch:
+        times = pa.array(columns["time"], type=pa.int64()).cast(pa.timestamp("s", tz="UTC"))
+        arrays = [
+            pa.array(columns["round"], type=pa.int64()),
+            times,
+            pa.array(columns["txid"], type=pa.string()),
+            pa.array(columns["kind"], type=pa.string()).dictionary_encode().cast(EVENT_SCHEMA.field("kind").type),
+            pa.array(columns["actor"], type=pa.string()),
+            pa.array(columns["counterparty"], type=pa.string()),
+            pa.array(columns["value"], type=pa.int64()),
+            times.cast(pa.date32()),
+        ]
+        for values in columns.values():
+            values.clear()
+        return pa.RecordBatch.from_arrays(arrays, schema=EVENT_SCHEMA)
+
+    for txn in transactions:
+        event = decode_event(txn)
+        if event is None:
+            continue
+        for name, value in event.items():
+            columns[name].append(value)
+        if len(columns["round"]) >= batch_size:
+            yield flush()
+    if columns["round"]:
+        yield flush()
+
+
+def load_state(out_dir: str) -> Dict[str, Any]:
+    try:
+        with open(os.path.join(out_dir, STATE_FILE)) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {"last_round": 0}
+
+
+def save_state(out_dir: str, state: Dict[str, Any]) -> None:
+    tmp = os.path.join(out_dir, STATE_FILE + ".tmp")
+    with open(tmp, "w") as f:
+        json.dump(state, f)
+    os.replace(tmp, os.path.join(out_dir, STATE_FILE))
+
+
+def export_events(transactions: Iterable[Dict[str, Any]], out_dir: str, since_round: int = 0) -> Dict[str, Any]:
+    """Append events from `transactions` (rounds > `since_round`) to the dataset"""
+    os.makedirs(out_dir, exist_ok=True)
+    stats = {"events": 0, "first_round": None, "last_round": since_round}
+
+    def tracked(batches: Iterator[pa.RecordBatch]) -> Iterator[pa.RecordBatch]:
+        for batch in batches:
+            rounds = batch.column("round")
+            stats["events"] += batch.num_rows
+            if stats["first_round"] is None:
+                stats["first_round"] = pc.min(rounds).as_py()
+            stats["last_round"] = max(stats["last_round"], pc.max(rounds).as_py())
+            yield batch
+
+    # One file set per run: names carry the starting round so runs never collide
+    ds.write_dataset(
+        tracked(iter_event_batches(transactions)),
+        out_dir,
+        schema=EVENT_SCHEMA,
+        format="parquet",
+        partitioning=PARTITIONING,
+        basename_template=f"events-r{since_round + 1}-{{i}}.parquet",
+        existing_data_behavior="overwrite_or_ignore",
+        max_rows_per_group=1 << 20,
+    )
+    return stats
+
+
+def run_export(out_dir: str, indexer_client, app_id: int) -> Dict[str, Any]:
+    """Incremental export: only rounds after the last exported one"""
+    state = load_state(out_dir)
+    if state.get("app_id") not in (None, app_id):
+        raise ValueError(f"{out_dir} holds events for app {state['app_id']}, not {app_id}")
+    since_round = state["last_round"]
+    stats = export_events(
+        iter_app_transactions(indexer_client, app_id, since_round + 1), out_dir, since_round
+    )
+    save_state(out_dir, {"app_id": app_id, "last_round": stats["last_round"]})
+    return stats
+
+
+def open_events(out_dir: str) -> ds.Dataset:
+    return ds.dataset(out_dir, format="parquet", partitioning=PARTITIONING, schema=EVENT_SCHEMA)
+
+
+def _events(out_dir: str, kind: str, since: Optional[date] = None, until: Optional[date] = None,
+            columns: Optional[List[str]] = None) -> pa.Table:
+    condition = pc.field("kind") == kind
+    if since is not None:
+        condition &= pc.field("day") >= pa.scalar(since, pa.date32())
+    if until is not None:
+        condition &= pc.field("day") <= pa.scalar(until, pa.date32())
+    return open_events(out_dir).to_table(columns=columns, filter=condition)
+
+
+def consultations_per_doctor(out_dir: str, since: Optional[date] = None, until: Optional[date] = None) -> pa.Table:
+    """Consultations (PoW submissions) per doctor per day"""
+    table = _events(out_dir, "pow", since, until, columns=["day", "actor"])
+    return (
+        table.group_by(["day", "actor"]).aggregate([("actor", "count")])
+        .rename_columns(["day", "doctor", "consultations"])
+        .sort_by([("day", "ascending"), ("consultations", "descending")])
+    )
+
+
+def rating_distribution(out_dir: str, since: Optional[date] = None, until: Optional[date] = None) -> pa.Table:
+    """Per doctor: number of ratings, mean and count of each star value"""
+    table = _events(out_dir, "rating", since, until, columns=["counterparty", "value"])
+    for star in range(1, 6):
+        table = table.append_column(f"stars_{star}", pc.cast(pc.equal(table["value"], star), pa.int64()))
+    return (
+        table.group_by("counterparty")
+        .aggregate([("value", "count"), ("value", "mean")] + [(f"stars_{s}", "sum") for s in range(1, 6)])
+        .rename_columns(["doctor", "ratings", "mean_rating"] + [f"stars_{s}" for s in range(1, 6)])
+        .sort_by([("ratings", "descending")])
+    )
+
+
+def emergency_response_times(out_dir: str, since: Optional[date] = None, until: Optional[date] = None) -> pa.Table:
+    """Seconds from each emergency being raised to the next PoW for that patient"""
+    emergencies = _events(out_dir, "emergency", since, until, columns=["txid", "actor", "time", "value"])
+    emergencies = emergencies.filter(pc.equal(emergencies["value"], 1)).select(["txid", "actor", "time"])
+    pows = _events(out_dir, "pow", since, None, columns=["counterparty", "time"])
+    pows = pows.rename_columns(["actor", "treated_at"])
+
+    joined = emergencies.join(pows, keys="actor", join_type="inner")
+    joined = joined.filter(pc.greater_equal(joined["treated_at"], joined["time"]))
+    first = joined.group_by(["txid", "actor", "time"]).aggregate([("treated_at", "min")])
+    seconds = pc.subtract(
+        pc.cast(first["treated_at_min"], pa.int64()), pc.cast(first["time"], pa.int64())
+    )
+    return pa.table({
+        "patient": first["actor"],
+        "raised_at": first["time"],
+        "response_seconds": seconds,
+    }).sort_by("raised_at")
+
+
+QUERIES = {
+    "consultations": consultations_per_doctor,
+    "ratings": rating_distribution,
+    "emergency": emergency_response_times,
+}
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(prog="python -m app.analytics", description=__doc__.split("\n")[0])
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    export = sub.add_parser("export", help="Export new events from the indexer")
+    export.add_argument("--out", required=True, help="Dataset directory")
+    export.add_argument("--app-id", type=int, default=settings.medical_app_id)
+    export.add_argument("--indexer-url", help="Single indexer (default: the INDEXER_URLS pool)")
+    export.add_argument("--indexer-token", default=settings.algod_token)
+
+    report = sub.add_parser("report", help="Run a built-in aggregate query")
+    report.add_argument("--out", required=True, help="Dataset directory")
+    report.add_argument("query", choices=sorted(QUERIES))
+    report.add_argument("--since", type=date.fromisoformat)
+    report.add_argument("--until", type=date.fromisoformat)
+    report.add_argument("--limit", type=int, default=50)
+
+    args = parser.parse_args(argv)
+    if args.command == "export":
+        from algosdk.v2client.indexer import IndexerClient
+
+        from .algorand.node_pool import create_indexer_client
+
+        if not args.app_id:
+            parser.error("--app-id (or MEDICAL_APP_ID) is required")
+        if args.indexer_url:
+            indexer_client = IndexerClient(args.indexer_token, args.indexer_url)
+        else:
+            indexer_client = create_indexer_client()
+        stats = run_export(args.out, indexer_client, args.app_id)
+        print(json.dumps(stats))
+    else:
+        table = QUERIES[args.query](args.out, args.since, args.until)
+        for row in table.slice(0, args.limit).to_pylist():
+            print(json.dumps(row, default=str))
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,371 @@
+"""Streamed bulk onboarding of doctors and patients.
+
+Rows are parsed incrementally from the request body (CSV with a header row,
+or NDJSON), validated one at a time and registered in groups of up to
+``group_size`` rows (one atomic transaction group each) with at most
+``concurrency`` groups in flight. Per-row results are yielded as soon as
+their group completes.
+
+Progress is checkpointed per ``import_id``: the highest row below which every
+row has been processed, plus the few rows committed above it. Re-running an
+interrupted import with the same ``import_id`` skips everything already
+committed. Only one run of an ``import_id`` may be in progress on the host
+at a time. Checkpoint reads and writes run off the event loop.
+"""
+
+import asyncio
+import csv
+from dataclasses import dataclass, field
+from hashlib import blake2b
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows: runs are only exclusive within one process
+    fcntl = None
+
+from .config import settings
+
+
+ROLES = ("doctor", "patient")
+# Transactions per Algorand atomic group
+MAX_GROUP_SIZE = 16
+MAX_LINE_BYTES = 64 * 1024
+
+
+@dataclass
+class ImportRow:
+    row: int
+    role: str
+    name: str
+    wallet_address: str
+    specialization: Optional[str] = None
+
+
+GroupRegistrar = Callable[[List[ImportRow]], Awaitable[str]]
+
+
+class ImportFormatError(ValueError):
+    """Raised when the upload cannot be parsed as the declared format"""
+
+
+async def iter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    """Split a byte stream into decoded lines without buffering the whole body"""
+    buffer = b""
+    async for chunk in chunks:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            yield line.rstrip(b"\r").decode("utf-8")
+        if len(buffer) > MAX_LINE_BYTES:
+            raise ImportFormatError(f"Line longer than {MAX_LINE_BYTES} bytes")
+    if buffer.strip():
+        yield buffer.rstrip(b"\r").decode("utf-8")
+
+
+async def iter_records(lines: AsyncIterator[str], fmt: str) -> AsyncIterator[Tuple[int, Any]]:
+    """(row number, parsed record) pairs; rows are numbered from 1, headers excluded.
+
+    CSV rows are parsed one line at a time, so quoted fields must not contain
+    newlines. A record that fails to parse is yielded as the exception.
+    """
+    header: Optional[List[str]] = None
+    row = 0
+    async for line in lines:
+        if not line.strip():
+            continue
+        if fmt == "csv":
+            values = next(csv.reader([line]))
+            if header is None:
+                header = [value.strip().lower() for value in values]
+                continue
+            row += 1
+            yield row, dict(zip(header, values))
+        else:
+            row += 1
+            try:
+                yield row, json.loads(line)
+            except ValueError as e:
+                yield row, e
+
+
+def validate_row(row: int, record: Any) -> Tuple[Optional[ImportRow], Optional[str]]:
+    """Same checks as the single-registration endpoints; returns (row, error)"""
+    if isinstance(record, Exception):
+        return None, f"Malformed row: {record}"
+    if not isinstance(record, dict):
+        return None, "Row must be an object"
+
+    role = str(record.get("role") or "").strip().lower()
+    name = str(record.get("name") or "").strip()
+    wallet_address = str(record.get("wallet_address") or "").strip()
+    specialization = str(record.get("specialization") or "").strip()
+
+    if role not in ROLES:
+        return None, "Role must be 'doctor' or 'patient'"
+    if not name:
+        return None, "Name is required"
+    if role == "doctor" and not specialization:
+        return None, "Specialization is required"
+    if not wallet_address:
+        return None, "Wallet address is required"
+
+    return ImportRow(
+        row=row,
+        role=role,
+        name=name,
+        wallet_address=wallet_address,
+        specialization=specialization if role == "doctor" else None,
+    ), None
+
+
+@dataclass
+class Checkpoint:
+    committed_row: int = 0
+    committed_above: Set[int] = field(default_factory=set)
+
+    def is_committed(self, row: int) -> bool:
+        return row <= self.committed_row or row in self.committed_above
+
+    def mark(self, rows: List[int]) -> None:
+        self.committed_above.update(rows)
+        while self.committed_row + 1 in self.committed_above:
+            self.committed_row += 1
+            self.committed_above.discard(self.committed_row)
+
+
+class CheckpointStore:
+    """Import checkpoints in a SQLite file (shared by all workers on the host)
+
+    A run holds its ``import_id`` through ``claim``: a one-byte lock, at an
+    offset hashed from the id, in a lock file next to the database. The kernel
+    drops it if the worker dies, so a crashed run never blocks a resume.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        self._conn().execute(
+            "CREATE TABLE IF NOT EXISTS imports ("
+            "import_id TEXT PRIMARY KEY, committed_row INTEGER NOT NULL, "
+            "committed_above TEXT NOT NULL, updated_at REAL NOT NULL)"
+        )
+        self._claimed: Set[str] = set()
+        self._claims_lock = threading.Lock()
+        self._lock_fd = os.open(f"{path}.lock", os.O_RDWR | os.O_CREAT, 0o600) if fcntl is not None else None
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def load(self, import_id: str) -> Checkpoint:
+        found = self._conn().execute(
+            "SELECT committed_row, committed_above FROM imports WHERE import_id = ?", (import_id,)
+        ).fetchone()
+        if found is None:
+            return Checkpoint()
+        return Checkpoint(committed_row=found[0], committed_above=set(json.loads(found[1])))
+
+    def save(self, import_id: str, checkpoint: Checkpoint) -> None:
+        self._conn().execute(
+            "INSERT OR REPLACE INTO imports (import_id, committed_row, committed_above, updated_at) "
+            "VALUES (?, ?, ?, ?)",
+            (import_id, checkpoint.committed_row, json.dumps(sorted(checkpoint.committed_above)), time.time()),
+        )
+
+    @staticmethod
+    def _lock_offset(import_id: str) -> int:
+        return int.from_bytes(blake2b(import_id.encode(), digest_size=8).digest(), "big") >> 2
+
+    def claim(self, import_id: str) -> bool:
+        """Reserve `import_id` for one run; False if a run of it is in progress"""
+        with self._claims_lock:
+            # fcntl locks are per process, so runs within this worker are tracked here
+            if import_id in self._claimed:
+                return False
+            if self._lock_fd is not None:
+                try:
+                    fcntl.lockf(self._lock_fd, fcntl.LOCK_EX | fcntl.LOCK_NB, 1, self._lock_offset(import_id))
+                except OSError:
+                    return False
+            self._claimed.add(import_id)
+            return True
+
+    def release(self, import_id: str) -> None:
+        with self._claims_lock:
+            if import_id not in self._claimed:
+                return
+            self._claimed.discard(import_id)
+            if self._lock_fd is not None:
+                fcntl.lockf(self._lock_fd, fcntl.LOCK_UN, 1, self._lock_offset(import_id))
+
+
+class BulkImport:
+    """One run of an import: validate, group, dispatch and report"""
+
+    def __init__(
+        self,
+        import_id: str,
+        register_group: GroupRegistrar,
+        checkpoints: CheckpointStore,
+        group_size: int = 16,
+        concurrency: int = 4,
+    ):
+        self.import_id = import_id
+        self.register_group = register_group
+        self.checkpoints = checkpoints
+        if not 1 <= group_size <= MAX_GROUP_SIZE:
+            raise ValueError(f"group_size must be between 1 and {MAX_GROUP_SIZE}")
+        self.group_size = group_size
+        self.concurrency = concurrency
+        # Loaded when the run starts
+        self.checkpoint = Checkpoint()
+        self.counts = {"registered": 0, "invalid": 0, "failed": 0, "skipped": 0}
+        self._save_lock = asyncio.Lock()
+
+    async def _commit(self, rows: List[int]) -> None:
+        self.checkpoint.mark(rows)
+        # Saves are serialized and each writes a copy taken under the lock, so
+        # a slow save can never overwrite a newer checkpoint
+        async with self._save_lock:
+            snapshot = Checkpoint(self.checkpoint.committed_row, set(self.checkpoint.committed_above))
+            await asyncio.get_running_loop().run_in_executor(
+                None, self.checkpoints.save, self.import_id, snapshot
+            )
+
+    async def _dispatch(self, group: List[ImportRow], results: asyncio.Queue) -> None:
+        try:
+            tx_id = await self.register_group(group)
+            outcome = [
+                {"row": r.row, "status": "registered", "wallet_address": r.wallet_address,
+                 "role": r.role, "transaction_id": tx_id}
+                for r in group
+            ]
+            self.counts["registered"] += len(group)
+        except Exception as e:
+            # Failed rows are reported and not retried on resume; re-submit them separately
+            outcome = [
+                {"row": r.row, "status": "failed", "wallet_address": r.wallet_address, "error": str(e)}
+                for r in group
+            ]
+            self.counts["failed"] += len(group)
+        await self._commit([r.row for r in group])
+        for result in outcome:
+            await results.put(result)
+
+    async def _feed(self, records: AsyncIterator[Tuple[int, Any]], results: asyncio.Queue) -> None:
+        slots = asyncio.Semaphore(self.concurrency)
+        tasks: Set[asyncio.Task] = set()
+
+        async def submit(group: List[ImportRow]) -> None:
+            # Blocks reading further input while `concurrency` groups are in flight
+            await slots.acquire()
+
+            async def run() -> None:
+                try:
+                    await self._dispatch(group, results)
+                finally:
+                    slots.release()
+
+            task = asyncio.create_task(run())
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+
+        group: List[ImportRow] = []
+        error: Optional[BaseException] = None
+        try:
+            async for row, record in records:
+                if self.checkpoint.is_committed(row):
+                    self.counts["skipped"] += 1
+                    continue
+                parsed, row_error = validate_row(row, record)
+                if row_error is not None:
+                    self.counts["invalid"] += 1
+                    await self._commit([row])
+                    await results.put({"row": row, "status": "invalid", "error": row_error})
+                    continue
+                group.append(parsed)
+                if len(group) == self.group_size:
+                    await submit(group)
+                    group = []
+        except asyncio.CancelledError:
+            # Uncommitted groups are abandoned and picked up again on resume
+            for task in list(tasks):
+                task.cancel()
+            raise
+        except Exception as e:
+            # Unparseable input (ImportFormatError, UnicodeDecodeError, csv.Error) or
+            # the client went away mid-upload (ClientDisconnect). The rows read so
+            # far are still registered and checkpointed, so a resume starts after them.
+            error = e
+        try:
+            if group:
+                await submit(group)
+            if tasks:
+                await asyncio.gather(*tasks)
+        finally:
+            if error is not None:
+                await results.put({"status": "aborted", "error": str(error) or type(error).__name__})
+            await results.put(None)
+
+    async def run(self, records: AsyncIterator[Tuple[int, Any]]) -> AsyncIterator[Dict[str, Any]]:
+        """Yield a header, per-row results in completion order, then a summary"""
+        self.checkpoint = await asyncio.get_running_loop().run_in_executor(
+            None, self.checkpoints.load, self.import_id
+        )
+        yield {
+            "import_id": self.import_id,
+            "resume_after_row": self.checkpoint.committed_row,
+        }
+
+        results: asyncio.Queue = asyncio.Queue(maxsize=self.group_size * self.concurrency * 2)
+        feeder = asyncio.create_task(self._feed(records, results))
+        try:
+            while True:
+                if results.empty():
+                    if feeder.done():
+                        # The feeder died without queueing its end marker: never wait forever
+                        error = None if feeder.cancelled() else feeder.exception()
+                        yield {"status": "aborted", "error": str(error) if error else "Import stopped"}
+                        break
+                    getter = asyncio.ensure_future(results.get())
+                    await asyncio.wait({getter, feeder}, return_when=asyncio.FIRST_COMPLETED)
+                    if not getter.done():
+                        getter.cancel()
+                        continue
+                    result = getter.result()
+                else:
+                    result = results.get_nowait()
+                if result is None:
+                    break
+                yield result
+            if not feeder.cancelled():
+                await feeder
+        finally:
+            # Client went away: stop reading; committed groups are already checkpointed
+            feeder.cancel()
+
+        yield {"done": True, "committed_row": self.checkpoint.committed_row, **self.counts}
+
+
+_checkpoints: Optional[CheckpointStore] = None
+
+
+def checkpoint_store() -> CheckpointStore:
+    global _checkpoints
+    if _checkpoints is None:
+        _checkpoints = CheckpointStore(
+            settings.bulk_import_state_path
+            or os.path.join(tempfile.gettempdir(), "hosconnect-imports.db")
+        )
+    return _checkpoints
@@ -13,6 +13,57 @@ class Settings(BaseSettings):
         "https://testnet-idx.algonode.cloud", alias="INDEXER_URL"
     )
     algod_token: str = Field("", alias="ALGOD_TOKEN")
+    # Node pools: comma-separated endpoints (empty = just ALGOD_URL / INDEXER_URL)
+    algod_urls: str = Field("", alias="ALGOD_URLS")
+    indexer_urls: str = Field("", alias="INDEXER_URLS")
+    node_hedge_quantile: float = Field(0.95, alias="NODE_HEDGE_QUANTILE")
+    node_hedge_min_delay_ms: float = Field(20.0, alias="NODE_HEDGE_MIN_DELAY_MS")
+    node_hedge_max_delay_ms: float = Field(2000.0, alias="NODE_HEDGE_MAX_DELAY_MS")
+    node_eject_after_failures: int = Field(3, alias="NODE_EJECT_AFTER_FAILURES")
+    node_eject_seconds: float = Field(30.0, alias="NODE_EJECT_SECONDS")
+    node_probe_seconds: float = Field(10.0, alias="NODE_PROBE_SECONDS")
+    medical_app_id: int = Field(0, alias="MEDICAL_APP_ID")
+    # Signature verification pools (0 = size from CPU count)
+    verify_thread_workers: int = Field(0, alias="VERIFY_THREAD_WORKERS")
+    verify_process_workers: int = Field(0, alias="VERIFY_PROCESS_WORKERS")
+    verify_process_min_batch: int = Field(64, alias="VERIFY_PROCESS_MIN_BATCH")
+    verify_batch_max: int = Field(1000, alias="VERIFY_BATCH_MAX")
+    # Login nonces (empty path = per-process memory store)
+    nonce_ttl_seconds: int = Field(300, alias="NONCE_TTL_SECONDS")
+    nonce_bucket_seconds: int = Field(10, alias="NONCE_BUCKET_SECONDS")
+    nonce_max_outstanding: int = Field(1_000_000, alias="NONCE_MAX_OUTSTANDING")
+    nonce_store_path: str = Field("", alias="NONCE_STORE_PATH")
+    # Shared read model (empty path = <tmpdir>/hosconnect-read-model.bin)
+    read_model_path: str = Field("", alias="READ_MODEL_PATH")
+    read_model_slot_bytes: int = Field(8 * 1024 * 1024, alias="READ_MODEL_SLOT_BYTES")
+    read_model_refresh_seconds: float = Field(2.0, alias="READ_MODEL_REFRESH_SECONDS")
+    # Largest `limit` accepted by the paginated list endpoints
+    list_page_max: int = Field(1000, alias="LIST_PAGE_MAX")
+    # HTTP caching of read endpoints (s-maxage ~ one block)
+    cache_s_maxage: int = Field(3, alias="CACHE_S_MAXAGE")
+    cache_stale_while_revalidate: int = Field(30, alias="CACHE_STALE_WHILE_REVALIDATE")
+    # Doctor ratings: Bayesian prior (score of an unrated doctor) and its weight in ratings
+    rating_prior_mean: float = Field(3.5, alias="RATING_PRIOR_MEAN")
+    rating_prior_weight: float = Field(10.0, alias="RATING_PRIOR_WEIGHT")
+    rating_top_k_max: int = Field(100, alias="RATING_TOP_K_MAX")
+    # Ratings log shared by the host's workers (empty path = <tmpdir>/hosconnect-ratings.db)
+    rating_log_path: str = Field("", alias="RATING_LOG_PATH")
+    # Region sharding: this node's base URL and the peers to join (empty = single node)
+    shard_node_url: str = Field("", alias="SHARD_NODE_URL")
+    shard_peers: str = Field("", alias="SHARD_PEERS")
+    # Shared by every node; required when SHARD_NODE_URL is set
+    shard_secret: str = Field("", alias="SHARD_SECRET")
+    shard_geohash_precision: int = Field(4, alias="SHARD_GEOHASH_PRECISION")
+    shard_vnodes: int = Field(64, alias="SHARD_VNODES")
+    shard_forward_timeout_seconds: float = Field(5.0, alias="SHARD_FORWARD_TIMEOUT_SECONDS")
+    shard_dispatch_doctors: int = Field(3, alias="SHARD_DISPATCH_DOCTORS")
+    # Funded test-account pool (empty path = <tmpdir>/hosconnect-accounts.bin)
+    account_pool_path: str = Field("", alias="ACCOUNT_POOL_PATH")
+    # Bulk onboarding (empty path = <tmpdir>/hosconnect-imports.db)
+    # At most 16: Algorand's limit on transactions per atomic group
+    bulk_import_group_size: int = Field(16, ge=1, le=16, alias="BULK_IMPORT_GROUP_SIZE")
+    bulk_import_concurrency: int = Field(4, alias="BULK_IMPORT_CONCURRENCY")
+    bulk_import_state_path: str = Field("", alias="BULK_IMPORT_STATE_PATH")
 
     class Config:
         case_sensitive = False
@@ -0,0 +1,212 @@
+"""Offline resolution of free-text locations ("Brooklyn, NY") to coordinates.
+
+Coordinates come from the bundled gazetteer in ``app/data/gazetteer.tsv`` and
+are held in flat ``array('d')`` columns; lookups are dict hits on normalized
+names behind an LRU cache, so no geocoding service is called per request.
+"""
+
+from array import array
+from functools import lru_cache
+from math import asin, cos, radians, sin, sqrt
+from pathlib import Path
+import re
+from typing import Any, Dict, FrozenSet, Iterable, List, Optional, Tuple
+
+
+GAZETTEER_PATH = Path(__file__).parent / "data" / "gazetteer.tsv"
+EARTH_RADIUS_KM = 6371.0088
+
+US_STATES = {
+    "alabama": "al", "alaska": "ak", "arizona": "az", "arkansas": "ar",
+    "california": "ca", "colorado": "co", "connecticut": "ct", "delaware": "de",
+    "district of columbia": "dc", "florida": "fl", "georgia": "ga", "hawaii": "hi",
+    "idaho": "id", "illinois": "il", "indiana": "in", "iowa": "ia",
+    "kansas": "ks", "kentucky": "ky", "louisiana": "la", "maine": "me",
+    "maryland": "md", "massachusetts": "ma", "michigan": "mi", "minnesota": "mn",
+    "mississippi": "ms", "missouri": "mo", "montana": "mt", "nebraska": "ne",
+    "nevada": "nv", "new hampshire": "nh", "new jersey": "nj", "new mexico": "nm",
+    "new york": "ny", "north carolina": "nc", "north dakota": "nd", "ohio": "oh",
+    "oklahoma": "ok", "oregon": "or", "pennsylvania": "pa", "rhode island": "ri",
+    "south carolina": "sc", "south dakota": "sd", "tennessee": "tn", "texas": "tx",
+    "utah": "ut", "vermont": "vt", "virginia": "va", "washington": "wa",
+    "west virginia": "wv", "wisconsin": "wi", "wyoming": "wy",
+}
+
+CITY_ALIASES = {
+    "nyc": "new york",
+    "new york city": "new york",
+    "the bronx": "bronx",
+    "la": "los angeles",
+    "sf": "san francisco",
+    "washington dc": "washington",
+    "bangalore": "bengaluru",
+    "bombay": "mumbai",
+    "new delhi": "delhi",
+}
+
+_US_STATE_CODES = frozenset(US_STATES.values())
+
+_PUNCTUATION = re.compile(r"[^\w\s-]")
+_WHITESPACE = re.compile(r"[\s-]+")
+
+
+def normalize(text: str) -> str:
+    """Lowercase, drop punctuation and collapse whitespace/hyphens"""
+    text = _WHITESPACE.sub(" ", _PUNCTUATION.sub("", text.lower())).strip()
+    if text.startswith("st "):
+        text = "saint " + text[3:]
+    return text
+
+
+def _normalize_city(text: str) -> str:
+    city = normalize(text)
+    return CITY_ALIASES.get(city, city)
+
+
+def _normalize_region(text: str) -> str:
+    region = normalize(text)
+    return US_STATES.get(region, region)
+
+
+def distance_km(a: Tuple[float, float], b: Tuple[float, float]) -> float:
+    """Great-circle (haversine) distance between two (lat, lon) points"""
+    lat1, lon1 = radians(a[0]), radians(a[1])
+    lat2, lon2 = radians(b[0]), radians(b[1])
+    h = sin((lat2 - lat1) / 2) ** 2 + cos(lat1) * cos(lat2) * sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * asin(sqrt(h))
+
+
+class LocationResolver:
+    """Resolve free-text locations against the bundled gazetteer"""
+
+    def __init__(self, path: Path = GAZETTEER_PATH, cache_size: int = 4096):
+        self._lat = array("d")
+        self._lon = array("d")
+        self._by_place: Dict[Tuple[str, str], int] = {}
+        self._by_city: Dict[str, int] = {}
+        self._regions: List[str] = []
+        self._load(path)
+        self._known_regions = frozenset(self._regions)
+        self._find = lru_cache(maxsize=cache_size)(self._find_uncached)
+        self.regions_within = lru_cache(maxsize=cache_size)(self._regions_within_uncached)
+
+    def __len__(self) -> int:
+        return len(self._lat)
+
+    def _load(self, path: Path) -> None:
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                if not line.strip() or line.startswith("#"):
+                    continue
+                name, region, lat, lon = line.rstrip("\n").split("\t")
+                index = len(self._lat)
+                self._lat.append(float(lat))
+                self._lon.append(float(lon))
+                self._regions.append(_normalize_region(region))
+                city = _normalize_city(name)
+                self._by_place.setdefault((city, _normalize_region(region)), index)
+                # Earlier (larger) places win for queries without a region
+                self._by_city.setdefault(city, index)
+
+    def _is_region(self, region: str) -> bool:
+        """Whether `region` names a state/province/country, as opposed to free
+        text like "usa". Two-letter codes count even when the gazetteer has no
+        place there ("London, ON" must not become London, UK)."""
+        return region in self._known_regions or region in _US_STATE_CODES or (
+            len(region) == 2 and region.isalpha()
+        )
+
+    def _lookup(self, city: str, region: Optional[str]) -> Optional[int]:
+        if region is not None:
+            index = self._by_place.get((city, region))
+            if index is not None or self._is_region(region):
+                return index
+        return self._by_city.get(city)
+
+    def resolve(self, location: str) -> Optional[Tuple[float, float]]:
+        """(lat, lon) for a location string, or None if it is not in the gazetteer"""
+        index = self._find(location)
+        if index is None:
+            return None
+        return self._lat[index], self._lon[index]
+
+    def region(self, location: str) -> Optional[str]:
+        """Normalized region ("ny", "ca", ...) of a location, or None if unknown"""
+        index = self._find(location)
+        return None if index is None else self._regions[index]
+
+    def _regions_within_uncached(self, location: str, radius_km: float) -> Optional[FrozenSet[str]]:
+        """Regions with a gazetteer place within `radius_km` of `location`, or
+        None if it cannot be resolved.
+
+        Records are placed through the gazetteer, so a radius query can only
+        return records from these regions (distances rounded as in
+        rank_by_distance).
+        """
+        origin = self.resolve(location)
+        if origin is None:
+            return None
+        return frozenset(
+            self._regions[i]
+            for i in range(len(self._lat))
+            if round(distance_km(origin, (self._lat[i], self._lon[i])), 1) <= radius_km
+        )
+
+    def _find_uncached(self, location: str) -> Optional[int]:
+        """Gazetteer index for a location string.
+
+        Accepts "City, Region", "City Region" and bare "City" forms. Results
+        (including misses) are cached per raw input string.
+        """
+        parts = [part for part in (location or "").split(",") if part.strip()]
+        if not parts:
+            return None
+        if len(parts) >= 2:
+            index = self._lookup(_normalize_city(parts[0]), _normalize_region(parts[1]))
+        else:
+            text = normalize(parts[0])
+            index = self._by_city.get(CITY_ALIASES.get(text, text))
+            if index is None and " " in text:
+                # "Brooklyn NY" / "Portland Maine": try the trailing words as the region
+                words = text.split(" ")
+                for split in range(len(words) - 1, 0, -1):
+                    index = self._lookup(
+                        _normalize_city(" ".join(words[:split])),
+                        _normalize_region(" ".join(words[split:])),
+                    )
+                    if index is not None:
+                        break
+
+        return index
+
+
+def rank_by_distance(
+    records: Iterable[Dict[str, Any]],
+    origin: Optional[str],
+    radius_km: Optional[float] = None,
+    location_key: str = "location",
+) -> List[Dict[str, Any]]:
+    """Order records by distance from ``origin``, adding ``distance_km``
+
+    Records whose location cannot be resolved keep ``distance_km=None`` and
+    sort last (they are dropped when ``radius_km`` is given). If the origin
+    itself cannot be resolved, records are returned in their original order.
+    """
+    records = list(records)
+    origin_point = resolver.resolve(origin) if origin else None
+    if origin_point is None:
+        return records
+
+    ranked = []
+    for record in records:
+        point = resolver.resolve(record.get(location_key) or "")
+        distance = round(distance_km(origin_point, point), 1) if point is not None else None
+        if radius_km is not None and (distance is None or distance > radius_km):
+            continue
+        ranked.append({**record, "distance_km": distance})
+
+    ranked.sort(key=lambda record: (record["distance_km"] is None, record["distance_km"] or 0.0))
+    return ranked
+
+
+resolver = LocationResolver()
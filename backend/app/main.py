@@ -1,7 +1,12 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 import os
-from app.routers import auth, medical
+from app.routers import auth, cluster, medical
+from app.config import settings
+from app.algorand.node_pool import algod_pool, indexer_pool, shutdown_executor
+from app.read_model import read_model
+from app.sharding import cluster as shard_cluster
+from app.verification import shutdown_executors
 
 
 def create_app() -> FastAPI:
@@ -15,15 +20,30 @@ def create_app() -> FastAPI:
         allow_credentials=True,
         allow_methods=["*"],
         allow_headers=["*"],
+        expose_headers=["ETag", "X-Next-Cursor"],
     )
 
     app.include_router(auth.router)
     app.include_router(medical.router)
+    # Membership and handoff endpoints only exist on clustered nodes
+    if settings.shard_node_url:
+        app.include_router(cluster.router)
+
+    app.add_event_handler("startup", read_model.start)
+    app.add_event_handler("startup", shard_cluster.start)
+    app.add_event_handler("shutdown", shard_cluster.stop)
+    app.add_event_handler("shutdown", read_model.stop)
+    app.add_event_handler("shutdown", shutdown_executors)
+    app.add_event_handler("shutdown", shutdown_executor)
 
     @app.get("/health")
     def health_check() -> dict:
         return {"status": "ok", "service": "Medical Connect API"}
 
+    @app.get("/health/nodes")
+    def node_health() -> dict:
+        return {"algod": algod_pool().health(), "indexer": indexer_pool().health()}
+
     @app.get("/")
     def root() -> dict:
         return {
@@ -0,0 +1,198 @@
+"""Server-side store for login challenge nonces.
+
+Nonces are filed into time buckets of ``bucket_seconds``; a nonce is valid
+until its bucket falls out of the ``ttl_seconds`` window, at which point the
+whole bucket is dropped at once. ``consume`` is atomic, so each nonce can be
+redeemed exactly once.
+
+``MemoryNonceStore`` serves a single process. ``SQLiteNonceStore`` keeps the
+nonces in a local SQLite file so every uvicorn worker on the host shares them.
+"""
+
+import sqlite3
+import threading
+import time
+from typing import List, Optional, Set
+
+from .config import settings
+
+
+class NonceStoreFull(Exception):
+    """Raised when issuing a nonce would exceed the store's capacity"""
+
+
+class MemoryNonceStore:
+    """Ring of per-bucket sets; expiring a bucket is a single set swap"""
+
+    def __init__(self, ttl_seconds: int = 300, bucket_seconds: int = 10, max_nonces: int = 1_000_000):
+        self.bucket_seconds = bucket_seconds
+        self.max_nonces = max_nonces
+        # One extra bucket so the oldest live bucket is never the one being reused
+        self._ring_size = -(-ttl_seconds // bucket_seconds) + 1
+        self._buckets: List[Set[str]] = [set() for _ in range(self._ring_size)]
+        self._epochs: List[int] = [-1] * self._ring_size
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return self._size
+
+    def _epoch(self) -> int:
+        return int(time.time() // self.bucket_seconds)
+
+    def _live_bucket(self, epoch: int) -> Optional[Set[str]]:
+        slot = epoch % self._ring_size
+        return self._buckets[slot] if self._epochs[slot] == epoch else None
+
+    def issue(self, nonce: str) -> None:
+        with self._lock:
+            epoch = self._epoch()
+            slot = epoch % self._ring_size
+            if self._epochs[slot] != epoch:
+                # Slot still holds an expired bucket: drop it wholesale
+                self._size -= len(self._buckets[slot])
+                self._buckets[slot] = set()
+                self._epochs[slot] = epoch
+            if self._size >= self.max_nonces:
+                raise NonceStoreFull("Too many outstanding login challenges")
+            bucket = self._buckets[slot]
+            if nonce not in bucket:
+                bucket.add(nonce)
+                self._size += 1
+
+    def consume(self, nonce: str) -> bool:
+        """Remove `nonce` if it is outstanding and unexpired; True on success"""
+        with self._lock:
+            newest = self._epoch()
+            for epoch in range(newest, newest - self._ring_size + 1, -1):
+                bucket = self._live_bucket(epoch)
+                if bucket is not None and nonce in bucket:
+                    bucket.discard(nonce)
+                    self._size -= 1
+                    return True
+            return False
+
+    def consume_many(self, nonces: List[str]) -> List[bool]:
+        """`consume` for each nonce, in order"""
+        return [self.consume(nonce) for nonce in nonces]
+
+
+class SQLiteNonceStore:
+    """Nonces in a SQLite file shared by all worker processes on the host
+
+    Expired buckets are deleted by whichever worker first issues a nonce in a
+    new bucket. A per-bucket count of issued nonces caps the rows in the TTL
+    window at ``max_nonces`` without scanning the table.
+    """
+
+    def __init__(
+        self, path: str, ttl_seconds: int = 300, bucket_seconds: int = 10, max_nonces: int = 1_000_000
+    ):
+        self.path = path
+        self.bucket_seconds = bucket_seconds
+        self.max_nonces = max_nonces
+        self._window = -(-ttl_seconds // bucket_seconds)
+        self._local = threading.local()
+        self._swept_epoch = -1
+        conn = self._conn()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS nonces (nonce TEXT PRIMARY KEY, bucket INTEGER NOT NULL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS nonces_bucket ON nonces (bucket)")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS nonce_buckets (bucket INTEGER PRIMARY KEY, issued INTEGER NOT NULL)"
+        )
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _epoch(self) -> int:
+        return int(time.time() // self.bucket_seconds)
+
+    def __len__(self) -> int:
+        oldest = self._epoch() - self._window + 1
+        return self._conn().execute("SELECT COUNT(*) FROM nonces WHERE bucket >= ?", (oldest,)).fetchone()[0]
+
+    def _sweep(self, conn: sqlite3.Connection, epoch: int) -> None:
+        # Whole expired buckets go in one indexed range delete, once per bucket
+        if epoch != self._swept_epoch:
+            conn.execute("DELETE FROM nonces WHERE bucket < ?", (epoch - self._window + 1,))
+            conn.execute("DELETE FROM nonce_buckets WHERE bucket < ?", (epoch - self._window + 1,))
+            self._swept_epoch = epoch
+
+    def issue(self, nonce: str) -> None:
+        conn = self._conn()
+        epoch = self._epoch()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            self._sweep(conn, epoch)
+            issued = conn.execute(
+                "SELECT COALESCE(SUM(issued), 0) FROM nonce_buckets WHERE bucket >= ?",
+                (epoch - self._window + 1,),
+            ).fetchone()[0]
+            if issued >= self.max_nonces:
+                raise NonceStoreFull("Too many outstanding login challenges")
+            inserted = conn.execute(
+                "INSERT OR IGNORE INTO nonces (nonce, bucket) VALUES (?, ?)", (nonce, epoch)
+            ).rowcount
+            if inserted:
+                conn.execute(
+                    "INSERT INTO nonce_buckets (bucket, issued) VALUES (?, 1) "
+                    "ON CONFLICT (bucket) DO UPDATE SET issued = issued + 1",
+                    (epoch,),
+                )
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    def consume(self, nonce: str) -> bool:
+        """Remove `nonce` if it is outstanding and unexpired; True on success"""
+        oldest = self._epoch() - self._window + 1
+        cursor = self._conn().execute(
+            "DELETE FROM nonces WHERE nonce = ? AND bucket >= ?", (nonce, oldest)
+        )
+        return cursor.rowcount == 1
+
+    def consume_many(self, nonces: List[str]) -> List[bool]:
+        """`consume` for each nonce, in order, in a single write transaction"""
+        oldest = self._epoch() - self._window + 1
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            consumed = [
+                conn.execute(
+                    "DELETE FROM nonces WHERE nonce = ? AND bucket >= ?", (nonce, oldest)
+                ).rowcount == 1
+                for nonce in nonces
+            ]
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+        return consumed
+
+
+def create_nonce_store():
+    """Store selected by NONCE_STORE_PATH (empty = in-process memory)"""
+    if settings.nonce_store_path:
+        return SQLiteNonceStore(
+            settings.nonce_store_path,
+            ttl_seconds=settings.nonce_ttl_seconds,
+            bucket_seconds=settings.nonce_bucket_seconds,
+            max_nonces=settings.nonce_max_outstanding,
+        )
+    return MemoryNonceStore(
+        ttl_seconds=settings.nonce_ttl_seconds,
+        bucket_seconds=settings.nonce_bucket_seconds,
+        max_nonces=settings.nonce_max_outstanding,
+    )
+
+
+nonce_store = create_nonce_store()
@@ -0,0 +1,110 @@
+"""Keyset pagination and NDJSON streaming for the list endpoints.
+
+Lists are ordered by ``(distance from the requested location, address)``.
+Without a location, they are ordered by address alone. The read model
+stores lists sorted by address, so a page without a location is a bisect
+plus a slice. With a location, the page is the ``limit`` smallest keys past
+the cursor, found with a bounded heap rather than a full sort.
+
+A cursor is the sort key of the last record served, bound to the query it
+came from, so it cannot be replayed against a different location or radius.
+"""
+
+import base64
+from bisect import bisect_right
+from hashlib import blake2b
+import heapq
+from itertools import islice
+import json
+import math
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from .location import distance_km, resolver
+
+
+# (distance in km, or inf when unknown/unranked; address)
+SortKey = Tuple[float, str]
+
+_encode = json.JSONEncoder(separators=(",", ":"), check_circular=False).encode
+
+
+class InvalidCursor(ValueError):
+    """Raised for a cursor that is malformed or belongs to another query"""
+
+
+def query_scope(*parts: Any) -> str:
+    return blake2b("|".join(str(part) for part in parts).encode(), digest_size=6).hexdigest()
+
+
+def encode_cursor(key: SortKey, scope: str) -> str:
+    distance = None if math.isinf(key[0]) else key[0]
+    payload = _encode([distance, key[1], scope]).encode()
+    return base64.urlsafe_b64encode(payload).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, scope: str) -> SortKey:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        distance, address, cursor_scope = json.loads(raw)
+        key = (math.inf if distance is None else float(distance), str(address))
+    except (ValueError, TypeError):
+        raise InvalidCursor("Malformed cursor")
+    if cursor_scope != scope:
+        raise InvalidCursor("Cursor belongs to a different query")
+    return key
+
+
+def select(
+    records: List[Dict[str, Any]],
+    origin: Optional[str],
+    radius_km: Optional[float] = None,
+    after: Optional[SortKey] = None,
+    limit: Optional[int] = None,
+    location_key: str = "location",
+) -> Tuple[Iterator[Dict[str, Any]], Optional[SortKey]]:
+    """Records after `after` in key order, at most `limit` of them.
+
+    `records` must be sorted by address. Returns the records (lazily when
+    no location is given) and the key to resume from, or None on the last page.
+    """
+    origin_point = resolver.resolve(origin) if origin else None
+    if origin_point is None:
+        start = bisect_right(records, after[1], key=lambda r: r["address"]) if after else 0
+        end = len(records) if limit is None else min(len(records), start + limit)
+        next_key = (math.inf, records[end - 1]["address"]) if end < len(records) else None
+        return ({**records[i], "distance_km": None} for i in range(start, end)), next_key
+
+    def keyed() -> Iterator[Tuple[float, str, Optional[float], Dict[str, Any]]]:
+        for record in records:
+            point = resolver.resolve(record.get(location_key) or "")
+            distance = round(distance_km(origin_point, point), 1) if point is not None else None
+            if radius_km is not None and (distance is None or distance > radius_km):
+                continue
+            sort_distance = math.inf if distance is None else distance
+            if after is not None and (sort_distance, record["address"]) <= after:
+                continue
+            yield sort_distance, record["address"], distance, record
+
+    if limit is None:
+        ranked = sorted(keyed(), key=lambda item: item[:2])
+        next_key = None
+    else:
+        ranked = heapq.nsmallest(limit + 1, keyed(), key=lambda item: item[:2])
+        next_key = ranked[limit - 1][:2] if len(ranked) > limit else None
+        ranked = ranked[:limit]
+    return ({**record, "distance_km": distance} for _, _, distance, record in ranked), next_key
+
+
+def ndjson_chunks(records: Iterable[Dict[str, Any]], batch: int = 512) -> Iterator[bytes]:
+    """Serialize records as NDJSON, one record in the first chunk (fast first
+    byte) and `batch` records per chunk after that."""
+    records = iter(records)
+    for record in records:
+        yield (_encode(record) + "\n").encode()
+        break
+    while True:
+        lines = [_encode(record) for record in islice(records, batch)]
+        if not lines:
+            return
+        lines.append("")
+        yield "\n".join(lines).encode()
@@ -0,0 +1,406 @@
+"""In-memory doctor rating statistics and leaderboards.
+
+Each rating updates the doctor's running count, sum and 1-5 star histogram
+in O(1). The ranking score is the Bayesian average
+``(prior_weight * prior_mean + sum) / (prior_weight + count)``, which keeps a
+doctor with two 5-star ratings from outranking one with two hundred 4.9s.
+The prior is fixed rather than the live global mean so that one rating
+never changes any other doctor's score.
+
+Doctors are kept on four kinds of leaderboard: overall, per specialization,
+per region and per (specialization, region). Each board is a ``RankedList``
+ordered by score, so a rating moves the doctor on its boards in
+logarithmic time and top-k is a walk over the first k entries.
+
+The engine lives in each worker process, but ratings and doctor
+registrations do not. They are appended to a ``RatingLog``, a SQLite file
+shared by every worker on the host (like ``SQLiteNonceStore``) that
+outlives restarts. Each engine replays the log rows it has not seen yet
+before it answers: on every rating, leaderboard query and read-model
+rebuild. So a doctor registered or rated through any worker shows up in
+every worker's leaderboards and in the shared read model.
+"""
+
+from bisect import bisect_left, insort
+from collections import defaultdict
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from .config import settings
+
+
+STARS = 5
+
+# (specialization, region); None = any
+BoardId = Tuple[Optional[str], Optional[str]]
+
+
+class UnknownDoctor(KeyError):
+    """Raised when rating or seeding an address that was never registered as a doctor"""
+
+
+class RankedList:
+    """Sorted list kept as a list of short sorted blocks.
+
+    Search is a bisect over block maxima plus one within a block; insert and
+    remove only shift elements of one block, and blocks are split when they
+    grow past twice ``load``.
+    """
+
+    def __init__(self, load: int = 256):
+        self._load = load
+        self._blocks: List[List[Any]] = []
+        self._maxes: List[Any] = []
+        self._len = 0
+
+    def __len__(self) -> int:
+        return self._len
+
+    def __iter__(self) -> Iterator[Any]:
+        for block in self._blocks:
+            yield from block
+
+    def add(self, key: Any) -> None:
+        if not self._blocks:
+            self._blocks.append([key])
+            self._maxes.append(key)
+        else:
+            i = bisect_left(self._maxes, key)
+            if i == len(self._blocks):
+                i -= 1
+                self._blocks[i].append(key)
+                self._maxes[i] = key
+            else:
+                insort(self._blocks[i], key)
+            block = self._blocks[i]
+            if len(block) > 2 * self._load:
+                tail = block[self._load:]
+                del block[self._load:]
+                self._maxes[i] = block[-1]
+                self._blocks.insert(i + 1, tail)
+                self._maxes.insert(i + 1, tail[-1])
+        self._len += 1
+
+    def remove(self, key: Any) -> None:
+        i = bisect_left(self._maxes, key)
+        if i == len(self._blocks):
+            raise KeyError(key)
+        block = self._blocks[i]
+        j = bisect_left(block, key)
+        if j == len(block) or block[j] != key:
+            raise KeyError(key)
+        del block[j]
+        if block:
+            self._maxes[i] = block[-1]
+        else:
+            del self._blocks[i]
+            del self._maxes[i]
+        self._len -= 1
+
+    def rank(self, key: Any) -> int:
+        """Number of entries ordered before `key`"""
+        i = bisect_left(self._maxes, key)
+        before = sum(len(block) for block in self._blocks[:i])
+        if i < len(self._blocks):
+            before += bisect_left(self._blocks[i], key)
+        return before
+
+    def head(self, k: int) -> List[Any]:
+        found: List[Any] = []
+        for block in self._blocks:
+            if len(found) >= k:
+                break
+            found.extend(block[:k - len(found)])
+        return found
+
+
+class DoctorStats:
+    __slots__ = ("address", "specialization", "region", "info", "count", "total", "histogram")
+
+    def __init__(self, address: str):
+        self.address = address
+        self.specialization: Optional[str] = None
+        self.region: Optional[str] = None
+        self.info: Dict[str, Any] = {}
+        self.count = 0
+        self.total = 0
+        self.histogram = [0] * STARS
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    def as_dict(self, score: float) -> Dict[str, Any]:
+        return {
+            **self.info,
+            "address": self.address,
+            "specialization": self.info.get("specialization", ""),
+            "rating": round(self.mean, 2),
+            "rating_count": self.count,
+            "rating_sum": self.total,
+            "score": round(score, 4),
+            "histogram": list(self.histogram),
+        }
+
+
+class RatingLog:
+    """Append-only logs of ratings and doctor registrations in a SQLite file
+    shared by the host's workers"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        conn = self._conn()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS ratings ("
+            "id INTEGER PRIMARY KEY AUTOINCREMENT, address TEXT NOT NULL, "
+            "rating INTEGER NOT NULL, created_at REAL NOT NULL)"
+        )
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS doctors ("
+            "id INTEGER PRIMARY KEY AUTOINCREMENT, address TEXT NOT NULL, specialization TEXT, "
+            "region TEXT, info TEXT NOT NULL, created_at REAL NOT NULL)"
+        )
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def append(self, address: str, rating: int) -> int:
+        cursor = self._conn().execute(
+            "INSERT INTO ratings (address, rating, created_at) VALUES (?, ?, ?)",
+            (address, rating, time.time()),
+        )
+        return cursor.lastrowid
+
+    def since(self, after_id: int) -> List[Tuple[int, str, int]]:
+        """(id, address, rating) rows appended after `after_id`, oldest first"""
+        return self._conn().execute(
+            "SELECT id, address, rating FROM ratings WHERE id > ? ORDER BY id", (after_id,)
+        ).fetchall()
+
+    def append_registration(self, address: str, specialization: Optional[str],
+                            region: Optional[str], info: Dict[str, Any]) -> int:
+        cursor = self._conn().execute(
+            "INSERT INTO doctors (address, specialization, region, info, created_at) VALUES (?, ?, ?, ?, ?)",
+            (address, specialization, region, json.dumps(info), time.time()),
+        )
+        return cursor.lastrowid
+
+    def registrations_since(
+        self, after_id: int
+    ) -> List[Tuple[int, str, Optional[str], Optional[str], Dict[str, Any]]]:
+        """(id, address, specialization, region, info) rows appended after `after_id`, oldest first"""
+        rows = self._conn().execute(
+            "SELECT id, address, specialization, region, info FROM doctors WHERE id > ? ORDER BY id",
+            (after_id,),
+        ).fetchall()
+        return [(row_id, address, spec, region, json.loads(info)) for row_id, address, spec, region, info in rows]
+
+
+def _board_key(specialization: Optional[str]) -> Optional[str]:
+    return (specialization or "").strip().lower() or None
+
+
+class RatingEngine:
+    def __init__(self, prior_mean: float = 3.5, prior_weight: float = 10.0,
+                 log: Optional[RatingLog] = None):
+        self.prior_mean = prior_mean
+        self.prior_weight = prior_weight
+        # Without a log, ratings only reach this engine (benchmarks, single process)
+        self.log = log
+        self._synced_id = 0
+        self._synced_registration_id = 0
+        # Logged ratings for doctors this process has not registered (yet)
+        self._pending: Dict[str, List[int]] = defaultdict(list)
+        self._doctors: Dict[str, DoctorStats] = {}
+        self._keys: Dict[str, Tuple[float, int, str]] = {}
+        self._boards: Dict[BoardId, RankedList] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._doctors)
+
+    def score(self, stats: DoctorStats) -> float:
+        return (self.prior_weight * self.prior_mean + stats.total) / (self.prior_weight + stats.count)
+
+    def _board_ids(self, stats: DoctorStats) -> List[BoardId]:
+        boards: List[BoardId] = [(None, None)]
+        if stats.specialization:
+            boards.append((stats.specialization, None))
+        if stats.region:
+            boards.append((None, stats.region))
+            if stats.specialization:
+                boards.append((stats.specialization, stats.region))
+        return boards
+
+    def _unlink(self, stats: DoctorStats) -> None:
+        key = self._keys.pop(stats.address, None)
+        if key is not None:
+            for board_id in self._board_ids(stats):
+                self._boards[board_id].remove(key)
+
+    def _link(self, stats: DoctorStats) -> None:
+        # Best first: highest score, then most ratings, then address for a stable order
+        key = (-self.score(stats), -stats.count, stats.address)
+        self._keys[stats.address] = key
+        for board_id in self._board_ids(stats):
+            board = self._boards.get(board_id)
+            if board is None:
+                board = self._boards[board_id] = RankedList()
+            board.add(key)
+
+    def _get_or_create(self, address: str) -> DoctorStats:
+        stats = self._doctors.get(address)
+        if stats is None:
+            stats = self._doctors[address] = DoctorStats(address)
+        return stats
+
+    def _registered(self, address: str) -> DoctorStats:
+        # Only register_doctor adds doctors, so arbitrary addresses never reach a board
+        stats = self._doctors.get(address)
+        if stats is None:
+            raise UnknownDoctor(address)
+        return stats
+
+    def register_doctor(self, address: str, specialization: Optional[str] = None,
+                        region: Optional[str] = None, *, shared: bool = True, **info: Any) -> None:
+        """Add a doctor (or update their profile), keeping any ratings so far.
+
+        The registration is logged for every worker unless `shared` is False,
+        for doctors that every worker seeds the same way at startup.
+        """
+        with self._lock:
+            if self.log is None or not shared:
+                self._register_locked(address, specialization, region, info)
+                return
+            self.log.append_registration(address, specialization, region, info)
+            self._sync_locked()
+
+    def _register_locked(self, address: str, specialization: Optional[str],
+                         region: Optional[str], info: Dict[str, Any]) -> None:
+        stats = self._get_or_create(address)
+        self._unlink(stats)
+        stats.specialization = _board_key(specialization)
+        stats.region = region
+        stats.info = {**info, "specialization": specialization or ""}
+        for rating in self._pending.pop(address, ()):
+            self._count(stats, rating)
+        self._link(stats)
+
+    def load(self, address: str, histogram: List[int]) -> None:
+        """Replace a registered doctor's ratings with a 1-5 star histogram (bulk
+        seeding, before the first sync: logged ratings are counted on top of it)"""
+        if len(histogram) != STARS:
+            raise ValueError(f"Histogram must have {STARS} buckets")
+        with self._lock:
+            stats = self._registered(address)
+            self._unlink(stats)
+            stats.histogram = list(histogram)
+            stats.count = sum(histogram)
+            stats.total = sum(star * n for star, n in enumerate(histogram, start=1))
+            self._link(stats)
+
+    def rate(self, address: str, rating: int) -> Dict[str, Any]:
+        """Record one rating for a registered doctor and return their updated statistics"""
+        if not 1 <= rating <= STARS:
+            raise ValueError(f"Rating must be between 1 and {STARS}")
+        with self._lock:
+            if address not in self._doctors and self.log is not None:
+                # Possibly registered through another worker since the last sync
+                self._sync_locked()
+            stats = self._registered(address)
+            if self.log is None:
+                self._apply(stats, rating)
+            else:
+                self.log.append(address, rating)
+                # Picks up this rating and any other worker's, in log order
+                self._sync_locked()
+            return stats.as_dict(self.score(stats))
+
+    @staticmethod
+    def _count(stats: DoctorStats, rating: int) -> None:
+        stats.count += 1
+        stats.total += rating
+        stats.histogram[rating - 1] += 1
+
+    def _apply(self, stats: DoctorStats, rating: int) -> None:
+        self._unlink(stats)
+        self._count(stats, rating)
+        self._link(stats)
+
+    def _sync_locked(self) -> None:
+        # Registrations first; a rating logged before its doctor's registration waits in _pending
+        for row_id, address, specialization, region, info in self.log.registrations_since(
+            self._synced_registration_id
+        ):
+            self._register_locked(address, specialization, region, info)
+            self._synced_registration_id = row_id
+        for row_id, address, rating in self.log.since(self._synced_id):
+            stats = self._doctors.get(address)
+            if stats is None:
+                self._pending[address].append(rating)
+            else:
+                self._apply(stats, rating)
+            self._synced_id = row_id
+
+    def sync(self) -> None:
+        """Apply the registrations and ratings logged (by any worker) since the last sync"""
+        if self.log is not None:
+            with self._lock:
+                self._sync_locked()
+
+    def stats(self, address: str) -> Optional[Dict[str, Any]]:
+        """A doctor's statistics as of the last sync"""
+        with self._lock:
+            stats = self._doctors.get(address)
+            return stats.as_dict(self.score(stats)) if stats is not None else None
+
+    def top(self, k: int = 10, specialization: Optional[str] = None,
+            region: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Best `k` doctors by score, optionally within a specialization and/or region"""
+        with self._lock:
+            if self.log is not None:
+                self._sync_locked()
+            board = self._boards.get((_board_key(specialization), region))
+            if board is None:
+                return []
+            found = []
+            for rank, (_, _, address) in enumerate(board.head(k), start=1):
+                stats = self._doctors[address]
+                found.append({**stats.as_dict(self.score(stats)), "rank": rank})
+            return found
+
+    def rank_of(self, address: str, specialization: Optional[str] = None,
+                region: Optional[str] = None) -> Optional[int]:
+        """1-based position of `address` on a board, or None if not on it"""
+        with self._lock:
+            if self.log is not None:
+                self._sync_locked()
+            key = self._keys.get(address)
+            board = self._boards.get((_board_key(specialization), region))
+            if key is None or board is None:
+                return None
+            stats = self._doctors[address]
+            if (_board_key(specialization), region) not in self._board_ids(stats):
+                return None
+            return board.rank(key) + 1
+
+
+rating_engine = RatingEngine(
+    prior_mean=settings.rating_prior_mean,
+    prior_weight=settings.rating_prior_weight,
+    log=RatingLog(
+        settings.rating_log_path or os.path.join(tempfile.gettempdir(), "hosconnect-ratings.db")
+    ),
+)
@@ -0,0 +1,365 @@
+"""Host-wide read model shared by all uvicorn workers through one mmap'd file.
+
+One worker (whichever holds the file lock) is the updater: it rebuilds the
+read model periodically and publishes it as an immutable snapshot. Every
+other worker maps the same file and reads entries straight out of the page
+cache, so the data is held once per host instead of once per process and a
+read is a handful of struct unpacks, with no IPC round trip.
+
+File layout::
+
+    header (64 bytes)  magic, generation, version, active slot, slot size, published_at
+    slot 0             snapshot
+    slot 1             snapshot
+
+Each snapshot is an open-addressing hash table of (key hash, offset, length)
+buckets followed by ``key + round + JSON value`` records, where ``round`` is
+the confirmed round at which the entry last changed (used for ETags). The updater writes the next
+snapshot into the inactive slot, then flips the header under a sequence
+counter (odd while flipping). Readers never lock: they retry if the counter
+was odd or changed while they were reading.
+"""
+
+from hashlib import blake2b
+import json
+import logging
+import mmap
+import os
+import struct
+import tempfile
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process lock, fall back to a per-process file
+    fcntl = None
+
+from .config import settings
+
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"HCRM"
+HEADER = struct.Struct(">4sIQQIIQd")  # magic, format, generation, version, active, reserved, slot_size, published_at
+HEADER_SIZE = 64
+FORMAT = 2
+_GENERATION_OFFSET = 8
+TABLE_HEADER = struct.Struct(">II")  # n_buckets, n_entries
+BUCKET = struct.Struct(">QII")  # key hash, record offset, record length
+KEY_LEN = struct.Struct(">H")
+ROUND = struct.Struct(">Q")
+# Reader retries before giving up on a header that stays mid-flip (a crashed
+# updater); a live flip finishes within a few of them
+MAX_READ_RETRIES = 10_000
+
+Builder = Callable[[], Dict[str, Any]]
+RoundSource = Callable[[], Optional[int]]
+
+_decode_json = json.JSONDecoder().decode
+
+
+class SnapshotTooLarge(Exception):
+    """Raised when a snapshot does not fit in a slot"""
+
+
+def _key_hash(key: bytes) -> int:
+    # Never 0: a zero hash marks an empty bucket
+    return int.from_bytes(blake2b(key, digest_size=8).digest(), "big") | 1
+
+
+def encode_snapshot(entries: Dict[str, bytes], rounds: Dict[str, int]) -> bytes:
+    """Serialize JSON-encoded entries and their change rounds into the slot format"""
+    n_buckets = 8
+    while n_buckets < 2 * len(entries):
+        n_buckets *= 2
+
+    buckets = bytearray(n_buckets * BUCKET.size)
+    records = bytearray()
+    records_start = TABLE_HEADER.size + len(buckets)
+    mask = n_buckets - 1
+    for key, value in entries.items():
+        key_bytes = key.encode()
+        record = KEY_LEN.pack(len(key_bytes)) + key_bytes + ROUND.pack(rounds.get(key, 0)) + value
+        h = _key_hash(key_bytes)
+        i = h & mask
+        while BUCKET.unpack_from(buckets, i * BUCKET.size)[0]:
+            i = (i + 1) & mask
+        BUCKET.pack_into(buckets, i * BUCKET.size, h, records_start + len(records), len(record))
+        records += record
+
+    return TABLE_HEADER.pack(n_buckets, len(entries)) + bytes(buckets) + bytes(records)
+
+
+class SharedSnapshot:
+    """Reader/writer handle on the mmap'd snapshot file"""
+
+    def __init__(self, path: str, slot_size: int, memo_keys: Iterable[str] = ()):
+        self.path = path
+        self.slot_size = slot_size
+        # Hot aggregate keys (and their "@region" partitions) decoded once per
+        # snapshot generation instead of per read
+        self.memo_keys = frozenset(memo_keys)
+        self._memo: Dict[str, Tuple[int, Any]] = {}
+        self._mm: Optional[mmap.mmap] = None
+        self._inode: Optional[int] = None
+        self._checked_at = 0.0
+
+    @property
+    def file_size(self) -> int:
+        return HEADER_SIZE + 2 * self.slot_size
+
+    def create(self) -> None:
+        """Create (or re-create, if the slot size changed) the snapshot file"""
+        try:
+            if os.path.getsize(self.path) == self.file_size and self._read_magic():
+                return
+        except (OSError, struct.error):
+            pass
+        tmp = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(HEADER.pack(MAGIC, FORMAT, 0, 0, 0, 0, self.slot_size, 0.0).ljust(HEADER_SIZE, b"\0"))
+            f.truncate(self.file_size)
+        os.replace(tmp, self.path)
+
+    def _read_magic(self) -> bool:
+        with open(self.path, "rb") as f:
+            magic, file_format = struct.unpack(">4sI", f.read(8))
+        return magic == MAGIC and file_format == FORMAT
+
+    def _map(self) -> Optional[mmap.mmap]:
+        now = time.monotonic()
+        if self._mm is not None and now - self._checked_at < 1.0:
+            return self._mm
+        self._checked_at = now
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+        if self._mm is None or stat.st_ino != self._inode:
+            if stat.st_size < HEADER_SIZE:
+                return None
+            with open(self.path, "r+b") as f:
+                mm = mmap.mmap(f.fileno(), 0)
+            if mm[:8] != MAGIC + struct.pack(">I", FORMAT):
+                mm.close()
+                return None
+            if self._mm is not None:
+                self._mm.close()
+            self._mm, self._inode = mm, stat.st_ino
+        return self._mm
+
+    def publish(self, entries: Dict[str, bytes], rounds: Dict[str, int]) -> int:
+        """Write a new snapshot into the inactive slot and flip to it"""
+        payload = encode_snapshot(entries, rounds)
+        mm = self._map()
+        if mm is None:
+            raise FileNotFoundError(self.path)
+        _, _, generation, version, active, _, slot_size, _ = HEADER.unpack_from(mm, 0)
+        if len(payload) > slot_size:
+            raise SnapshotTooLarge(f"Snapshot is {len(payload)} bytes, slot holds {slot_size}")
+
+        target = 1 - active if generation else 0
+        offset = HEADER_SIZE + target * slot_size
+        mm[offset:offset + len(payload)] = payload
+
+        # Seqlock flip: odd generation while the header is inconsistent. A
+        # previous updater that died mid-flip left it odd: round up to even
+        generation += generation & 1
+        struct.pack_into(">Q", mm, _GENERATION_OFFSET, generation + 1)
+        HEADER.pack_into(mm, 0, MAGIC, FORMAT, generation + 1, version + 1, target, 0, slot_size, time.time())
+        struct.pack_into(">Q", mm, _GENERATION_OFFSET, generation + 2)
+        return version + 1
+
+    def version(self) -> int:
+        """Published snapshot version (0 = nothing published yet)"""
+        mm = self._map()
+        if mm is None:
+            return 0
+        return HEADER.unpack_from(mm, 0)[3]
+
+    def _lookup(self, key: str, decode: bool) -> Tuple[int, Optional[int], Any]:
+        """(generation, round, value) for `key`; round is None if the key is absent
+
+        Raises LookupError if no snapshot has been published, or if the header
+        stays mid-flip for MAX_READ_RETRIES attempts.
+        """
+        mm = self._map()
+        if mm is None:
+            raise LookupError("No snapshot file")
+        key_bytes = key.encode()
+        h = _key_hash(key_bytes)
+        for _ in range(MAX_READ_RETRIES):
+            _, _, generation, version, active, _, slot_size, _ = HEADER.unpack_from(mm, 0)
+            if generation & 1:
+                continue
+            if not version:
+                raise LookupError("No snapshot published yet")
+            memo = self._memo.get(key)
+            if memo is not None and memo[0] == generation:
+                return memo
+            try:
+                found = self._probe(mm, HEADER_SIZE + active * slot_size, key_bytes, h)
+                if found is not None:
+                    start, end = found
+                    (change_round,) = ROUND.unpack_from(mm, start)
+                    raw = mm[start + ROUND.size:end] if decode else None
+            except (struct.error, ValueError):
+                found = None  # Torn read; the generation check below forces a retry
+            if struct.unpack_from(">Q", mm, _GENERATION_OFFSET)[0] != generation:
+                continue  # Updater flipped mid-read: retry on the new snapshot
+            if found is None:
+                return generation, None, None
+            if not decode:
+                return generation, change_round, None
+            result = (generation, change_round, _decode_json(raw.decode()))
+            if key.partition("@")[0] in self.memo_keys:
+                self._memo[key] = result
+            return result
+        raise LookupError("Snapshot header is stuck mid-flip")
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """Look up `key` in the current snapshot; raises LookupError if none is published"""
+        _, change_round, value = self._lookup(key, decode=True)
+        return default if change_round is None else value
+
+    def round_of(self, key: str) -> Optional[int]:
+        """Round at which `key` last changed, without decoding its value"""
+        return self._lookup(key, decode=False)[1]
+
+    @staticmethod
+    def _probe(mm: mmap.mmap, base: int, key_bytes: bytes, h: int) -> Optional[Tuple[int, int]]:
+        """(start, end) of the round + value part of `key`'s record"""
+        n_buckets, _ = TABLE_HEADER.unpack_from(mm, base)
+        mask = n_buckets - 1
+        i = h & mask
+        for _ in range(n_buckets):
+            bucket_hash, offset, length = BUCKET.unpack_from(mm, base + TABLE_HEADER.size + i * BUCKET.size)
+            if not bucket_hash:
+                return None
+            if bucket_hash == h:
+                start = base + offset
+                (key_len,) = KEY_LEN.unpack_from(mm, start)
+                if mm[start + 2:start + 2 + key_len] == key_bytes:
+                    return start + 2 + key_len, start + length
+            i = (i + 1) & mask
+        return None
+
+
+class ReadModel:
+    """Shared read model with single-updater election via a file lock"""
+
+    def __init__(self, path: str, slot_size: int, refresh_seconds: float, memo_keys: Iterable[str] = ()):
+        if fcntl is None:
+            root, ext = os.path.splitext(path)
+            path = f"{root}.{os.getpid()}{ext}"
+        self.snapshot = SharedSnapshot(path, slot_size, memo_keys)
+        self.refresh_seconds = refresh_seconds
+        self._builder: Optional[Builder] = None
+        self._round_source: Optional[RoundSource] = None
+        # Updater only: last published encoding and change round of each entry
+        self._published: Dict[str, bytes] = {}
+        self._changed_at: Dict[str, int] = {}
+        self._lock_file = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def is_updater(self) -> bool:
+        return self._lock_file is not None
+
+    def _try_become_updater(self) -> bool:
+        if self._lock_file is not None:
+            return True
+        lock_file = open(f"{self.snapshot.path}.lock", "a+b")
+        if fcntl is not None:
+            try:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                lock_file.close()
+                return False
+        self._lock_file = lock_file
+        self.snapshot.create()
+        return True
+
+    def refresh(self) -> None:
+        """Rebuild and publish (updater only)
+
+        Entries whose encoding is unchanged keep their change round; the rest
+        are stamped with the current confirmed round (or, if the chain cannot
+        be reached, the next snapshot version).
+        """
+        if self._builder is None:
+            return
+        try:
+            entries = {
+                key: json.dumps(value, separators=(",", ":")).encode()
+                for key, value in self._builder().items()
+            }
+            current_round = None
+            if self._round_source is not None:
+                current_round = self._round_source()
+            if current_round is None:
+                current_round = self.snapshot.version() + 1
+
+            changed_at = {
+                key: self._changed_at[key] if self._published.get(key) == encoded else current_round
+                for key, encoded in entries.items()
+            }
+            self.snapshot.publish(entries, changed_at)
+            self._published, self._changed_at = entries, changed_at
+        except Exception:
+            logger.exception("Failed to publish read model snapshot")
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.refresh_seconds):
+            # Non-updaters keep trying so a new updater takes over if the old one exits
+            if self._try_become_updater():
+                self.refresh()
+
+    def set_builder(self, builder: Builder, round_source: Optional[RoundSource] = None) -> None:
+        """Register the function that builds the full read model as {key: value},
+        and optionally one returning the last confirmed round"""
+        self._builder = builder
+        self._round_source = round_source
+
+    def start(self) -> None:
+        self._stop.clear()
+        if self._try_become_updater():
+            self.refresh()
+        self._thread = threading.Thread(target=self._run, name="read-model", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.refresh_seconds + 1)
+            self._thread = None
+        if self._lock_file is not None:
+            self._lock_file.close()
+            self._lock_file = None
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """Read `key` from the shared snapshot, building in-process if none exists yet"""
+        try:
+            return self.snapshot.get(key, default)
+        except LookupError:
+            if self._builder is None:
+                return default
+            return self._builder().get(key, default)
+
+    def round_of(self, key: str) -> Optional[int]:
+        """Change round of `key`, or None if absent or no snapshot is published"""
+        try:
+            return self.snapshot.round_of(key)
+        except LookupError:
+            return None
+
+
+read_model = ReadModel(
+    settings.read_model_path or os.path.join(tempfile.gettempdir(), "hosconnect-read-model.bin"),
+    slot_size=settings.read_model_slot_bytes,
+    refresh_seconds=settings.read_model_refresh_seconds,
+    memo_keys=("stats", "doctors", "emergency_patients"),
+)
@@ -0,0 +1,53 @@
+from hashlib import blake2b
+from typing import Optional
+
+from fastapi.responses import StreamingResponse
+from starlette.types import Receive, Scope, Send
+
+from .config import settings
+
+
+def make_etag(key: str, change_round: int) -> str:
+    """Strong ETag for a read-model entry as of the round it last changed"""
+    return '"' + blake2b(f"{key}@{change_round}".encode(), digest_size=12).hexdigest() + '"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """RFC 9110 weak comparison of an If-None-Match header against `etag`"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return any(
+        candidate.strip().removeprefix("W/") == etag
+        for candidate in if_none_match.split(",")
+    )
+
+
+def cache_control() -> str:
+    """Let shared caches (CDN) serve a response for about one block, then revalidate"""
+    return (
+        f"public, max-age=0, s-maxage={settings.cache_s_maxage}, "
+        f"stale-while-revalidate={settings.cache_stale_while_revalidate}"
+    )
+
+
+class DuplexStreamingResponse(StreamingResponse):
+    """StreamingResponse for handlers that keep reading the request body while
+    streaming the response.
+
+    The stock response consumes ``receive`` to watch for disconnects, which
+    would swallow the body chunks the handler is still reading. Here a
+    disconnect surfaces through the body stream or the failed ``send``.
+    The background task runs either way, so it can release what the
+    handler held.
+    """
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        try:
+            await self.stream_response(send)
+        except OSError:
+            return
+        finally:
+            if self.background is not None:
+                await self.background()
@@ -1,8 +1,11 @@
 from fastapi import APIRouter, HTTPException
+from starlette.concurrency import run_in_threadpool
 from pydantic import BaseModel
-from algosdk import encoding
-from nacl.signing import VerifyKey
-import base64
+from typing import List
+
+from ..config import settings
+from ..nonce_store import NonceStoreFull, nonce_store
+from ..verification import challenge_message, verify_async, verify_batch_async
 
 
 router = APIRouter(prefix="/api/auth", tags=["auth"])
@@ -19,26 +22,64 @@ class VerifyRequest(BaseModel):
     nonce: str
 
 
+class VerifyBatchRequest(BaseModel):
+    items: List[VerifyRequest]
+
+
+class VerifyResult(BaseModel):
+    address: str
+    ok: bool
+
+
+class VerifyBatchResponse(BaseModel):
+    results: List[VerifyResult]
+    verified: int
+
+
 @router.get("/challenge", response_model=ChallengeResponse)
 def get_challenge() -> ChallengeResponse:
-    # In production, store nonce server-side and bind to session/user/ip
+    # Nonce is single-use and expires after NONCE_TTL_SECONDS
     from secrets import token_urlsafe
 
     nonce = token_urlsafe(16)
-    message = f"HosConnect login nonce: {nonce}"
+    try:
+        nonce_store.issue(nonce)
+    except NonceStoreFull:
+        raise HTTPException(status_code=503, detail="Too many pending challenges, retry shortly")
+    message = challenge_message(nonce)
     return ChallengeResponse(message_to_sign=message, nonce=nonce)
 
 
 @router.post("/verify")
-def verify_signature(payload: VerifyRequest) -> dict:
+async def verify_signature(payload: VerifyRequest) -> dict:
     # Verify an ed25519 signature where message is "HosConnect login nonce: {nonce}"
-    try:
-        message = f"HosConnect login nonce: {payload.nonce}".encode()
-        signature = base64.b64decode(payload.signature_b64)
-        pubkey_bytes = encoding.decode_address(payload.address)
-        VerifyKey(pubkey_bytes).verify(message, signature)
-        return {"ok": True}
-    except Exception:
+    if not await verify_async(payload.address, payload.nonce, payload.signature_b64):
         raise HTTPException(status_code=400, detail="Invalid signature")
+    # Consume only after a valid signature so forged attempts cannot burn a user's nonce.
+    # The SQLite store can wait on other workers' locks, so keep it off the event loop
+    if not await run_in_threadpool(nonce_store.consume, payload.nonce):
+        raise HTTPException(status_code=400, detail="Unknown, expired or already used nonce")
+    return {"ok": True}
+
 
+@router.post("/verify-batch", response_model=VerifyBatchResponse)
+async def verify_signature_batch(payload: VerifyBatchRequest) -> VerifyBatchResponse:
+    # Per-item results in request order; an invalid item does not fail the batch.
+    # An item is ok only if its signature verifies and its nonce is consumed here.
+    if len(payload.items) > settings.verify_batch_max:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Batch too large (max {settings.verify_batch_max} items)",
+        )
 
+    signatures_ok = await verify_batch_async(
+        [(item.address, item.nonce, item.signature_b64) for item in payload.items]
+    )
+    # One store transaction for the whole batch, off the event loop
+    verified = [item.nonce for item, ok in zip(payload.items, signatures_ok) if ok]
+    consumed = iter(await run_in_threadpool(nonce_store.consume_many, verified))
+    oks = [ok and next(consumed) for ok in signatures_ok]
+    return VerifyBatchResponse(
+        results=[VerifyResult(address=item.address, ok=ok) for item, ok in zip(payload.items, oks)],
+        verified=sum(oks),
+    )
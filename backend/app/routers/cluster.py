@@ -0,0 +1,61 @@
+from fastapi import APIRouter, Depends, Header, HTTPException
+from pydantic import BaseModel
+from typing import Any, Dict, List, Optional
+
+from ..sharding import cluster
+
+
+# Handlers are async: the ring and the emergencies are only touched on the
+# event loop, like the dispatch handlers in the medical router
+router = APIRouter(prefix="/api/cluster", tags=["cluster"])
+
+
+def require_secret(x_shard_secret: Optional[str] = Header(None)) -> None:
+    """Membership and handoff calls must come from a node holding SHARD_SECRET"""
+    if not cluster.authorized(x_shard_secret):
+        raise HTTPException(status_code=403, detail="Invalid cluster secret")
+
+
+class MembershipRequest(BaseModel):
+    node: str
+
+
+class JoinResponse(BaseModel):
+    nodes: List[str]
+    # Emergencies in the cells the joining node now owns
+    emergencies: List[Dict[str, Any]]
+
+
+class HandoffRequest(BaseModel):
+    emergencies: List[Dict[str, Any]]
+
+
+@router.get("/status")
+async def get_status() -> dict:
+    return cluster.status()
+
+
+@router.get("/owner")
+async def get_owner(cell: str) -> dict:
+    return {"cell": cell, "node": cluster.owner(cell)}
+
+
+@router.post("/join", response_model=JoinResponse, dependencies=[Depends(require_secret)])
+async def join(request: MembershipRequest) -> JoinResponse:
+    # Called by a starting node on every node it can reach
+    if not cluster.allows(request.node):
+        raise HTTPException(status_code=403, detail=f"{request.node} is not in SHARD_PEERS")
+    moved = cluster.admit(request.node)
+    return JoinResponse(nodes=sorted(cluster.ring.nodes), emergencies=moved)
+
+
+@router.post("/leave", dependencies=[Depends(require_secret)])
+async def leave(request: MembershipRequest) -> dict:
+    # The leaving node has already handed its cells off
+    cluster.remove(request.node)
+    return {"nodes": sorted(cluster.ring.nodes)}
+
+
+@router.post("/handoff", dependencies=[Depends(require_secret)])
+async def handoff(request: HandoffRequest) -> dict:
+    return {"accepted": cluster.accept(request.emergencies)}
@@ -1,14 +1,26 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Request, Response
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
+from starlette.background import BackgroundTask
 from pydantic import BaseModel
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Tuple
 from algosdk import account, mnemonic
 from algosdk.transaction import PaymentTxn
 from algosdk.atomic_transaction_composer import TransactionWithSigner
 import json
+import secrets
 import time
 
 from ..algorand.client import MedicalConnectClient, create_test_accounts
+from ..algorand.node_pool import PooledAlgodClient, create_algod_client
 from ..config import settings
+from ..location import rank_by_distance, resolver
+from ..pagination import InvalidCursor, decode_cursor, encode_cursor, ndjson_chunks, query_scope, select
+from ..ratings import UnknownDoctor, rating_engine
+from ..read_model import read_model
+from ..responses import DuplexStreamingResponse, cache_control, etag_matches, make_etag
+from ..sharding import cluster
+from ..bulk_import import BulkImport, ImportRow, checkpoint_store, iter_lines, iter_records
 
 router = APIRouter(prefix="/api/medical", tags=["medical"])
 
@@ -39,6 +51,8 @@ class RateDoctorRequest(BaseModel):
 class SetEmergencyRequest(BaseModel):
     patient_address: str
     emergency_status: bool
+    # Where the emergency is; defaults to the patient's registered location
+    location: Optional[str] = None
 
 class UserInfoResponse(BaseModel):
     address: str
@@ -62,14 +76,29 @@ class EmergencyPatientResponse(BaseModel):
     name: str
     emergency_status: int
     location: str
+    distance_km: Optional[float] = None
 
 class NearbyDoctorResponse(BaseModel):
     address: str
     name: str
     specialization: str
     rating: float
+    rating_count: int = 0
     location: str
     consultations_count: int
+    distance_km: Optional[float] = None
+
+class TopDoctorResponse(BaseModel):
+    address: str
+    name: str = ""
+    specialization: str
+    location: str = ""
+    consultations_count: int = 0
+    rating: float
+    rating_count: int
+    score: float
+    histogram: List[int]
+    rank: int
 
 # Mock data for demo purposes
 MOCK_DOCTORS = [
@@ -77,7 +106,7 @@ MOCK_DOCTORS = [
         "address": "DEMO_DOCTOR_1",
         "name": "Dr. Alice Johnson",
         "specialization": "Emergency Medicine",
-        "rating": 4.8,
+        "rating_histogram": [0, 0, 1, 3, 21],  # 1-5 stars
         "location": "New York, NY",
         "consultations_count": 150
     },
@@ -85,7 +114,7 @@ MOCK_DOCTORS = [
         "address": "DEMO_DOCTOR_2",
         "name": "Dr. Bob Wilson",
         "specialization": "General Practice",
-        "rating": 4.5,
+        "rating_histogram": [0, 0, 3, 9, 18],
         "location": "Brooklyn, NY",
         "consultations_count": 200
     },
@@ -93,7 +122,7 @@ MOCK_DOCTORS = [
         "address": "DEMO_DOCTOR_3",
         "name": "Dr. Carol Davis",
         "specialization": "Cardiology",
-        "rating": 4.9,
+        "rating_histogram": [0, 0, 0, 3, 27],
         "location": "Queens, NY",
         "consultations_count": 120
     }
@@ -114,6 +143,23 @@ MOCK_PATIENTS = [
     }
 ]
 
+def seed_ratings() -> None:
+    """Load the mock doctors into the rating engine"""
+    for doctor in MOCK_DOCTORS:
+        rating_engine.register_doctor(
+            doctor["address"],
+            doctor["specialization"],
+            resolver.region(doctor["location"]),
+            # Seeded identically by every worker, so not logged
+            shared=False,
+            name=doctor["name"],
+            location=doctor["location"],
+            consultations_count=doctor["consultations_count"],
+        )
+        rating_engine.load(doctor["address"], doctor["rating_histogram"])
+
+seed_ratings()
+
 @router.post("/register/doctor", response_model=Dict[str, Any])
 async def register_doctor(request: RegisterDoctorRequest):
     """Register a new doctor"""
@@ -131,6 +177,9 @@ async def register_doctor(request: RegisterDoctorRequest):
         
         # Simulate smart contract interaction
         tx_id = f"DEMO_TX_{int(time.time())}"
+        await run_in_threadpool(
+            rating_engine.register_doctor, request.wallet_address, request.specialization, name=request.name
+        )
         
         return {
             "success": True,
@@ -174,6 +223,54 @@ async def register_patient(request: RegisterPatientRequest):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Registration failed: {str(e)}")
 
+def register_rated_doctors(rows: List[ImportRow]) -> None:
+    for row in rows:
+        if row.role == "doctor":
+            rating_engine.register_doctor(row.wallet_address, row.specialization, name=row.name)
+
+async def register_group(rows: List[ImportRow]) -> str:
+    """Register a group of users in one atomic transaction group"""
+    # Simulate smart contract interaction (one group of up to 16 app calls)
+    tx_id = f"DEMO_GROUP_{int(time.time())}_{rows[0].row}"
+    # Ratable right away, as after /register/doctor
+    await run_in_threadpool(register_rated_doctors, rows)
+    return tx_id
+
+@router.post("/register/bulk")
+async def register_bulk(request: Request, import_id: Optional[str] = None, format: Optional[str] = None):
+    """Bulk-register doctors and patients from a streamed CSV or NDJSON upload.
+
+    Rows need role (doctor/patient), name, wallet_address and, for doctors,
+    specialization. Results stream back as NDJSON; pass the returned
+    import_id again to resume an interrupted import.
+    """
+    content_type = request.headers.get("content-type", "")
+    fmt = (format or ("csv" if "csv" in content_type else "ndjson")).lower()
+    if fmt not in ("csv", "ndjson"):
+        raise HTTPException(status_code=400, detail="Format must be csv or ndjson")
+
+    checkpoints = await run_in_threadpool(checkpoint_store)
+    bulk_import = BulkImport(
+        import_id or secrets.token_urlsafe(12),
+        register_group,
+        checkpoints,
+        group_size=settings.bulk_import_group_size,
+        concurrency=settings.bulk_import_concurrency,
+    )
+    if not checkpoints.claim(bulk_import.import_id):
+        raise HTTPException(status_code=409, detail=f"Import {bulk_import.import_id} is already in progress")
+
+    async def stream():
+        records = iter_records(iter_lines(request.stream()), fmt)
+        async for result in bulk_import.run(records):
+            yield json.dumps(result) + "\n"
+
+    return DuplexStreamingResponse(
+        stream(),
+        media_type="application/x-ndjson",
+        background=BackgroundTask(checkpoints.release, bulk_import.import_id),
+    )
+
 @router.post("/pow/submit", response_model=Dict[str, Any])
 async def submit_pow(request: SubmitPoWRequest):
     """Submit proof of work for treatment"""
@@ -209,17 +306,18 @@ async def submit_pow(request: SubmitPoWRequest):
 @router.post("/rating/submit", response_model=Dict[str, Any])
 async def submit_rating(request: RateDoctorRequest):
     """Submit a rating for a doctor"""
+    # Validate inputs
+    if not request.patient_address:
+        raise HTTPException(status_code=400, detail="Patient address is required")
+    if not request.doctor_address:
+        raise HTTPException(status_code=400, detail="Doctor address is required")
+    if request.rating < 1 or request.rating > 5:
+        raise HTTPException(status_code=400, detail="Rating must be between 1 and 5")
     try:
-        # Validate inputs
-        if not request.patient_address:
-            raise HTTPException(status_code=400, detail="Patient address is required")
-        if not request.doctor_address:
-            raise HTTPException(status_code=400, detail="Doctor address is required")
-        if request.rating < 1 or request.rating > 5:
-            raise HTTPException(status_code=400, detail="Rating must be between 1 and 5")
-        
         # Simulate smart contract interaction
         tx_id = f"DEMO_RATING_{int(time.time())}"
+        # The shared ratings log is SQLite: keep it off the event loop
+        doctor_stats = await run_in_threadpool(rating_engine.rate, request.doctor_address, request.rating)
         
         return {
             "success": True,
@@ -231,21 +329,40 @@ async def submit_rating(request: RateDoctorRequest):
                 "rating": request.rating,
                 "comment": request.comment,
                 "timestamp": int(time.time())
-            }
+            },
+            "doctor_stats": doctor_stats
         }
+    except UnknownDoctor:
+        raise HTTPException(status_code=404, detail=f"Unknown doctor: {request.doctor_address}")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Rating submission failed: {str(e)}")
 
 @router.post("/emergency/set", response_model=Dict[str, Any])
-async def set_emergency_status(request: SetEmergencyRequest):
-    """Set emergency status for a patient"""
+async def set_emergency_status(request: SetEmergencyRequest, http_request: Request):
+    """Set emergency status for a patient.
+
+    Served by the node that owns the emergency location's region shard,
+    which records it and picks the nearest doctors to dispatch.
+    """
+    if not request.patient_address:
+        raise HTTPException(status_code=400, detail="Patient address is required")
+    location = request.location or (read_model.get(f"user:{request.patient_address}") or {}).get("location")
+    cell = cluster.cell(location)
+    forwarded = await cluster.route(http_request, cell)
+    if forwarded is not None:
+        return forwarded
     try:
-        if not request.patient_address:
-            raise HTTPException(status_code=400, detail="Patient address is required")
-        
         # Simulate smart contract interaction
         tx_id = f"DEMO_EMERGENCY_{int(time.time())}"
         
+        dispatch = None
+        if cell is not None:
+            if request.emergency_status:
+                record = cluster.raise_emergency(request.patient_address, location, cell)
+                dispatch = {"cell": cell, "node": cluster.node, "doctors": record["doctors"]}
+            else:
+                cluster.clear_emergency(request.patient_address, cell)
+        
         return {
             "success": True,
             "transaction_id": tx_id,
@@ -253,43 +370,188 @@ async def set_emergency_status(request: SetEmergencyRequest):
             "emergency_data": {
                 "patient_address": request.patient_address,
                 "emergency_status": request.emergency_status,
+                "location": location,
                 "timestamp": int(time.time())
-            }
+            },
+            "dispatch": dispatch
         }
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Emergency status update failed: {str(e)}")
 
+def build_read_model() -> Dict[str, Any]:
+    """Everything the read endpoints serve, keyed for the shared read model.
+
+    Published by one worker per host (see app.read_model); the other workers
+    read it from the shared snapshot.
+    """
+    # In a real implementation, this would query the smart contract
+    # For demo purposes, we'll build it from mock data
+    rating_engine.sync()
+    doctors = []
+    for doctor in MOCK_DOCTORS:
+        stats = rating_engine.stats(doctor["address"])
+        record = {key: value for key, value in doctor.items() if key != "rating_histogram"}
+        doctors.append({**record, "rating": stats["rating"], "rating_count": stats["rating_count"]})
+    entries: Dict[str, Any] = {
+        "stats": {
+            "total_doctors": len(MOCK_DOCTORS),
+            "total_patients": len(MOCK_PATIENTS),
+            "total_consultations": 500,  # Mock count
+            "owner": "DEMO_OWNER"
+        },
+        "doctors": doctors,
+        "emergency_patients": [
+            patient for patient in MOCK_PATIENTS if patient["emergency_status"] == 1
+        ],
+    }
+    # Per-region partitions of the lists: radius queries take their ETag from
+    # the partitions the radius reaches (see list_version)
+    for list_key in ("doctors", "emergency_patients"):
+        # Address order is what keyset pagination bisects on (see app.pagination)
+        entries[list_key].sort(key=lambda record: record["address"])
+        for record in entries[list_key]:
+            region = resolver.region(record["location"])
+            if region is not None:
+                entries.setdefault(f"{list_key}@{region}", []).append(record)
+    for doctor in MOCK_DOCTORS:
+        stats = rating_engine.stats(doctor["address"])
+        entries[f"user:{doctor['address']}"] = {
+            "address": doctor["address"],
+            "user_type": 1,
+            "name": doctor["name"],
+            "specialization": doctor["specialization"],
+            "rating_sum": stats["rating_sum"],
+            "rating_count": stats["rating_count"],
+            "consultations_count": doctor["consultations_count"],
+            "registered": True
+        }
+    for patient in MOCK_PATIENTS:
+        entries[f"user:{patient['address']}"] = {
+            "address": patient["address"],
+            "user_type": 2,
+            "name": patient["name"],
+            "emergency_status": patient["emergency_status"],
+            "location": patient["location"],
+            "registered": True
+        }
+    return entries
+
+_algod_client: Optional[PooledAlgodClient] = None
+
+def confirmed_round() -> Optional[int]:
+    """Last confirmed round, used to version read-model entries (None if algod is unreachable)"""
+    global _algod_client
+    try:
+        if _algod_client is None:
+            _algod_client = create_algod_client()
+        return _algod_client.status(timeout=2)["last-round"]
+    except Exception:
+        return None
+
+read_model.set_builder(build_read_model, round_source=confirmed_round)
+
+def not_modified(
+    request: Request, response: Response, key: str, representation: Optional[str] = None
+) -> Optional[Response]:
+    """Set ETag/Cache-Control for read-model entry `key`.
+
+    Returns a 304 response if the client's If-None-Match is still current, so
+    the handler can skip decoding the entry and building response models.
+    Handlers that pick the `representation` from the Accept header pass it
+    in: it becomes part of the ETag, and caches are told to vary on Accept.
+    """
+    return conditional(request, response, key, read_model.round_of(key), representation)
+
+def conditional(
+    request: Request,
+    response: Response,
+    key: str,
+    change_round: Optional[int],
+    representation: Optional[str] = None,
+) -> Optional[Response]:
+    """`not_modified` for a response versioned by (`key`, `change_round`)"""
+    if change_round is None:
+        return None
+    tag_key = key if representation is None else f"{key}#{representation}"
+    headers = {"ETag": make_etag(tag_key, change_round), "Cache-Control": cache_control()}
+    if representation is not None:
+        headers["Vary"] = "Accept"
+    if etag_matches(request.headers.get("if-none-match"), headers["ETag"]):
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return None
+
+def list_version(name: str, location: Optional[str], radius_km: Optional[float]) -> Tuple[str, Optional[int]]:
+    """(ETag key, change round) of a query on read-model list `name`.
+
+    Queries always rank the full list. A radius query can only return records
+    from the regions the radius reaches, so its ETag follows just those
+    regions' partitions; any other query follows the full list.
+    """
+    change_round = read_model.round_of(name)
+    regions = resolver.regions_within(location, radius_km) if location and radius_km is not None else None
+    if change_round is None or regions is None:
+        return name, change_round
+    # A region without records has no partition (0); it gets one once it has any
+    rounds = ",".join(f"{region}:{read_model.round_of(f'{name}@{region}') or 0}" for region in sorted(regions))
+    return f"{name}@{rounds}", 0
+
+def page_params(
+    request: Request,
+    name: str,
+    location: Optional[str],
+    radius_km: Optional[float],
+    limit: Optional[int],
+    cursor: Optional[str],
+    format: Optional[str],
+):
+    """Validate paging parameters: (paged?, stream?, cursor key, cursor scope)"""
+    stream = (format or "").lower() == "ndjson" or "application/x-ndjson" in request.headers.get("accept", "")
+    if limit is not None and not 1 <= limit <= settings.list_page_max:
+        raise HTTPException(status_code=400, detail=f"Limit must be between 1 and {settings.list_page_max}")
+    scope = query_scope(name, location or "", radius_km)
+    try:
+        after = decode_cursor(cursor, scope) if cursor else None
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return stream or limit is not None or cursor is not None, stream, after, scope
+
+def paged_list(
+    response: Response,
+    key: str,
+    location: Optional[str],
+    radius_km: Optional[float],
+    limit: Optional[int],
+    after: Optional[tuple],
+    scope: str,
+    stream: bool,
+):
+    """One page of read-model list `key` (all of it when `limit` is None).
+
+    The next page's cursor goes in the X-Next-Cursor header. When streaming,
+    records are serialized straight to NDJSON without response-model
+    validation; otherwise the handler validates the (bounded) page.
+    """
+    records, next_key = select(read_model.get(key, []), location, radius_km, after, limit)
+    headers = {name: response.headers[name] for name in ("ETag", "Cache-Control", "Vary") if name in response.headers}
+    if next_key is not None:
+        headers["X-Next-Cursor"] = encode_cursor(next_key, scope)
+    if stream:
+        return StreamingResponse(ndjson_chunks(records), media_type="application/x-ndjson", headers=headers)
+    response.headers.update(headers)
+    return list(records)
+
 @router.get("/user/{address}", response_model=UserInfoResponse)
-async def get_user_info(address: str):
+async def get_user_info(address: str, request: Request, response: Response):
     """Get user information"""
     try:
-        # In a real implementation, this would query the smart contract
-        # For demo purposes, we'll return mock data
-        
-        # Check if it's a known doctor
-        for doctor in MOCK_DOCTORS:
-            if doctor["address"] == address:
-                return UserInfoResponse(
-                    address=address,
-                    user_type=1,
-                    name=doctor["name"],
-                    specialization=doctor["specialization"],
-                    rating_sum=int(doctor["rating"] * 100),  # Convert to integer
-                    rating_count=25,  # Mock count
-                    consultations_count=doctor["consultations_count"],
-                    registered=True
-                )
-        
-        # Check if it's a known patient
-        for patient in MOCK_PATIENTS:
-            if patient["address"] == address:
-                return UserInfoResponse(
-                    address=address,
-                    user_type=2,
-                    name=patient["name"],
-                    emergency_status=patient["emergency_status"],
-                    registered=True
-                )
+        key = f"user:{address}"
+        cached = not_modified(request, response, key)
+        if cached is not None:
+            return cached
+        user = read_model.get(key)
+        if user is not None:
+            return UserInfoResponse(**user)
         
         # Return unregistered user
         return UserInfoResponse(
@@ -302,41 +564,128 @@ async def get_user_info(address: str):
         raise HTTPException(status_code=500, detail=f"Failed to get user info: {str(e)}")
 
 @router.get("/stats", response_model=GlobalStatsResponse)
-async def get_global_stats():
+async def get_global_stats(request: Request, response: Response):
     """Get global contract statistics"""
     try:
-        # In a real implementation, this would query the smart contract
-        return GlobalStatsResponse(
-            total_doctors=len(MOCK_DOCTORS),
-            total_patients=len(MOCK_PATIENTS),
-            total_consultations=500,  # Mock count
-            owner="DEMO_OWNER"
-        )
+        cached = not_modified(request, response, "stats")
+        if cached is not None:
+            return cached
+        return GlobalStatsResponse(**read_model.get("stats"))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to get stats: {str(e)}")
 
 @router.get("/emergency/patients", response_model=List[EmergencyPatientResponse])
-async def get_emergency_patients():
-    """Get list of patients in emergency status"""
+async def get_emergency_patients(
+    request: Request,
+    response: Response,
+    location: Optional[str] = None,
+    radius_km: Optional[float] = None,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+    format: Optional[str] = None,
+):
+    """Get patients in emergency status, nearest to `location` first.
+
+    Pass `limit` (and then the X-Next-Cursor value as `cursor`) to page
+    through the list, and `format=ndjson` to stream it as NDJSON.
+    """
+    forwarded = await cluster.route(request, cluster.cell(location))
+    if forwarded is not None:
+        return forwarded
+    paged, stream, after, scope = page_params(
+        request, "emergency_patients", location, radius_km, limit, cursor, format
+    )
     try:
+        cached = conditional(
+            request, response, *list_version("emergency_patients", location, radius_km), "ndjson" if stream else "json"
+        )
+        if cached is not None:
+            return cached
+        if paged:
+            page = paged_list(response, "emergency_patients", location, radius_km, limit, after, scope, stream)
+            if stream:
+                return page
+            return [EmergencyPatientResponse(**patient) for patient in page]
+        patients = read_model.get("emergency_patients", [])
         emergency_patients = [
-            EmergencyPatientResponse(**patient) 
-            for patient in MOCK_PATIENTS 
-            if patient["emergency_status"] == 1
+            EmergencyPatientResponse(**patient)
+            for patient in rank_by_distance(patients, location, radius_km)
         ]
         return emergency_patients
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to get emergency patients: {str(e)}")
 
+@router.get("/emergency/active")
+async def get_active_emergencies(request: Request, location: str):
+    """Emergencies raised through /emergency/set in `location`'s shard cell, oldest first"""
+    cell = cluster.cell(location)
+    if cell is None:
+        raise HTTPException(status_code=400, detail=f"Unknown location: {location}")
+    forwarded = await cluster.route(request, cell)
+    if forwarded is not None:
+        return forwarded
+    try:
+        return {"cell": cell, "node": cluster.node, "emergencies": cluster.active(cell)}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to get active emergencies: {str(e)}")
+
 @router.get("/doctors/nearby", response_model=List[NearbyDoctorResponse])
-async def get_nearby_doctors(location: Optional[str] = None):
-    """Get list of nearby doctors"""
+async def get_nearby_doctors(
+    request: Request,
+    response: Response,
+    location: Optional[str] = None,
+    radius_km: Optional[float] = None,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+    format: Optional[str] = None,
+):
+    """Get doctors nearest to `location` first (paging and streaming as
+    for /emergency/patients)"""
+    forwarded = await cluster.route(request, cluster.cell(location))
+    if forwarded is not None:
+        return forwarded
+    paged, stream, after, scope = page_params(
+        request, "doctors", location, radius_km, limit, cursor, format
+    )
     try:
-        nearby_doctors = [NearbyDoctorResponse(**doctor) for doctor in MOCK_DOCTORS]
+        cached = conditional(
+            request, response, *list_version("doctors", location, radius_km), "ndjson" if stream else "json"
+        )
+        if cached is not None:
+            return cached
+        if paged:
+            page = paged_list(response, "doctors", location, radius_km, limit, after, scope, stream)
+            if stream:
+                return page
+            return [NearbyDoctorResponse(**doctor) for doctor in page]
+        nearby_doctors = [
+            NearbyDoctorResponse(**doctor)
+            for doctor in rank_by_distance(read_model.get("doctors", []), location, radius_km)
+        ]
         return nearby_doctors
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to get nearby doctors: {str(e)}")
 
+@router.get("/doctors/top", response_model=List[TopDoctorResponse])
+async def get_top_doctors(
+    specialization: Optional[str] = None,
+    location: Optional[str] = None,
+    k: int = 10,
+):
+    """Get the best-rated doctors, optionally within a specialization and `location`'s region"""
+    if k < 1 or k > settings.rating_top_k_max:
+        raise HTTPException(
+            status_code=400, detail=f"k must be between 1 and {settings.rating_top_k_max}"
+        )
+    try:
+        region = resolver.region(location) if location else None
+        if location and region is None:
+            return []
+        top = await run_in_threadpool(rating_engine.top, k, specialization=specialization, region=region)
+        return [TopDoctorResponse(**doctor) for doctor in top]
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to get top doctors: {str(e)}")
+
 @router.get("/test-accounts")
 async def get_test_accounts():
     """Get test accounts for development"""
@@ -0,0 +1,477 @@
+"""Region sharding of emergency dispatch across backend nodes.
+
+A location maps to a geohash cell of ``SHARD_GEOHASH_PRECISION`` characters.
+Each cell is owned by one node, chosen by consistent hashing: every node puts
+``SHARD_VNODES`` points on a hash ring, and a cell belongs to the first point
+at or after its own hash. Requests about a location (raising an emergency,
+looking up doctors or active emergencies near it) are served by the owner of
+the location's cell. Any other node forwards them there, so a regional
+surge lands on the owners of that region's cells instead of on every node.
+
+Doctor and patient records come from the chain (the read model), so every
+node can rebuild them. For its cells, a node keeps an index of the doctors
+in them and in the eight cells around them, so a dispatch search near a cell
+edge stays local. It also keeps the live emergencies raised there. Those
+exist nowhere else, so when a node joins or leaves, the emergencies of the
+cells that change owner are handed to the new owner. Adding or removing a
+node only moves the cells on that node's arcs of the ring.
+
+Membership is gossip-free. ``SHARD_PEERS`` lists the cluster's nodes: a
+starting node joins every one it can reach, and only nodes on that list are
+admitted to the ring. A stopping node hands its cells off and then
+announces that it is leaving. A peer that refuses connections is dropped
+from the ring (its emergencies are lost) and re-joins when it starts again.
+
+Nodes authenticate to each other with ``SHARD_SECRET``, sent in the
+``X-Shard-Secret`` header on membership calls, handoffs and forwarded
+requests. The cluster endpoints are only mounted on clustered nodes.
+
+A node's ring and emergencies live in process memory, so a shard node is a
+single process: run it with one uvicorn worker. A second process started
+with the same ``SHARD_NODE_URL`` on the host refuses to start.
+"""
+
+import asyncio
+from bisect import bisect_left
+from hashlib import blake2b
+import heapq
+import hmac
+import logging
+import os
+import tempfile
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process lock, one worker is not enforced
+    fcntl = None
+
+from fastapi import HTTPException
+import httpx
+from starlette.background import BackgroundTask
+from starlette.requests import Request
+from starlette.responses import Response, StreamingResponse
+
+from .config import settings
+from .location import distance_km, resolver
+from .read_model import read_model
+
+
+logger = logging.getLogger(__name__)
+
+FORWARDED_HEADER = "x-shard-forwarded-by"
+SECRET_HEADER = "x-shard-secret"
+# Not copied onto the forwarded request / back onto our response
+_REQUEST_SKIP = {
+    "connection", "keep-alive", "transfer-encoding", "host", "content-length",
+    FORWARDED_HEADER, SECRET_HEADER,
+}
+_RESPONSE_SKIP = {"connection", "keep-alive", "transfer-encoding", "date", "server"}
+_BUFFERED_SKIP = _RESPONSE_SKIP | {"content-length", "content-encoding"}
+_BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+_BASE32_INDEX = {char: i for i, char in enumerate(_BASE32)}
+
+
+def geohash(lat: float, lon: float, precision: int) -> str:
+    """Geohash of a (lat, lon) point with `precision` characters"""
+    lat_range, lon_range = [-90.0, 90.0], [-180.0, 180.0]
+    chars = []
+    bits, value, even = 0, 0, True
+    while len(chars) < precision:
+        interval, coordinate = (lon_range, lon) if even else (lat_range, lat)
+        mid = (interval[0] + interval[1]) / 2
+        value <<= 1
+        if coordinate >= mid:
+            value |= 1
+            interval[0] = mid
+        else:
+            interval[1] = mid
+        even = not even
+        bits += 1
+        if bits == 5:
+            chars.append(_BASE32[value])
+            bits, value = 0, 0
+    return "".join(chars)
+
+
+def cell_bounds(cell: str) -> Tuple[float, float, float, float]:
+    """(min lat, max lat, min lon, max lon) of a geohash cell"""
+    lat_range, lon_range = [-90.0, 90.0], [-180.0, 180.0]
+    even = True
+    for char in cell:
+        value = _BASE32_INDEX[char]
+        for shift in range(4, -1, -1):
+            interval = lon_range if even else lat_range
+            mid = (interval[0] + interval[1]) / 2
+            if value >> shift & 1:
+                interval[0] = mid
+            else:
+                interval[1] = mid
+            even = not even
+    return lat_range[0], lat_range[1], lon_range[0], lon_range[1]
+
+
+def neighbours(cell: str) -> List[str]:
+    """The (up to) eight cells around `cell`, at the same precision"""
+    min_lat, max_lat, min_lon, max_lon = cell_bounds(cell)
+    height, width = max_lat - min_lat, max_lon - min_lon
+    lat, lon = (min_lat + max_lat) / 2, (min_lon + max_lon) / 2
+    around = []
+    for d_lat in (-1, 0, 1):
+        for d_lon in (-1, 0, 1):
+            if d_lat == d_lon == 0 or not -90 < lat + d_lat * height < 90:
+                continue
+            wrapped = (lon + d_lon * width + 180) % 360 - 180
+            around.append(geohash(lat + d_lat * height, wrapped, len(cell)))
+    return around
+
+
+def _ring_hash(key: str) -> int:
+    return int.from_bytes(blake2b(key.encode(), digest_size=8).digest(), "big")
+
+
+class HashRing:
+    """Immutable consistent-hash ring of node URLs"""
+
+    def __init__(self, nodes: Iterable[str], vnodes: int):
+        self.nodes = frozenset(nodes)
+        self.vnodes = vnodes
+        points = sorted(
+            (_ring_hash(f"{node}#{i}"), node) for node in self.nodes for i in range(vnodes)
+        )
+        self._hashes = [h for h, _ in points]
+        self._owners = [node for _, node in points]
+
+    def owner(self, key: str) -> str:
+        i = bisect_left(self._hashes, _ring_hash(key))
+        return self._owners[i % len(self._owners)]
+
+    def with_node(self, node: str) -> "HashRing":
+        return HashRing(self.nodes | {node}, self.vnodes)
+
+    def without_node(self, node: str) -> "HashRing":
+        return HashRing(self.nodes - {node}, self.vnodes)
+
+
+class Cluster:
+    """This node's view of the ring and the state of the cells it owns"""
+
+    def __init__(
+        self,
+        node: str,
+        seeds: Iterable[str],
+        vnodes: int,
+        precision: int,
+        forward_timeout: float,
+        dispatch_doctors: int,
+        secret: str = "",
+    ):
+        self.node = node
+        self.seeds = [seed for seed in seeds if seed != node]
+        self.secret = secret
+        self.precision = precision
+        self.forward_timeout = forward_timeout
+        self.dispatch_doctors = dispatch_doctors
+        self.ring = HashRing([node], vnodes)
+        # cell -> patient address -> emergency record
+        self.emergencies: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        self.served = 0
+        self.forwarded = 0
+        self._doctors: Dict[str, List[Tuple[Tuple[float, float], Dict[str, Any]]]] = {}
+        self._doctors_stamp: Any = None
+        self._client: Optional[httpx.AsyncClient] = None
+        self._lock_fd: Optional[int] = None
+
+    def _http(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                timeout=self.forward_timeout,
+                limits=httpx.Limits(max_connections=256, max_keepalive_connections=64),
+            )
+        return self._client
+
+    def cell(self, location: Optional[str]) -> Optional[str]:
+        """Geohash cell of a location, or None if it cannot be resolved"""
+        point = resolver.resolve(location) if location else None
+        return geohash(point[0], point[1], self.precision) if point is not None else None
+
+    def owner(self, cell: str) -> str:
+        return self.ring.owner(cell)
+
+    def authorized(self, secret: Optional[str]) -> bool:
+        """True if `secret` is the cluster secret (never, when none is configured)"""
+        if not self.secret or not secret:
+            return False
+        return hmac.compare_digest(secret.encode(), self.secret.encode())
+
+    def allows(self, node: str) -> bool:
+        """True if `node` is on the SHARD_PEERS allow-list"""
+        return node == self.node or node in self.seeds
+
+    def _auth_headers(self) -> Dict[str, str]:
+        return {SECRET_HEADER: self.secret}
+
+    # Routing
+
+    async def route(self, request: Request, cell: Optional[str]) -> Optional[Response]:
+        """Forward `request` to the owner of `cell`, or return None to serve it here.
+
+        Requests already forwarded by another node (which must carry the
+        cluster secret) are always served here, so two nodes whose rings
+        disagree during a rebalance cannot bounce a request between them.
+        """
+        forwarded = request.headers.get(FORWARDED_HEADER) and self.authorized(request.headers.get(SECRET_HEADER))
+        if cell is None or forwarded:
+            self.served += 1
+            return None
+        owner = self.owner(cell)
+        if owner == self.node:
+            self.served += 1
+            return None
+
+        client = self._http()
+        headers = [(k, v) for k, v in request.headers.items() if k not in _REQUEST_SKIP]
+        headers.append((FORWARDED_HEADER, self.node))
+        headers.append((SECRET_HEADER, self.secret))
+        upstream_request = client.build_request(
+            request.method,
+            owner + request.url.path,
+            params=request.url.query,
+            headers=headers,
+            content=await request.body(),
+        )
+        try:
+            upstream = await client.send(upstream_request, stream=True)
+        except httpx.ConnectError:
+            logger.warning("Shard owner %s is unreachable; dropping it from the ring", owner)
+            self.remove(owner)
+            return await self.route(request, cell)
+        except httpx.HTTPError as e:
+            raise HTTPException(status_code=502, detail=f"Shard owner {owner} failed: {str(e)}")
+        self.forwarded += 1
+        if upstream.headers.get("content-type", "").startswith("application/x-ndjson"):
+            return StreamingResponse(
+                upstream.aiter_raw(),
+                status_code=upstream.status_code,
+                headers={k: v for k, v in upstream.headers.items() if k not in _RESPONSE_SKIP},
+                background=BackgroundTask(upstream.aclose),
+            )
+        try:
+            content = await upstream.aread()
+        except httpx.HTTPError as e:
+            raise HTTPException(status_code=502, detail=f"Shard owner {owner} failed: {str(e)}")
+        finally:
+            await upstream.aclose()
+        return Response(
+            content,
+            status_code=upstream.status_code,
+            headers={k: v for k, v in upstream.headers.items() if k not in _BUFFERED_SKIP},
+        )
+
+    # Membership
+
+    def admit(self, node: str) -> List[Dict[str, Any]]:
+        """Add `node` to the ring and hand over the emergencies of the cells it now owns"""
+        if node in self.ring.nodes:
+            return []
+        self.ring = self.ring.with_node(node)
+        return self._release(lambda cell: self.owner(cell) != self.node)
+
+    def remove(self, node: str) -> None:
+        if node != self.node and node in self.ring.nodes:
+            self.ring = self.ring.without_node(node)
+
+    def accept(self, records: Iterable[Dict[str, Any]]) -> int:
+        """Store emergencies handed over by another node (the newer record wins)"""
+        accepted = 0
+        for record in records:
+            cell_records = self.emergencies.setdefault(record["cell"], {})
+            current = cell_records.get(record["address"])
+            if current is None or current["raised_at"] <= record["raised_at"]:
+                cell_records[record["address"]] = record
+                accepted += 1
+        return accepted
+
+    def _release(self, moved) -> List[Dict[str, Any]]:
+        released = []
+        for cell in [cell for cell in self.emergencies if moved(cell)]:
+            released.extend(self.emergencies.pop(cell).values())
+        return released
+
+    async def start(self) -> None:
+        """Join the cluster through the seed peers (startup hook)"""
+        if self.node == "local":
+            if self.seeds:
+                logger.warning("SHARD_PEERS is set but SHARD_NODE_URL is not; running as a single node")
+            return
+        if not self.secret:
+            raise RuntimeError("SHARD_SECRET must be set when SHARD_NODE_URL is")
+        self._claim_node()
+        pending, contacted = list(self.seeds), {self.node}
+        while pending:
+            peer = pending.pop()
+            if peer in contacted:
+                continue
+            contacted.add(peer)
+            try:
+                response = await self._http().post(
+                    f"{peer}/api/cluster/join", json={"node": self.node}, headers=self._auth_headers()
+                )
+                response.raise_for_status()
+            except httpx.HTTPError as e:
+                logger.info("Shard peer %s did not answer the join: %s", peer, e)
+                continue
+            body = response.json()
+            self.ring = self.ring.with_node(peer)
+            self.accept(body["emergencies"])
+            pending.extend(node for node in body["nodes"] if node not in contacted and self.allows(node))
+        logger.info("Joined shard ring with %d node(s)", len(self.ring.nodes))
+
+    def _claim_node(self) -> None:
+        """Lock this node's URL for the life of the process.
+
+        Every worker would otherwise join under the same URL with its own
+        ring and emergencies, and requests would reach a random one of them.
+        """
+        if fcntl is None:
+            return
+        digest = blake2b(self.node.encode(), digest_size=8).hexdigest()
+        path = os.path.join(tempfile.gettempdir(), f"hosconnect-shard-{digest}.lock")
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            os.close(fd)
+            raise RuntimeError(
+                f"Shard node {self.node} is already served by another process; "
+                "run each shard node with a single worker"
+            )
+        self._lock_fd = fd
+
+    async def stop(self) -> None:
+        """Hand every cell to its next owner, then leave the ring (shutdown hook)"""
+        peers = sorted(self.ring.nodes - {self.node})
+        if peers:
+            remaining = self.ring.without_node(self.node)
+            by_owner: Dict[str, List[Dict[str, Any]]] = {}
+            for record in self._release(lambda cell: True):
+                by_owner.setdefault(remaining.owner(record["cell"]), []).append(record)
+            client = self._http()
+            for owner, records in by_owner.items():
+                try:
+                    response = await client.post(
+                        f"{owner}/api/cluster/handoff",
+                        json={"emergencies": records},
+                        headers=self._auth_headers(),
+                    )
+                    response.raise_for_status()
+                except httpx.HTTPError as e:
+                    logger.warning("Handoff of %d emergencies to %s failed: %s", len(records), owner, e)
+            await asyncio.gather(
+                *(
+                    client.post(f"{peer}/api/cluster/leave", json={"node": self.node}, headers=self._auth_headers())
+                    for peer in peers
+                ),
+                return_exceptions=True,
+            )
+            self.ring = HashRing([self.node], self.ring.vnodes)
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+        if self._lock_fd is not None:
+            os.close(self._lock_fd)
+            self._lock_fd = None
+
+    # Emergencies
+
+    def _doctor_index(self) -> Dict[str, List[Tuple[Tuple[float, float], Dict[str, Any]]]]:
+        """(point, doctor) pairs by cell, for the cells this node owns and the
+        ones around them. Rebuilt when the doctor list or the ring changes.
+        """
+        stamp = (read_model.round_of("doctors"), self.ring.nodes)
+        if stamp != self._doctors_stamp:
+            by_cell: Dict[str, List[Tuple[Tuple[float, float], Dict[str, Any]]]] = {}
+            for doctor in read_model.get("doctors", []):
+                point = resolver.resolve(doctor.get("location") or "")
+                if point is not None:
+                    cell = geohash(point[0], point[1], self.precision)
+                    by_cell.setdefault(cell, []).append((point, doctor))
+            self._doctors = {
+                cell: doctors
+                for cell, doctors in by_cell.items()
+                if any(self.owner(c) == self.node for c in [cell, *neighbours(cell)])
+            }
+            self._doctors_stamp = stamp
+        return self._doctors
+
+    def nearest_doctors(self, location: str, cell: str, k: int) -> List[Dict[str, Any]]:
+        """The `k` doctors nearest to `location`, searched in its cell and the eight around it"""
+        origin = resolver.resolve(location)
+        index = self._doctor_index()
+        # Doctors at the same place are the same distance away: one haversine per place
+        distances: Dict[Tuple[float, float], float] = {}
+        candidates = []
+        for nearby in [cell, *neighbours(cell)]:
+            for point, doctor in index.get(nearby, ()):
+                distance = distances.get(point)
+                if distance is None:
+                    distance = distances[point] = round(distance_km(origin, point), 1)
+                candidates.append((distance, doctor["address"], doctor))
+        ranked = heapq.nsmallest(k, candidates, key=lambda item: item[:2])
+        return [
+            {
+                "address": doctor["address"],
+                "name": doctor["name"],
+                "specialization": doctor["specialization"],
+                "location": doctor["location"],
+                "distance_km": distance,
+            }
+            for distance, _, doctor in ranked
+        ]
+
+    def raise_emergency(self, address: str, location: str, cell: str) -> Dict[str, Any]:
+        """Record an emergency in `cell` and pick the doctors to dispatch"""
+        record = {
+            "address": address,
+            "location": location,
+            "cell": cell,
+            "raised_at": time.time(),
+            "doctors": self.nearest_doctors(location, cell, self.dispatch_doctors),
+        }
+        self.emergencies.setdefault(cell, {})[address] = record
+        return record
+
+    def clear_emergency(self, address: str, cell: str) -> bool:
+        cell_records = self.emergencies.get(cell)
+        if not cell_records or cell_records.pop(address, None) is None:
+            return False
+        if not cell_records:
+            del self.emergencies[cell]
+        return True
+
+    def active(self, cell: str) -> List[Dict[str, Any]]:
+        return sorted(self.emergencies.get(cell, {}).values(), key=lambda record: record["raised_at"])
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "node": self.node,
+            "nodes": sorted(self.ring.nodes),
+            "geohash_precision": self.precision,
+            "vnodes": self.ring.vnodes,
+            "cells": len(self.emergencies),
+            "emergencies": sum(len(records) for records in self.emergencies.values()),
+            "served": self.served,
+            "forwarded": self.forwarded,
+        }
+
+
+cluster = Cluster(
+    settings.shard_node_url.rstrip("/") or "local",
+    [peer.strip().rstrip("/") for peer in settings.shard_peers.split(",") if peer.strip()],
+    vnodes=settings.shard_vnodes,
+    precision=settings.shard_geohash_precision,
+    forward_timeout=settings.shard_forward_timeout_seconds,
+    dispatch_doctors=settings.shard_dispatch_doctors,
+    secret=settings.shard_secret,
+)
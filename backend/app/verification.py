@@ -0,0 +1,141 @@
+"""Ed25519 login-signature verification off the request path.
+
+Single verifications run on a dedicated thread pool (libsodium releases the
+GIL) so a login burst does not compete with FastAPI's shared threadpool.
+Large batches are split into chunks and spread across a process pool.
+"""
+
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import asyncio
+import base64
+import os
+import threading
+from typing import List, Optional, Sequence, Tuple
+
+from algosdk import encoding
+from nacl.signing import VerifyKey
+
+from .config import settings
+
+
+# (address, nonce, signature_b64)
+SignedChallenge = Tuple[str, str, str]
+
+_lock = threading.Lock()
+_thread_pool: Optional[ThreadPoolExecutor] = None
+_process_pool: Optional[Executor] = None
+# Set once creating a process pool has failed, so it is not retried per batch
+_process_pool_unavailable = False
+
+
+def challenge_message(nonce: str) -> str:
+    return f"HosConnect login nonce: {nonce}"
+
+
+def verify_login_signature(address: str, nonce: str, signature_b64: str) -> bool:
+    """True if `signature_b64` is `address`'s signature over the challenge for `nonce`"""
+    try:
+        signature = base64.b64decode(signature_b64)
+        pubkey_bytes = encoding.decode_address(address)
+        VerifyKey(pubkey_bytes).verify(challenge_message(nonce).encode(), signature)
+        return True
+    except Exception:
+        return False
+
+
+def verify_chunk(items: Sequence[SignedChallenge]) -> List[bool]:
+    """Verify a chunk of signed challenges (runs inside pool workers)"""
+    return [verify_login_signature(*item) for item in items]
+
+
+def _cpu_count() -> int:
+    return os.cpu_count() or 1
+
+
+def _ensure_thread_pool() -> ThreadPoolExecutor:
+    global _thread_pool
+    if _thread_pool is None:
+        _thread_pool = ThreadPoolExecutor(
+            max_workers=settings.verify_thread_workers or min(32, _cpu_count() * 4),
+            thread_name_prefix="verify",
+        )
+    return _thread_pool
+
+
+def thread_pool() -> ThreadPoolExecutor:
+    with _lock:
+        return _ensure_thread_pool()
+
+
+def process_pool() -> Executor:
+    """Process pool for batch verification; falls back to the thread pool
+    where worker processes are unavailable (e.g. serverless runtimes)."""
+    global _process_pool, _process_pool_unavailable
+    with _lock:
+        if _process_pool_unavailable:
+            return _ensure_thread_pool()
+        if _process_pool is None:
+            try:
+                _process_pool = ProcessPoolExecutor(
+                    max_workers=settings.verify_process_workers or _cpu_count()
+                )
+            except (OSError, NotImplementedError, ImportError):
+                _process_pool_unavailable = True
+                return _ensure_thread_pool()
+        return _process_pool
+
+
+def _discard_process_pool(broken: Executor) -> None:
+    """Drop a process pool whose workers died, so the next call starts a fresh one"""
+    global _process_pool
+    with _lock:
+        if _process_pool is broken:
+            _process_pool = None
+    broken.shutdown(wait=False, cancel_futures=True)
+
+
+async def verify_async(address: str, nonce: str, signature_b64: str) -> bool:
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        thread_pool(), verify_login_signature, address, nonce, signature_b64
+    )
+
+
+async def verify_batch_async(items: Sequence[SignedChallenge]) -> List[bool]:
+    """Verify many signed challenges in parallel, preserving input order"""
+    if not items:
+        return []
+
+    loop = asyncio.get_running_loop()
+    if len(items) < settings.verify_process_min_batch:
+        # IPC overhead outweighs the GIL for small batches
+        return await loop.run_in_executor(thread_pool(), verify_chunk, list(items))
+
+    workers = settings.verify_process_workers or _cpu_count()
+    chunk_size = max(1, -(-len(items) // workers))
+    chunks = [list(items[i:i + chunk_size]) for i in range(0, len(items), chunk_size)]
+    # A worker process that dies breaks the whole pool, and workers are only
+    # spawned on first submit: retry once on a fresh pool, then use threads
+    for _ in range(2):
+        executor = process_pool()
+        try:
+            results = await asyncio.gather(
+                *(loop.run_in_executor(executor, verify_chunk, chunk) for chunk in chunks)
+            )
+            return [ok for chunk_result in results for ok in chunk_result]
+        except (BrokenProcessPool, OSError):
+            if isinstance(executor, ThreadPoolExecutor):
+                raise
+            _discard_process_pool(executor)
+    return await loop.run_in_executor(thread_pool(), verify_chunk, list(items))
+
+
+def shutdown_executors() -> None:
+    global _thread_pool, _process_pool
+    with _lock:
+        for executor in (_process_pool, _thread_pool):
+            if executor is not None:
+                executor.shutdown(wait=False, cancel_futures=True)
+        _thread_pool = None
+        _process_pool = None
@@ -0,0 +1,139 @@
+"""Account pool generation, leasing and funding at 10k accounts.
+
+1. Generate the pool serially and across all CPUs, and report the file size.
+2. Lease the whole pool from 4 processes at once, in batches of 50, and
+   check that no account was handed out twice.
+3. Fund and opt in every account against a stub algod that accepts
+   transaction groups and confirms them at once. This measures grouping,
+   signing and submission, not consensus. A second run must find nothing
+   left to do.
+
+Run from the backend directory:
+
+    python -m benchmarks.account_pool_bench [accounts]
+"""
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from multiprocessing import Process, Queue
+import base64
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+from algosdk import account  # noqa: E402
+from algosdk.v2client.algod import AlgodClient  # noqa: E402
+
+from app.algorand.account_pool import (  # noqa: E402
+    AccountPool, AccountPoolExhausted, fund, generate,
+)
+
+PARAMS = {
+    "consensus-version": "future",
+    "fee": 0,
+    "genesis-hash": base64.b64encode(b"\x01" * 32).decode(),
+    "genesis-id": "stubnet-v1",
+    "last-round": 1000,
+    "min-fee": 1000,
+}
+
+
+class StubAlgod(BaseHTTPRequestHandler):
+    groups = 0
+
+    def log_message(self, *args):
+        pass
+
+    def _reply(self, body: dict) -> None:
+        data = json.dumps(body).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        if self.path.startswith("/v2/transactions/params"):
+            self._reply(PARAMS)
+        elif self.path.startswith("/v2/transactions/pending/"):
+            self._reply({"confirmed-round": 1001, "pool-error": ""})
+        else:
+            self._reply({"last-round": 1001})
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        StubAlgod.groups += 1
+        self._reply({"txId": "STUB"})
+
+
+def lease_worker(path: str, batch: int, out: Queue, done: Queue) -> None:
+    pool = AccountPool(path)
+    held = []
+    start = time.perf_counter()
+    while True:
+        try:
+            held.append(pool.lease(batch))
+        except AccountPoolExhausted:
+            break
+    elapsed = time.perf_counter() - start
+    out.put(([a.index for lease in held for a in lease.accounts], elapsed))
+    # Hold the leases until the parent has collected every worker's result
+    done.get()
+    pool.close()
+
+
+def main() -> None:
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+    workdir = tempfile.mkdtemp(prefix="hosconnect-accounts-")
+    path = os.path.join(workdir, "pool.bin")
+
+    start = time.perf_counter()
+    generate(os.path.join(workdir, "serial.bin"), count, workers=1)
+    serial = time.perf_counter() - start
+    start = time.perf_counter()
+    generate(path, count)
+    parallel = time.perf_counter() - start
+    print(f"generate  {count:,} keypairs: serial {serial:.2f}s, "
+          f"{os.cpu_count()} CPU(s) {parallel:.2f}s; file {os.path.getsize(path) / 1024:.0f} KB")
+
+    results, done = Queue(), Queue()
+    workers = [Process(target=lease_worker, args=(path, 50, results, done)) for _ in range(4)]
+    for worker in workers:
+        worker.start()
+    collected = [results.get() for _ in workers]
+    for _ in workers:
+        done.put(None)
+    for worker in workers:
+        worker.join()
+    leased = [index for indices, _ in collected for index in indices]
+    slowest = max(elapsed for _, elapsed in collected)
+    assert len(leased) == len(set(leased)), "an account was leased twice"
+    print(f"lease     {len(leased):,} accounts from 4 processes in {slowest:.2f}s, no duplicates "
+          f"(per process: {', '.join(str(len(i)) for i, _ in collected)})")
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubAlgod)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    algod = AlgodClient("", f"http://127.0.0.1:{server.server_address[1]}")
+    funder_key, _ = account.generate_account()
+
+    pool = AccountPool(path)
+    start = time.perf_counter()
+    stats = fund(pool, algod, funder_key, 1_000_000, app_id=1)
+    elapsed = time.perf_counter() - start
+    print(f"fund      {stats['accounts']:,} accounts in {stats['groups']:,} groups: {elapsed:.2f}s "
+          f"({stats['accounts'] / elapsed:,.0f} accounts/s, {stats['groups'] / elapsed:,.0f} groups/s)")
+    assert pool.status()["opted_in"] == count
+
+    again = fund(AccountPool(path), algod, funder_key, 1_000_000, app_id=1)
+    assert again["groups"] == 0
+    print(f"resume    second run sent {again['groups']} groups")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
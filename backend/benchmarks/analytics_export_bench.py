@@ -0,0 +1,118 @@
+"""Export and aggregation speed of the columnar event store for 1M events.
+
+A stub indexer serves synthetic application-call pages (1000 per page,
+spread over 30 days, ~60% PoW / 30% ratings / 10% emergencies) in the same
+JSON shape as the real indexer, so decoding is included in the export time.
+The export is run in two increments to exercise the round checkpoint, then
+each built-in aggregate is timed against the resulting Parquet dataset.
+
+Run from the backend directory:
+
+    python -m benchmarks.analytics_export_bench [events]
+"""
+
+import base64
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+from algosdk.encoding import encode_address  # noqa: E402
+
+from app import analytics  # noqa: E402
+
+START_TIME = 1_790_000_000
+ROUND_SECONDS = 2.8
+DAYS = 30
+
+
+def b64(value: bytes) -> str:
+    return base64.b64encode(value).decode()
+
+
+class StubIndexer:
+    """Serves the first `available` of `total` synthetic transactions, oldest first"""
+
+    def __init__(self, total: int, available: int, doctors: int = 500, patients: int = 20_000, seed: int = 7):
+        rng = random.Random(seed)
+        self.total = available
+        self.doctors = [encode_address(rng.randbytes(32)) for _ in range(doctors)]
+        self.patients = [f"PATIENT{i:051d}" for i in range(patients)]
+        self.rounds_per_day = int(86_400 / ROUND_SECONDS)
+        self.per_round = max(1, total // (DAYS * self.rounds_per_day))
+        self.rng = rng
+
+    def _txn(self, i: int) -> dict:
+        rng = self.rng
+        rnd = 1 + i // self.per_round
+        now = int(START_TIME + rnd * ROUND_SECONDS)
+        patient = rng.choice(self.patients)
+        roll = rng.random()
+        if roll < 0.6:
+            sender = rng.choice(self.doctors)
+            args = [b"submit_pow", patient.encode(), b"h" * 32, now.to_bytes(8, "big")]
+        elif roll < 0.9:
+            sender = patient
+            args = [b"rate_doctor", rng.choice(self.doctors).encode(), rng.randint(1, 5).to_bytes(8, "big")]
+        else:
+            sender = patient
+            args = [b"set_emergency", int(rng.random() < 0.8).to_bytes(8, "big")]
+        return {
+            "id": f"TX{i:050d}",
+            "sender": sender,
+            "confirmed-round": rnd,
+            "round-time": now,
+            "tx-type": "appl",
+            "application-transaction": {"application-id": 1, "application-args": [b64(a) for a in args]},
+        }
+
+    def search_transactions(self, min_round=0, limit=1000, next_page=None, **_):
+        start = int(next_page) if next_page else max(0, (min_round - 1) * self.per_round)
+        end = min(self.total, start + limit)
+        return {
+            "transactions": [self._txn(i) for i in range(start, end)],
+            "next-token": str(end) if end < self.total else None,
+        }
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+
+def main() -> None:
+    total = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    out_dir = tempfile.mkdtemp(prefix="hosconnect-events-")
+    try:
+        first = StubIndexer(total, total // 2)
+        stats, elapsed = timed(analytics.run_export, out_dir, first, 1)
+        print(f"export #1: {stats['events']:>9,} events in {elapsed:6.2f}s "
+              f"({stats['events'] / elapsed:,.0f} events/s) -> round {stats['last_round']}")
+
+        second = StubIndexer(total, total)
+        stats, elapsed = timed(analytics.run_export, out_dir, second, 1)
+        print(f"export #2: {stats['events']:>9,} events in {elapsed:6.2f}s "
+              f"({stats['events'] / elapsed:,.0f} events/s) -> round {stats['last_round']}")
+
+        size = sum(
+            os.path.getsize(os.path.join(root, name))
+            for root, _, names in os.walk(out_dir) for name in names
+        )
+        rows = analytics.open_events(out_dir).count_rows()
+        print(f"dataset:   {rows:>9,} rows, {size / 1e6:.1f} MB on disk "
+              f"({size / max(rows, 1):.1f} B/event)")
+
+        for name, query in analytics.QUERIES.items():
+            table, elapsed = timed(query, out_dir)
+            print(f"{name:<14} {elapsed * 1000:8.1f} ms  ({table.num_rows:,} result rows)")
+    finally:
+        shutil.rmtree(out_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
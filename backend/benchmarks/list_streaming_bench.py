@@ -0,0 +1,118 @@
+"""Memory and time-to-first-byte of /emergency/patients at 100k records.
+
+Each mode gets a fresh uvicorn server whose read model holds 100k
+synthetic emergency patients. The server is warmed up with a one-record
+request, so the decoded list is already memoized. Then one request is
+timed, reporting time to first body byte, total time, response size and
+the growth of the server's peak RSS (VmHWM) caused by that request.
+
+Run from the backend directory:
+
+    python -m benchmarks.list_streaming_bench [records]
+"""
+
+import http.client
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+SERVER = """
+import uvicorn
+from app.routers import medical
+from app.main import app
+
+cities = ["New York, NY", "Boston, MA", "Chicago, IL", "Seattle, WA", "Austin, TX", "Denver, CO"]
+medical.MOCK_PATIENTS.extend(
+    {{"address": f"PATIENT{{i:07d}}", "name": f"Patient {{i}}", "emergency_status": 1,
+      "location": cities[i % len(cities)]}}
+    for i in range({records})
+)
+uvicorn.run(app, host="127.0.0.1", port={port}, log_level="warning")
+"""
+
+MODES = [
+    ("full list, JSON (before)", "/api/medical/emergency/patients"),
+    ("first page, limit=100", "/api/medical/emergency/patients?limit=100"),
+    ("full list, NDJSON stream", "/api/medical/emergency/patients?format=ndjson"),
+    ("by distance, JSON (before)", "/api/medical/emergency/patients?location=Philadelphia,%20PA"),
+    ("by distance, limit=100", "/api/medical/emergency/patients?location=Philadelphia,%20PA&limit=100"),
+    ("by distance, NDJSON stream", "/api/medical/emergency/patients?location=Philadelphia,%20PA&format=ndjson"),
+]
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def peak_rss_kb(pid: int) -> int:
+    with open(f"/proc/{pid}/status") as f:
+        for line in f:
+            if line.startswith("VmHWM:"):
+                return int(line.split()[1])
+    return 0
+
+
+def fetch(port: int, path: str):
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=120)
+    start = time.perf_counter()
+    conn.request("GET", path)
+    response = conn.getresponse()
+    response.read(1)
+    first_byte = time.perf_counter() - start
+    size = 1 + len(response.read())
+    total = time.perf_counter() - start
+    conn.close()
+    return response.status, first_byte, total, size
+
+
+def run_mode(records: int, path: str, workdir: str):
+    port = free_port()
+    env = {
+        **os.environ,
+        "READ_MODEL_PATH": os.path.join(workdir, f"read-model-{port}.bin"),
+        "READ_MODEL_SLOT_BYTES": str(256 * 1024 * 1024),
+        "READ_MODEL_REFRESH_SECONDS": "3600",
+    }
+    server = subprocess.Popen(
+        [sys.executable, "-c", SERVER.format(records=records, port=port)],
+        cwd=os.path.join(os.path.dirname(__file__), ".."),
+        env=env,
+    )
+    try:
+        deadline = time.time() + 120
+        while True:
+            try:
+                status, *_ = fetch(port, "/api/medical/emergency/patients?limit=1")
+                if status == 200:
+                    break
+            except OSError:
+                pass
+            if time.time() > deadline:
+                raise RuntimeError("server did not start")
+            time.sleep(0.2)
+        before = peak_rss_kb(server.pid)
+        status, first_byte, total, size = fetch(port, path)
+        assert status == 200, status
+        return first_byte, total, size, peak_rss_kb(server.pid) - before
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main() -> None:
+    records = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    workdir = tempfile.mkdtemp(prefix="hosconnect-lists-")
+    print(f"{records:,} emergency patients")
+    for label, path in MODES:
+        first_byte, total, size, rss_growth = run_mode(records, path, workdir)
+        print(f"{label:<28} TTFB {first_byte * 1000:8.1f} ms   total {total * 1000:8.1f} ms   "
+              f"{size / 1e6:6.2f} MB   peak RSS +{rss_growth / 1024:6.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
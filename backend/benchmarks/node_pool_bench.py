@@ -0,0 +1,154 @@
+"""Hedged reads and write failover against local stub algod nodes.
+
+Three stub nodes run in-process with injected latency:
+
+    fast   5 ms, but 3% of requests stall for 300 ms
+    mid    8 ms, 1% stall for 300 ms
+    slow  15 ms, no stalls
+
+Reads (account lookups) are timed through a plain AlgodClient on the fast
+node and through a PooledAlgodClient over all three, reporting p50/p99/max.
+Then the fast node is taken down: writes must fail over and the node must
+be ejected. It is brought back and must be re-admitted once its ejection
+expires.
+
+Run from the backend directory:
+
+    python -m benchmarks.node_pool_bench [reads]
+"""
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import base64
+import json
+import os
+import random
+import sys
+import threading
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+from algosdk.v2client.algod import AlgodClient  # noqa: E402
+
+from app.algorand.node_pool import Endpoint, NodePool, PooledAlgodClient  # noqa: E402
+
+ADDRESS = "A" * 58
+
+
+class StubNode:
+    """Minimal algod: /v2/status, /v2/accounts/{address}, POST /v2/transactions"""
+
+    def __init__(self, name: str, base_ms: float, stall_rate: float = 0.0, stall_ms: float = 300.0, port: int = 0):
+        self.name = name
+        self.base = base_ms / 1000
+        self.stall_rate = stall_rate
+        self.stall = stall_ms / 1000
+        self.requests = 0
+        self.rng = random.Random(name)
+        self.server = ThreadingHTTPServer(("127.0.0.1", port), self._handler())
+        self.server.daemon_threads = True
+        self.port = self.server.server_address[1]
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+    def stop(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+    def _handler(self):
+        node = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def _reply(self, body: dict) -> None:
+                node.requests += 1
+                delay = node.base + (node.stall if node.rng.random() < node.stall_rate else 0.0)
+                time.sleep(delay)
+                data = json.dumps(body).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self):
+                if self.path.startswith("/v2/accounts/"):
+                    self._reply({"address": ADDRESS, "amount": 1_000_000, "node": node.name})
+                else:
+                    self._reply({"last-round": 1000, "node": node.name})
+
+            def do_POST(self):
+                self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                self._reply({"txId": f"TX-{node.name}"})
+
+        return Handler
+
+
+def percentiles(samples):
+    ordered = sorted(samples)
+    pick = lambda q: ordered[min(len(ordered) - 1, int(len(ordered) * q))] * 1000  # noqa: E731
+    return f"p50 {pick(0.5):6.1f} ms  p99 {pick(0.99):6.1f} ms  max {ordered[-1] * 1000:6.1f} ms"
+
+
+def timed_reads(client, n: int):
+    samples = []
+    for _ in range(n):
+        start = time.perf_counter()
+        client.account_info(ADDRESS)
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def main() -> None:
+    reads = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    fast = StubNode("fast", 5, stall_rate=0.03)
+    mid = StubNode("mid", 8, stall_rate=0.01)
+    slow = StubNode("slow", 15)
+
+    single = AlgodClient("", fast.url)
+    print(f"single node  {percentiles(timed_reads(single, reads))}")
+
+    pool = NodePool(
+        [Endpoint(node.url, AlgodClient("", node.url)) for node in (fast, mid, slow)],
+        eject_after=3,
+        eject_seconds=1.0,
+    )
+    pooled = PooledAlgodClient(pool)
+    timed_reads(pooled, 50)  # warm up the latency windows
+    print(f"hedged pool  {percentiles(timed_reads(pooled, reads))}  "
+          f"(hedges {pool.hedges}, won by runner-up {pool.hedge_wins})")
+
+    txn = base64.b64encode(b"signed-txn").decode()
+    print(f"write        -> {pooled.send_raw_transaction(txn)} (healthiest node)")
+
+    fast.stop()
+    results = [pooled.send_raw_transaction(txn) for _ in range(5)]
+    state = {e["url"]: e for e in pool.health()["endpoints"]}
+    print(f"fast down    writes -> {sorted(set(results))}, fast ejected: {state[fast.url]['ejected']}")
+    assert "TX-fast" not in results
+
+    # Reads keep working while it is out
+    for _ in range(5):
+        pooled.account_info(ADDRESS)
+    state = {e["url"]: e for e in pool.health()["endpoints"]}
+    assert state[fast.url]["ejected"], "fast node should be ejected"
+
+    fast = StubNode("fast", 5, port=fast.port)
+    time.sleep(1.1)
+    before = fast.requests
+    timed_reads(pooled, 100)
+    state = {e["url"]: e for e in pool.health()["endpoints"]}
+    print(f"fast back    ejected: {state[fast.url]['ejected']}, served {fast.requests - before} of 100 reads")
+    assert not state[fast.url]["ejected"] and fast.requests > before
+
+    for node in (fast, mid, slow):
+        node.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""Nonce store throughput, latency and footprint at 10k challenges/s.
+
+For each store: unpaced issue/consume throughput, then a paced run that
+issues 10k nonces/s (redeeming 90% of them) with a short TTL so bucket
+expiry is exercised, reporting p50/p99 issue+consume latency and the peak
+number of outstanding nonces. The SQLite store is also checked for
+cross-process consumption.
+
+Run from the backend directory:
+
+    python -m benchmarks.nonce_store_bench [seconds]
+"""
+
+from multiprocessing import Process, Queue
+import os
+import secrets
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+from app.nonce_store import MemoryNonceStore, SQLiteNonceStore  # noqa: E402
+
+RATE = 10_000
+
+
+def throughput(store, n: int = 50_000) -> float:
+    nonces = [secrets.token_urlsafe(16) for _ in range(n)]
+    start = time.perf_counter()
+    for nonce in nonces:
+        store.issue(nonce)
+    for nonce in nonces:
+        store.consume(nonce)
+    return 2 * n / (time.perf_counter() - start)
+
+
+def paced(store, seconds: float) -> dict:
+    latencies = []
+    peak = 0
+    issued = 0
+    start = time.perf_counter()
+    deadline = start + seconds
+    while time.perf_counter() < deadline:
+        # Issue in 1 ms slices to hold RATE per second
+        target = int((time.perf_counter() - start) * RATE)
+        while issued < target:
+            nonce = secrets.token_urlsafe(16)
+            t0 = time.perf_counter()
+            store.issue(nonce)
+            if issued % 10:
+                store.consume(nonce)
+            latencies.append(time.perf_counter() - t0)
+            issued += 1
+        if issued % 5000 == 0:
+            peak = max(peak, len(store))
+        time.sleep(0.001)
+    latencies.sort()
+    return {
+        "issued": issued,
+        "rate": issued / (time.perf_counter() - start),
+        "p50_us": latencies[len(latencies) // 2] * 1e6,
+        "p99_us": latencies[int(len(latencies) * 0.99)] * 1e6,
+        "peak_outstanding": max(peak, len(store)),
+    }
+
+
+def _consume_in_child(path: str, nonces: list, out: Queue) -> None:
+    store = SQLiteNonceStore(path)
+    out.put(sum(store.consume(nonce) for nonce in nonces))
+
+
+def cross_process(path: str, n: int = 1000) -> int:
+    store = SQLiteNonceStore(path)
+    nonces = [secrets.token_urlsafe(16) for _ in range(n)]
+    for nonce in nonces:
+        store.issue(nonce)
+    out: Queue = Queue()
+    child = Process(target=_consume_in_child, args=(path, nonces, out))
+    child.start()
+    consumed = out.get()
+    child.join()
+    # Already consumed by the other process: every replay must fail here
+    assert not any(store.consume(nonce) for nonce in nonces)
+    return consumed
+
+
+def main() -> None:
+    seconds = float(sys.argv[1]) if len(sys.argv) > 1 else 5.0
+    with tempfile.TemporaryDirectory() as tmp:
+        stores = {
+            "memory": lambda: MemoryNonceStore(ttl_seconds=2, bucket_seconds=1),
+            "sqlite": lambda: SQLiteNonceStore(os.path.join(tmp, f"{secrets.token_hex(4)}.db"), ttl_seconds=2, bucket_seconds=1),
+        }
+        print(f"{'store':<8}{'ops/s':>12}{'paced/s':>10}{'p50 us':>9}{'p99 us':>9}{'peak live':>11}")
+        for name, factory in stores.items():
+            ops = throughput(factory())
+            result = paced(factory(), seconds)
+            print(
+                f"{name:<8}{ops:>12,.0f}{result['rate']:>10,.0f}{result['p50_us']:>9.1f}"
+                f"{result['p99_us']:>9.1f}{result['peak_outstanding']:>11,}"
+            )
+
+        consumed = cross_process(os.path.join(tmp, "shared.db"))
+        print(f"\nsqlite cross-process: {consumed}/1000 consumed by a second process, 0 replays accepted")
+
+
+if __name__ == "__main__":
+    main()
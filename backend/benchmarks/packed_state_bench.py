@@ -0,0 +1,151 @@
+"""Compare the per-key and packed local-state layouts.
+
+Reports static opcode cost per action, local-state size / min-balance per
+opted-in account and the time to decode a doctor's user info from an algod
+``account_application_info`` response.
+
+Run from the backend directory:
+
+    python -m benchmarks.packed_state_bench
+"""
+
+import base64
+import os
+import sys
+import timeit
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+from algokit_utils.application_client import _decode_state  # noqa: E402
+from algosdk.account import generate_account  # noqa: E402
+from algosdk.encoding import decode_address  # noqa: E402
+from pyteal import Mode, compileTeal  # noqa: E402
+
+from app.algorand.contracts.medical_connect import MedicalConnectContract  # noqa: E402
+from app.algorand.contracts.medical_connect_packed import MedicalConnectPackedContract  # noqa: E402
+from app.algorand.packed_state import PROFILE_KEY, decode_user_info, encode_profile  # noqa: E402
+
+# Minimum balance (microAlgos) for opting into an app, plus per local key
+OPT_IN_MIN_BALANCE = 100_000
+UINT_KEY_MIN_BALANCE = 28_500
+BYTES_KEY_MIN_BALANCE = 50_000
+
+NAME = b"Dr. Alice Johnson"
+SPECIALIZATION = b"Emergency Medicine"
+TREATMENT = b"Stabilised and referred to cardiology"
+
+
+def opcode_cost(handler) -> int:
+    """Instruction count of a straight-line handler (== its runtime cost)"""
+    teal = compileTeal(handler, mode=Mode.Application, version=8)
+    return sum(
+        1 for line in teal.splitlines()
+        if line.strip() and not line.startswith("#") and not line.endswith(":")
+    )
+
+
+def _bytes_value(key: bytes, value: bytes) -> dict:
+    return {
+        "key": base64.b64encode(key).decode(),
+        "value": {"type": 1, "bytes": base64.b64encode(value).decode(), "uint": 0},
+    }
+
+
+def _uint_value(key: bytes, value: int) -> dict:
+    return {"key": base64.b64encode(key).decode(), "value": {"type": 2, "bytes": "", "uint": value}}
+
+
+def doctor_key_values(packed: bool) -> list:
+    """Local state of a doctor after one PoW, as algod returns it"""
+    patient = decode_address(generate_account()[1])
+    if packed:
+        profile = encode_profile(
+            user_type=1, pow_status=1, rating_sum=480, rating_count=100,
+            consultations_count=150, pow_id=42, timestamp=1_700_000_000, patient_addr=patient,
+        )
+        return [
+            _bytes_value(PROFILE_KEY, profile),
+            _bytes_value(b"name", NAME),
+            _bytes_value(b"specialization", SPECIALIZATION),
+            _bytes_value(b"treatment_desc", TREATMENT),
+        ]
+    return [
+        _uint_value(b"user_type", 1),
+        _bytes_value(b"name", NAME),
+        _bytes_value(b"specialization", SPECIALIZATION),
+        _uint_value(b"rating_sum", 480),
+        _uint_value(b"rating_count", 100),
+        _uint_value(b"consultations_count", 150),
+        _uint_value(b"pow_id", 42),
+        _bytes_value(b"patient_addr", patient),
+        _bytes_value(b"treatment_desc", TREATMENT),
+        _bytes_value(b"timestamp", (1_700_000_000).to_bytes(8, "big")),
+        _uint_value(b"status", 1),
+    ]
+
+
+def decode_unpacked(key_values: list) -> dict:
+    """Mirror of ``MedicalConnectClient.get_user_info`` for the per-key layout"""
+    local_state = _decode_state(key_values)
+    return {
+        "user_type": local_state.get("user_type", 0),
+        "name": local_state.get("name", ""),
+        "specialization": local_state.get("specialization", ""),
+        "rating_sum": local_state.get("rating_sum", 0),
+        "rating_count": local_state.get("rating_count", 0),
+        "consultations_count": local_state.get("consultations_count", 0),
+        "emergency_status": local_state.get("emergency_status", 0),
+        "registered": True
+    }
+
+
+def decode_packed(key_values: list) -> dict:
+    return decode_user_info(_decode_state(key_values, raw=True))
+
+
+def state_bytes(key_values: list) -> int:
+    """Key + value bytes actually stored (uints count as 8 bytes)"""
+    total = 0
+    for kv in key_values:
+        total += len(base64.b64decode(kv["key"]))
+        value = kv["value"]
+        total += len(base64.b64decode(value["bytes"])) if value["type"] == 1 else 8
+    return total
+
+
+def main(number: int = 50_000) -> None:
+    layouts = [
+        ("per-key", MedicalConnectContract(), decode_unpacked, False),
+        ("packed", MedicalConnectPackedContract(), decode_packed, True),
+    ]
+
+    print("== Opcode cost per action ==")
+    handlers = {name: contract.action_handlers() for name, contract, _, _ in layouts}
+    print(f"{'action':<18}" + "".join(f"{name:>10}" for name, *_ in layouts))
+    for action in handlers["per-key"]:
+        print(f"{action:<18}" + "".join(f"{opcode_cost(handlers[name][action]):>10}" for name, *_ in layouts))
+
+    print("\n== Local state per account ==")
+    print(f"{'layout':<10}{'uints':>7}{'bytes':>7}{'min balance':>14}{'doctor keys':>13}{'doctor bytes':>14}")
+    for name, contract, _, packed in layouts:
+        schema = contract.local_schema
+        min_balance = (
+            OPT_IN_MIN_BALANCE
+            + schema.num_uints * UINT_KEY_MIN_BALANCE
+            + schema.num_byte_slices * BYTES_KEY_MIN_BALANCE
+        )
+        key_values = doctor_key_values(packed)
+        print(
+            f"{name:<10}{schema.num_uints:>7}{schema.num_byte_slices:>7}{min_balance:>14}"
+            f"{len(key_values):>13}{state_bytes(key_values):>14}"
+        )
+
+    print(f"\n== get_user_info decode ({number} iterations) ==")
+    for name, _, decode, packed in layouts:
+        key_values = doctor_key_values(packed)
+        seconds = timeit.timeit(lambda: decode(key_values), number=number)
+        print(f"{name:<10}{seconds / number * 1e6:>8.2f} us/decode")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""Rating engine update and leaderboard latency.
+
+Loads 100k doctors over 20 specializations and 50 regions, then applies
+ratings one at a time and reports per-rating latency (p50/p99) and top-10
+latency per board kind. The baseline is what the endpoints did before the
+engine existed: recompute every doctor's score and sort on each request.
+Every top-10 answer is checked against that baseline.
+
+Run from the backend directory:
+
+    python -m benchmarks.rating_engine_bench [doctors] [ratings]
+"""
+
+import os
+import random
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+from app.ratings import RatingEngine  # noqa: E402
+
+SPECIALIZATIONS = [f"Specialty {i}" for i in range(20)]
+REGIONS = [f"R{i}" for i in range(50)]
+
+
+def percentile(samples, p: float) -> float:
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * p))]
+
+
+def baseline_top(engine: RatingEngine, k: int, specialization=None, region=None):
+    """Score and sort every matching doctor, as a plain recompute would"""
+    ranked = []
+    for address, stats in engine._doctors.items():
+        if specialization and stats.specialization != specialization.lower():
+            continue
+        if region and stats.region != region:
+            continue
+        ranked.append((-engine.score(stats), -stats.count, address))
+    ranked.sort()
+    return [address for _, _, address in ranked[:k]]
+
+
+def main() -> None:
+    doctors = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    ratings = int(sys.argv[2]) if len(sys.argv) > 2 else 200_000
+    rng = random.Random(3)
+    engine = RatingEngine()
+
+    start = time.perf_counter()
+    addresses = [f"DOCTOR{i:07d}" for i in range(doctors)]
+    for address in addresses:
+        engine.register_doctor(address, rng.choice(SPECIALIZATIONS), rng.choice(REGIONS))
+        engine.load(address, [rng.randint(0, 20) for _ in range(5)])
+    print(f"load      {doctors:,} doctors in {time.perf_counter() - start:.2f}s")
+
+    latencies = []
+    for _ in range(ratings):
+        address = rng.choice(addresses)
+        rating = rng.randint(1, 5)
+        t = time.perf_counter()
+        engine.rate(address, rating)
+        latencies.append(time.perf_counter() - t)
+    print(f"rate      {ratings / sum(latencies):>10,.0f}/s  "
+          f"p50 {percentile(latencies, 0.5) * 1e6:6.1f} us  p99 {percentile(latencies, 0.99) * 1e6:6.1f} us")
+
+    boards = [
+        ("overall", None, None),
+        ("specialization", SPECIALIZATIONS[0], None),
+        ("region", None, REGIONS[0]),
+        ("spec+region", SPECIALIZATIONS[0], REGIONS[0]),
+    ]
+    for label, specialization, region in boards:
+        t = time.perf_counter()
+        for _ in range(1000):
+            top = engine.top(10, specialization=specialization, region=region)
+        engine_us = (time.perf_counter() - t) / 1000 * 1e6
+
+        t = time.perf_counter()
+        expected = baseline_top(engine, 10, specialization, region)
+        baseline_us = (time.perf_counter() - t) * 1e6
+
+        assert [doctor["address"] for doctor in top] == expected, label
+        print(f"top-10 {label:<15} engine {engine_us:8.1f} us   recompute {baseline_us / 1000:8.1f} ms")
+
+    address = addresses[0]
+    t = time.perf_counter()
+    rank = engine.rank_of(address)
+    print(f"rank_of   {(time.perf_counter() - t) * 1e6:.1f} us (#{rank} of {doctors:,})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""Per-worker memory and read latency: in-process caches vs the shared read model.
+
+Runs W worker processes, one after another. In "per-worker" mode each worker builds and keeps
+its own copy of the read model (what an in-process cache would do); in
+"shared" mode one updater publishes the snapshot and every worker reads it
+through the mmap'd file. Reports each worker's private memory (USS) growth
+and the latency of user and list reads.
+
+Run from the backend directory (Linux, needs /proc/self/smaps_rollup):
+
+    python -m benchmarks.read_model_bench [users] [workers]
+"""
+
+from multiprocessing import Process, Queue
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+from app.read_model import SharedSnapshot  # noqa: E402
+
+READS = 20_000
+
+
+def synthetic_read_model(users: int) -> dict:
+    rng = random.Random(7)
+    entries = {"stats": {"total_doctors": users // 10, "total_patients": users - users // 10,
+                         "total_consultations": users * 3, "owner": "OWNER"}}
+    doctors = []
+    for i in range(users):
+        address = f"ADDR{i:054d}"
+        if i % 10 == 0:
+            doctor = {"address": address, "name": f"Dr. {i}", "specialization": "General Practice",
+                      "rating": round(rng.uniform(3, 5), 1), "location": "New York, NY",
+                      "consultations_count": rng.randint(0, 500)}
+            doctors.append(doctor)
+            entries[f"user:{address}"] = {"address": address, "user_type": 1, "name": doctor["name"],
+                                          "specialization": doctor["specialization"], "rating_sum": 450,
+                                          "rating_count": 100, "consultations_count": 12, "registered": True}
+        else:
+            entries[f"user:{address}"] = {"address": address, "user_type": 2, "name": f"Patient {i}",
+                                          "emergency_status": i % 50 == 0, "registered": True}
+    entries["doctors"] = doctors[:500]
+    return entries
+
+
+def private_bytes() -> int:
+    total = 0
+    with open("/proc/self/smaps_rollup") as f:
+        for line in f:
+            if line.startswith(("Private_Clean:", "Private_Dirty:")):
+                total += int(line.split()[1]) * 1024
+    return total
+
+
+def worker(mode: str, path: str, slot_size: int, users: int, out: Queue) -> None:
+    before = private_bytes()
+    if mode == "per-worker":
+        cache = synthetic_read_model(users)
+        get = cache.get
+    else:
+        get = SharedSnapshot(path, slot_size, memo_keys=("doctors",)).get
+    keys = [f"user:ADDR{random.randrange(users):054d}" for _ in range(READS)]
+    for key in keys:
+        get(key)  # Fault the pages in: measure steady state, not first touch
+
+    start = time.perf_counter()
+    for key in keys:
+        get(key)
+    user_us = (time.perf_counter() - start) / READS * 1e6
+
+    start = time.perf_counter()
+    for _ in range(1000):
+        get("doctors")
+    list_us = (time.perf_counter() - start) / 1000 * 1e6
+    # Memory after the timed reads so faulted-in private pages are counted
+    out.put((private_bytes() - before, user_us, list_us))
+
+
+def run(mode: str, path: str, slot_size: int, users: int, workers: int) -> list:
+    # One worker at a time so timings are not skewed by CPU contention
+    out: Queue = Queue()
+    results = []
+    for _ in range(workers):
+        proc = Process(target=worker, args=(mode, path, slot_size, users, out))
+        proc.start()
+        results.append(out.get())
+        proc.join()
+    return results
+
+
+def main() -> None:
+    users = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    workers = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+    slot_size = 64 * 1024 * 1024
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "read-model.bin")
+        snapshot = SharedSnapshot(path, slot_size)
+        snapshot.create()
+        start = time.perf_counter()
+        entries = {key: json.dumps(value).encode() for key, value in synthetic_read_model(users).items()}
+        snapshot.publish(entries, {})
+        print(f"published {users:,} users in {time.perf_counter() - start:.2f}s\n")
+
+        print(f"{'mode':<12}{'USS/worker MiB':>16}{'user read us':>14}{'doctors read us':>17}")
+        for mode in ("per-worker", "shared"):
+            results = run(mode, path, slot_size, users, workers)
+            uss = sum(r[0] for r in results) / len(results) / 2**20
+            user_us = sum(r[1] for r in results) / len(results)
+            list_us = sum(r[2] for r in results) / len(results)
+            print(f"{mode:<12}{uss:>16.1f}{user_us:>14.2f}{list_us:>17.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,236 @@
+"""Emergency dispatch throughput across 1, 2 and 4 region-sharded nodes.
+
+Every node is a separate uvicorn process whose read model holds the same
+synthetic doctors (20k by default), spread over the gazetteer's places. Every
+node lists all the others in SHARD_PEERS and joins the ones already running.
+A regional disaster is simulated:
+POST /emergency/set for new patients at random places in the north-eastern
+US. The requests are sent two ways:
+
+    any node   round-robin over the nodes, as a plain load balancer would;
+               a node that does not own the location's cell forwards the
+               request to the owner
+    owner      straight to the owner of the location's cell (a shard-aware
+               balancer, using GET /api/cluster/owner)
+
+Reported per node count and mode: throughput, p50/p99 latency, the share
+of requests that were forwarded, the CPU time of the busiest node, and the
+capacity that implies when every node has a core of its own
+(requests / busiest node's CPU seconds). Also reported is how the
+emergencies ended up spread over the nodes.
+
+With 4 nodes the bench then checks rebalancing. One node is stopped and must
+hand its emergencies off. A new node joins and must take over its cells'
+emergencies. No emergency may be lost along the way, and every cell must
+still be reachable through any node.
+
+Measured throughput only scales with node count when the nodes get their
+own CPU. The CPU count is printed with the results.
+
+Run from the backend directory:
+
+    python -m benchmarks.shard_dispatch_bench [doctors] [requests]
+"""
+
+import asyncio
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+from app.location import GAZETTEER_PATH  # noqa: E402
+from app.sharding import geohash  # noqa: E402
+
+SERVER = """
+import random
+import uvicorn
+from app.routers import medical
+from app.main import app
+
+places = {places!r}
+rng = random.Random(7)
+medical.MOCK_DOCTORS.extend(
+    {{"address": f"DOCTOR{{i:07d}}", "name": f"Dr. {{i}}", "specialization": "Emergency Medicine",
+      "rating_histogram": [0, 0, 0, 1, 4], "location": rng.choice(places), "consultations_count": 0}}
+    for i in range({doctors})
+)
+medical.seed_ratings()
+uvicorn.run(app, host="127.0.0.1", port={port}, log_level="warning")
+"""
+
+DISASTER_REGIONS = {"NY", "NJ", "PA", "CT", "MA", "RI", "MD", "DE", "DC"}
+CONCURRENCY = 32
+SECRET = "bench-cluster-secret"
+
+
+def load_places():
+    with open(GAZETTEER_PATH, encoding="utf-8") as f:
+        rows = [line.rstrip("\n").split("\t") for line in f if line.strip() and not line.startswith("#")]
+    return [(f"{name}, {region}", region, float(lat), float(lon)) for name, region, lat, lon in rows]
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class Node:
+    def __init__(self, url, peers, places, doctors, workdir):
+        port = int(url.rsplit(":", 1)[1])
+        self.url = url
+        env = {
+            **os.environ,
+            "SHARD_NODE_URL": self.url,
+            "SHARD_PEERS": ",".join(peers),
+            "SHARD_SECRET": SECRET,
+            "READ_MODEL_PATH": os.path.join(workdir, f"read-model-{port}.bin"),
+            "READ_MODEL_SLOT_BYTES": str(64 * 1024 * 1024),
+            "READ_MODEL_REFRESH_SECONDS": "3600",
+        }
+        self.process = subprocess.Popen(
+            [sys.executable, "-c", SERVER.format(places=places, doctors=doctors, port=port)],
+            cwd=os.path.join(os.path.dirname(__file__), ".."),
+            env=env,
+        )
+        deadline = time.time() + 120
+        while True:
+            try:
+                if httpx.get(f"{self.url}/health").status_code == 200:
+                    break
+            except httpx.HTTPError:
+                pass
+            if time.time() > deadline:
+                raise RuntimeError(f"{self.url} did not start")
+            time.sleep(0.2)
+
+    def cpu_seconds(self) -> float:
+        with open(f"/proc/{self.process.pid}/stat") as f:
+            fields = f.read().rsplit(")", 1)[1].split()
+        return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+
+    def status(self):
+        return httpx.get(f"{self.url}/api/cluster/status").json()
+
+    def stop(self):
+        self.process.terminate()
+        self.process.wait()
+
+
+async def raise_emergencies(targets, locations, patients):
+    latencies = []
+    queue = asyncio.Queue()
+    for url, patient, location in zip(targets, patients, locations):
+        queue.put_nowait((url, patient, location))
+
+    async def worker(client):
+        while not queue.empty():
+            url, patient, location = queue.get_nowait()
+            start = time.perf_counter()
+            response = await client.post(
+                f"{url}/api/medical/emergency/set",
+                json={"patient_address": patient, "emergency_status": True, "location": location},
+            )
+            latencies.append(time.perf_counter() - start)
+            assert response.status_code == 200 and response.json()["dispatch"]["doctors"], response.text
+
+    limits = httpx.Limits(max_connections=CONCURRENCY, max_keepalive_connections=CONCURRENCY)
+    async with httpx.AsyncClient(timeout=30, limits=limits) as client:
+        start = time.perf_counter()
+        await asyncio.gather(*(worker(client) for _ in range(CONCURRENCY)))
+        return latencies, time.perf_counter() - start
+
+
+def percentile(samples, q):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * q))] * 1000
+
+
+def check_reachable(nodes, cells, expected):
+    """Every cell's emergencies, read through the first node, add up to `expected`"""
+    found = 0
+    for location in cells.values():
+        response = httpx.get(f"{nodes[0].url}/api/medical/emergency/active", params={"location": location})
+        found += len(response.json()["emergencies"])
+    assert found == expected, f"{found} emergencies reachable, expected {expected}"
+
+
+def main() -> None:
+    doctors = int(sys.argv[1]) if len(sys.argv) > 1 else 20_000
+    requests = int(sys.argv[2]) if len(sys.argv) > 2 else 4_000
+    places = load_places()
+    disaster = [place for place in places if place[1] in DISASTER_REGIONS]
+    cells = {geohash(lat, lon, 4): name for name, _, lat, lon in disaster}
+    workdir = tempfile.mkdtemp(prefix="hosconnect-shards-")
+    rng = random.Random(1)
+    print(f"{doctors:,} doctors, {requests:,} emergencies over {len(disaster)} places "
+          f"in {len(cells)} cells, {CONCURRENCY} concurrent clients, {os.cpu_count()} CPU(s)")
+
+    for count in (1, 2, 4):
+        # The last URL is for the node that joins during the rebalancing check
+        urls = [f"http://127.0.0.1:{free_port()}" for _ in range(count + 1)]
+        nodes = []
+        for url in urls[:count]:
+            nodes.append(Node(url, urls, [place[0] for place in places], doctors, workdir))
+        try:
+            owners = {
+                cell: httpx.get(f"{nodes[0].url}/api/cluster/owner", params={"cell": cell}).json()["node"]
+                for cell in cells
+            }
+            cell_of = {name: geohash(lat, lon, 4) for name, _, lat, lon in disaster}
+            warmup = [rng.choice(disaster)[0] for _ in range(200)]
+            asyncio.run(raise_emergencies(
+                [nodes[i % count].url for i in range(len(warmup))], warmup,
+                [f"WARMUP-{count}-{i}" for i in range(len(warmup))],
+            ))
+            for mode in ("any node", "owner"):
+                locations = [rng.choice(disaster)[0] for _ in range(requests)]
+                if mode == "owner":
+                    targets = [owners[cell_of[location]] for location in locations]
+                else:
+                    targets = [nodes[i % count].url for i in range(requests)]
+                patients = [f"PATIENT-{count}-{mode}-{i}" for i in range(requests)]
+                forwarded_before = sum(node.status()["forwarded"] for node in nodes)
+                cpu_before = [node.cpu_seconds() for node in nodes]
+                latencies, elapsed = asyncio.run(raise_emergencies(targets, locations, patients))
+                busiest = max(node.cpu_seconds() - cpu for node, cpu in zip(nodes, cpu_before))
+                forwarded = sum(node.status()["forwarded"] for node in nodes) - forwarded_before
+                print(f"{count} node(s), {mode:<8}  {requests / elapsed:5.0f} req/s   "
+                      f"p50 {percentile(latencies, 0.5):6.1f} ms   p99 {percentile(latencies, 0.99):6.1f} ms   "
+                      f"forwarded {forwarded / requests:4.0%}   busiest node {busiest:5.2f} CPU s "
+                      f"-> {requests / busiest:5.0f} req/s with a core per node")
+            held = [node.status()["emergencies"] for node in nodes]
+            print(f"{count} node(s)  emergencies per node {held}")
+            total = sum(held)
+            assert total == len(warmup) + 2 * requests
+
+            if count == 4:
+                check_reachable(nodes, cells, total)
+                leaving = nodes.pop()
+                leaving.stop()
+                held = [node.status()["emergencies"] for node in nodes]
+                assert sum(held) == total, f"{total - sum(held)} emergencies lost on leave"
+                assert all(len(node.status()["nodes"]) == 3 for node in nodes)
+                check_reachable(nodes, cells, total)
+                print(f"node left    handed off {leaving.url}: emergencies per node {held}")
+
+                nodes.append(Node(urls[-1], urls, [place[0] for place in places], doctors, workdir))
+                held = [node.status()["emergencies"] for node in nodes]
+                assert sum(held) == total, f"{total - sum(held)} emergencies lost on join"
+                assert held[-1] > 0 and all(len(node.status()["nodes"]) == 4 for node in nodes)
+                check_reachable(nodes, cells, total)
+                print(f"node joined  took over {held[-1]} emergencies: emergencies per node {held}")
+        finally:
+            for node in nodes:
+                node.stop()
+
+
+if __name__ == "__main__":
+    main()
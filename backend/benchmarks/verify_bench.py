@@ -0,0 +1,84 @@
+"""Login-signature verification throughput (verifications per second).
+
+Compares verifying on one thread, on the dedicated thread pool and across
+the process pool used by ``/api/auth/verify-batch``.
+
+Run from the backend directory:
+
+    python -m benchmarks.verify_bench [N]
+"""
+
+import asyncio
+import base64
+import os
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+from algosdk import account  # noqa: E402
+from nacl.signing import SigningKey  # noqa: E402
+
+from app.verification import (  # noqa: E402
+    challenge_message,
+    shutdown_executors,
+    thread_pool,
+    verify_batch_async,
+    verify_chunk,
+)
+
+
+def signed_challenges(n: int, signers: int = 64) -> list:
+    keys = []
+    for _ in range(signers):
+        private_key, address = account.generate_account()
+        seed = base64.b64decode(private_key)[:32]
+        keys.append((SigningKey(seed), address))
+
+    items = []
+    for i in range(n):
+        signing_key, address = keys[i % signers]
+        nonce = f"nonce-{i}"
+        signature = signing_key.sign(challenge_message(nonce).encode()).signature
+        items.append((address, nonce, base64.b64encode(signature).decode()))
+    return items
+
+
+def report(label: str, n: int, seconds: float) -> None:
+    print(f"{label:<22}{n / seconds:>12,.0f} verifications/s")
+
+
+async def run(items: list) -> None:
+    n = len(items)
+
+    start = time.perf_counter()
+    assert all(verify_chunk(items))
+    report("single thread", n, time.perf_counter() - start)
+
+    loop = asyncio.get_running_loop()
+    pool = thread_pool()
+    chunk = max(1, n // (pool._max_workers * 4))
+    start = time.perf_counter()
+    await asyncio.gather(*(
+        loop.run_in_executor(pool, verify_chunk, items[i:i + chunk]) for i in range(0, n, chunk)
+    ))
+    report(f"thread pool ({pool._max_workers})", n, time.perf_counter() - start)
+
+    await verify_batch_async(items[:256])  # spawn worker processes outside the timing
+    start = time.perf_counter()
+    results = await verify_batch_async(items)
+    report(f"process pool ({os.cpu_count()})", n, time.perf_counter() - start)
+    assert all(results)
+
+
+def main() -> None:
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 20_000
+    items = signed_challenges(n)
+    try:
+        asyncio.run(run(items))
+    finally:
+        shutdown_executors()
+
+
+if __name__ == "__main__":
+    main()
@@ -44,6 +44,7 @@ export interface RateDoctorRequest {
 export interface SetEmergencyRequest {
   patient_address: string
   emergency_status: boolean
+  location?: string
 }
 
 export interface EmergencyPatient {
@@ -51,6 +52,7 @@ export interface EmergencyPatient {
   name: string
   emergency_status: number
   location: string
+  distance_km?: number | null
 }
 
 export interface NearbyDoctor {
@@ -58,8 +60,23 @@ export interface NearbyDoctor {
   name: string
   specialization: string
   rating: number
+  rating_count: number
   location: string
   consultations_count: number
+  distance_km?: number | null
+}
+
+export interface TopDoctor {
+  address: string
+  name: string
+  specialization: string
+  location: string
+  consultations_count: number
+  rating: number
+  rating_count: number
+  score: number
+  histogram: number[]
+  rank: number
 }
 
 class MedicalConnectAPI {
@@ -139,8 +156,9 @@ class MedicalConnectAPI {
     })
   }
 
-  async getEmergencyPatients(): Promise<EmergencyPatient[]> {
-    return this.request('/api/medical/emergency/patients')
+  async getEmergencyPatients(location?: string): Promise<EmergencyPatient[]> {
+    const params = location ? `?location=${encodeURIComponent(location)}` : ''
+    return this.request(`/api/medical/emergency/patients${params}`)
   }
 
   // Doctor Discovery
@@ -149,6 +167,13 @@ class MedicalConnectAPI {
     return this.request(`/api/medical/doctors/nearby${params}`)
   }
 
+  async getTopDoctors(specialization?: string, location?: string, k: number = 10): Promise<TopDoctor[]> {
+    const params = new URLSearchParams({ k: String(k) })
+    if (specialization) params.set('specialization', specialization)
+    if (location) params.set('location', location)
+    return this.request(`/api/medical/doctors/top?${params}`)
+  }
+
   // Global Stats
   async getGlobalStats(): Promise<{ total_doctors: number; total_patients: number; total_consultations: number; owner: string }> {
     return this.request('/api/medical/stats')